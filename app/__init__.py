@@ -1,21 +1,275 @@
-from flask import Flask
+import time
+_import_started = time.perf_counter()  # Base do tempo até a aplicação ficar pronta
+
+from flask import Flask, Request, current_app
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+from app.services.metrics import metrics
+from app.services.profiler import record_stage
+from app.services.response_format import StaticJSON, json_encoder
+import gc
+import logging
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+class ApiRequest(Request):
+    """Request com limite de tamanho próprio para upload de arquivos compactados"""
+    
+    @property
+    def max_content_length(self):
+        if self.url_rule is not None and self.url_rule.endpoint == 'api.upload_archive':
+            return current_app.config['ARCHIVE_MAX_SIZE']
+        return super().max_content_length
+
+class MetricsJSONProvider(DefaultJSONProvider):
+    """
+    Provider JSON que mede a serialização das respostas (jsonify) e, fora do
+    modo debug, serializa direto em bytes com o orjson quando disponível
+    """
+    
+    @staticmethod
+    def default(o):
+        if isinstance(o, StaticJSON):
+            return o.value
+        return DefaultJSONProvider.default(o)
+    
+    def dumps(self, obj, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            record_stage('response_encoding', time.perf_counter() - started)
+    
+    def response(self, *args, **kwargs):
+        # Saída indentada (debug) continua com o json padrão
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+        
+        obj = self._prepare_response_obj(args, kwargs)
+        started = time.perf_counter()
+        try:
+            body = json_encoder.dumps(obj, DefaultJSONProvider.default, sort_keys=self.sort_keys, ensure_ascii=self.ensure_ascii)
+        finally:
+            record_stage('response_encoding', time.perf_counter() - started)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
 def create_app():
+    started = time.perf_counter()
+    
+    # Coletor pausado enquanto o estado de longa duração é construído (evita
+    # buracos nas páginas herdadas pelos workers); reativado após o gc.freeze
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    
+    try:
+        from app.services.health import health_monitor
+        from app.services.warmup import freeze_heap, memory_usage
+        app, startup = _build_app()
+        if app.config['GC_FREEZE']:
+            startup['gc_frozen_objects'] = freeze_heap()
+    finally:
+        # Reativado mesmo se a configuração ou o warm-up falharem
+        if gc_was_enabled:
+            gc.enable()
+    
+    startup['create_app_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    startup['time_to_ready_ms'] = round((time.perf_counter() - _import_started) * 1000, 2)
+    startup['pid'] = os.getpid()
+    startup['memory'] = memory_usage()
+    health_monitor.startup = startup
+    app.logger.info(
+        "Aplicação pronta em %sms (create_app %sms, warm-up %sms, RSS %sMB)",
+        startup['time_to_ready_ms'], startup['create_app_ms'], startup['warmup_ms'],
+        startup['memory'].get('rss_kb', 0) // 1024
+    )
+    return app
+
+def _build_app():
+    """
+    Cria e configura a aplicação e roda o warm-up (chamado por create_app
+    com o coletor pausado). Retorna (app, informações do warm-up)
+    """
     app = Flask(__name__)
+    if app.logger.level == logging.NOTSET:
+        # Mensagens de inicialização (nível INFO) visíveis fora do modo debug
+        app.logger.setLevel(logging.INFO)
+    app.request_class = ApiRequest
+    app.json = MetricsJSONProvider(app)
     
     # Configuração CORS mais ampla para produção
     CORS(app, origins=["*"])
     
     # Configurações
     app.config['MAX_CONTENT_LENGTH'] = 10 * 1024 * 1024  # 10MB
+    app.config['MAX_BATCH_SIZE'] = int(os.environ.get('MAX_BATCH_SIZE', 100))
+    app.config['EML_BODY_BUDGET'] = int(os.environ.get('EML_BODY_BUDGET', 64 * 1024))  # bytes de corpo lidos por .eml
+    app.config['PDF_MAX_PAGES'] = int(os.environ.get('PDF_MAX_PAGES', 20))  # páginas lidas por .pdf
+    app.config['PDF_TEXT_BUDGET'] = int(os.environ.get('PDF_TEXT_BUDGET', 50000))  # caracteres extraídos por .pdf
+    app.config['PDF_MAX_BYTES'] = int(os.environ.get('PDF_MAX_BYTES', 2 * 1024 * 1024))  # .pdf maiores são recusados
+    app.config['ARCHIVE_MAX_SIZE'] = int(os.environ.get('ARCHIVE_MAX_SIZE', 100 * 1024 * 1024))  # .mbox/.zip
+    app.config['ARCHIVE_MAX_PARALLEL'] = int(os.environ.get('ARCHIVE_MAX_PARALLEL', 4))
+    
+    # Cache de resultados (RESULT_CACHE_SIZE=0 desativa; TTL em segundos, 0 = sem expiração)
+    app.config['RESULT_CACHE_SIZE'] = int(os.environ.get('RESULT_CACHE_SIZE', 2048))
+    app.config['RESULT_CACHE_TTL'] = int(os.environ.get('RESULT_CACHE_TTL', 0))
+    app.config['RESULT_CACHE_REDIS_URL'] = os.environ.get('RESULT_CACHE_REDIS_URL')
+    
+    # Pool de processos opcional para trabalho CPU-bound (textos/arquivos grandes)
+    app.config['EXECUTOR_ENABLED'] = os.environ.get('EXECUTOR_ENABLED', 'false').lower() in ('1', 'true')
+    app.config['EXECUTOR_WORKERS'] = int(os.environ.get('EXECUTOR_WORKERS', 0))  # 0 = núcleos da máquina
+    app.config['EXECUTOR_INLINE_THRESHOLD'] = int(os.environ.get('EXECUTOR_INLINE_THRESHOLD', 20000))
+    app.config['EXECUTOR_MAX_QUEUE'] = int(os.environ.get('EXECUTOR_MAX_QUEUE', 64))
+    app.config['EXECUTOR_TIMEOUT'] = float(os.environ.get('EXECUTOR_TIMEOUT', 30))
+    
+    # Métricas (/api/metrics). Com vários workers do gunicorn, METRICS_DIR deve
+    # apontar para um diretório compartilhado e limpo a cada deploy
+    app.config['METRICS_ENABLED'] = os.environ.get('METRICS_ENABLED', 'true').lower() in ('1', 'true')
+    app.config['METRICS_DIR'] = os.environ.get('METRICS_DIR')
+    
+    metrics.configure(
+        enabled=app.config['METRICS_ENABLED'],
+        directory=app.config['METRICS_DIR']
+    )
+    
+    # Profiling por requisição: com PROFILING_ENABLED, o header X-Profile
+    # (ou ?profile=) 1 retorna o tempo por etapa e "cprofile" inclui o cProfile
+    app.config['PROFILING_ENABLED'] = os.environ.get('PROFILING_ENABLED', 'false').lower() in ('1', 'true')
+    app.config['PROFILING_DIR'] = os.environ.get('PROFILING_DIR')  # opcional: grava cada perfil em arquivo
+    
+    # Warm-up: constrói o estado compilado (regex, autômatos, modelo, rotas)
+    # antes do fork dos workers (gunicorn --preload) e congela o heap
+    app.config['WARMUP_ENABLED'] = os.environ.get('WARMUP_ENABLED', 'true').lower() in ('1', 'true')
+    app.config['GC_FREEZE'] = os.environ.get('GC_FREEZE', 'true').lower() in ('1', 'true')
+    
+    # Engine de classificação padrão (keywords ou linear; o cliente escolhe
+    # com "engine") e arquivo do modelo linear gerado por app.services.model_training
+    app.config['CLASSIFIER_ENGINE'] = os.environ.get('CLASSIFIER_ENGINE', 'keywords').lower()
+    app.config['CLASSIFIER_MODEL_PATH'] = os.environ.get('CLASSIFIER_MODEL_PATH')
+    
+    # Early exit: textos longos são pontuados em trechos e a leitura para
+    # quando a decisão está saturada (o cliente força a leitura completa
+    # com "full_analysis")
+    app.config['EARLY_EXIT_ENABLED'] = os.environ.get('EARLY_EXIT_ENABLED', 'false').lower() in ('1', 'true')
+    
+    # Redução de conteúdo em /api/classify e /api/upload: headers, histórico
+    # citado, blocos encaminhados, assinaturas e avisos legais saem antes do
+    # scoring (o cliente desliga com "reduce_content": false)
+    app.config['CONTENT_REDUCTION_ENABLED'] = os.environ.get('CONTENT_REDUCTION_ENABLED', 'true').lower() in ('1', 'true')
+    
+    # Jobs assíncronos ("async" em /api/upload e /api/classify/batch): pool
+    # de threads por worker, fila limitada, resultados com expiração. Com
+    # JOBS_DIR (diretório compartilhado), qualquer worker responde a consulta
+    app.config['JOBS_ENABLED'] = os.environ.get('JOBS_ENABLED', 'true').lower() in ('1', 'true')
+    app.config['JOB_WORKERS'] = int(os.environ.get('JOB_WORKERS', 2))
+    app.config['JOB_MAX_QUEUE'] = int(os.environ.get('JOB_MAX_QUEUE', 32))
+    app.config['JOB_RESULT_TTL'] = int(os.environ.get('JOB_RESULT_TTL', 600))  # segundos
+    app.config['JOB_MAX_WAIT'] = float(os.environ.get('JOB_MAX_WAIT', 30))  # limite do long-poll
+    app.config['JOBS_DIR'] = os.environ.get('JOBS_DIR')
+    
+    # Índice de quase-duplicatas: emails quase iguais a um já classificado
+    # (mesmo modelo, outro nome/valor/protocolo) reaproveitam a decisão.
+    # Desligado por padrão: a resposta traz os scores de outro email
+    app.config['NEAR_DUPLICATE_ENABLED'] = os.environ.get('NEAR_DUPLICATE_ENABLED', 'false').lower() in ('1', 'true')
+    app.config['NEAR_DUPLICATE_THRESHOLD'] = float(os.environ.get('NEAR_DUPLICATE_THRESHOLD', 0.9))
+    app.config['NEAR_DUPLICATE_MAX_ENTRIES'] = int(os.environ.get('NEAR_DUPLICATE_MAX_ENTRIES', 4096))
+    app.config['NEAR_DUPLICATE_MAX_CHARS'] = int(os.environ.get('NEAR_DUPLICATE_MAX_CHARS', 20000))
+    
+    from app.services.near_duplicates import near_duplicate_index
+    near_duplicate_index.configure(
+        enabled=app.config['NEAR_DUPLICATE_ENABLED'],
+        max_entries=app.config['NEAR_DUPLICATE_MAX_ENTRIES'],
+        threshold=app.config['NEAR_DUPLICATE_THRESHOLD'],
+        max_chars=app.config['NEAR_DUPLICATE_MAX_CHARS']
+    )
+    
+    # Modo thread ("thread_id" em /api/classify): estado compacto por thread,
+    # limitado (LRU) e com expiração desde a última mensagem. Com
+    # THREAD_STATE_DIR (diretório compartilhado), qualquer worker continua a thread
+    app.config['THREAD_STATE_MAX_ENTRIES'] = int(os.environ.get('THREAD_STATE_MAX_ENTRIES', 10000))  # 0 desliga
+    app.config['THREAD_STATE_TTL'] = int(os.environ.get('THREAD_STATE_TTL', 86400))  # segundos
+    app.config['THREAD_STATE_DIR'] = os.environ.get('THREAD_STATE_DIR')
+    
+    from app.services.thread_state import thread_store
+    thread_store.configure(
+        max_entries=app.config['THREAD_STATE_MAX_ENTRIES'],
+        ttl=app.config['THREAD_STATE_TTL'],
+        directory=app.config['THREAD_STATE_DIR']
+    )
+    
+    # Controle de admissão nas rotas de classificação e upload: token bucket
+    # por cliente (429) e limite de trabalho em andamento ponderado pelo
+    # tamanho da entrada (503), ambos com Retry-After e por worker.
+    # Desligado por padrão: os limites dependem do deploy (ver README)
+    app.config['ADMISSION_ENABLED'] = os.environ.get('ADMISSION_ENABLED', 'false').lower() in ('1', 'true')
+    app.config['ADMISSION_RATE'] = float(os.environ.get('ADMISSION_RATE', 10))  # requisições/s por cliente
+    app.config['ADMISSION_BURST'] = float(os.environ.get('ADMISSION_BURST', 20))
+    app.config['ADMISSION_CAPACITY'] = int(os.environ.get('ADMISSION_CAPACITY', 64))  # unidades em andamento
+    app.config['ADMISSION_UNIT_BYTES'] = int(os.environ.get('ADMISSION_UNIT_BYTES', 16384))
+    app.config['ADMISSION_MAX_CLIENTS'] = int(os.environ.get('ADMISSION_MAX_CLIENTS', 10000))
+    # Proxies confiáveis na frente da aplicação (ex.: 1 no Render): o cliente
+    # é o endereço que o último proxy acrescentou ao X-Forwarded-For. Com 0
+    # (padrão), o X-Forwarded-For é ignorado: sem proxy, ele é forjável
+    app.config['ADMISSION_PROXY_HOPS'] = int(os.environ.get('ADMISSION_PROXY_HOPS', 0))
+    
+    from app.services.admission import admission_controller
+    admission_controller.configure(
+        enabled=app.config['ADMISSION_ENABLED'],
+        rate=app.config['ADMISSION_RATE'],
+        burst=app.config['ADMISSION_BURST'],
+        capacity=app.config['ADMISSION_CAPACITY'],
+        unit_bytes=app.config['ADMISSION_UNIT_BYTES'],
+        max_clients=app.config['ADMISSION_MAX_CLIENTS']
+    )
+    
+    from app.services.job_queue import job_queue
+    job_queue.configure(
+        workers=app.config['JOB_WORKERS'],
+        max_queue=app.config['JOB_MAX_QUEUE'],
+        ttl=app.config['JOB_RESULT_TTL'],
+        directory=app.config['JOBS_DIR']
+    )
+    
+    from app.services.linear_model import linear_engine
+    linear_engine.configure(app.config['CLASSIFIER_MODEL_PATH'])
+    
+    # Formato das respostas: nível de detalhe padrão (none, summary, full;
+    # o cliente escolhe com "verbose") e serialização com orjson se instalado
+    app.config['RESPONSE_VERBOSITY'] = os.environ.get('RESPONSE_VERBOSITY', 'full').lower()
+    app.config['JSON_FAST_ENCODER'] = os.environ.get('JSON_FAST_ENCODER', 'true').lower() in ('1', 'true')
+    
+    json_encoder.configure(fast=app.config['JSON_FAST_ENCODER'])
+    
+    from app.services.result_cache import result_cache
+    result_cache.configure(
+        max_entries=app.config['RESULT_CACHE_SIZE'],
+        ttl=app.config['RESULT_CACHE_TTL'],
+        redis_url=app.config['RESULT_CACHE_REDIS_URL']
+    )
+    
+    from app.services.executor import executor
+    executor.configure(
+        enabled=app.config['EXECUTOR_ENABLED'],
+        workers=app.config['EXECUTOR_WORKERS'],
+        inline_threshold=app.config['EXECUTOR_INLINE_THRESHOLD'],
+        max_queue=app.config['EXECUTOR_MAX_QUEUE'],
+        timeout=app.config['EXECUTOR_TIMEOUT']
+    )
     
     # Registrar rotas
     from app.routes import api
     app.register_blueprint(api)
     
-    return app
\ No newline at end of file
+    # Self-test do classificador uma única vez (parte do warm-up); as probes
+    # de saúde leem o resultado em cache
+    from app.services.health import health_monitor
+    from app.services.warmup import warm_up
+    if app.config['WARMUP_ENABLED']:
+        startup = warm_up(app)
+    else:
+        with metrics.suspended():
+            health_monitor.run_self_test()
+        startup = {'warmup_ms': None}
+    
+    return app, startup
\ No newline at end of file
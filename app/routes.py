@@ -1,10 +1,101 @@
-from flask import Blueprint, request, jsonify
-from app.services.email_classifier import classify_email
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context, g, url_for
+from werkzeug.datastructures import FileStorage
+from werkzeug.wsgi import get_input_stream
+from app.services.email_classifier import validate_text
+from app.services.result_cache import classify_email_cached, classify_batch_cached, result_cache, ENGINES
+from app.services.linear_model import linear_engine
+from app.services.stream_processor import classify_ndjson
+from app.services.archive_processor import classify_archive, validate_archive
+from app.services.executor import executor, ExecutorSaturated, ExecutorTimeout
 from app.services.file_processor import process_file, validate_file, get_file_info
+from app.services.content_reducer import reduce_content
+from app.services.job_queue import job_queue, JobQueueFull
+from app.services.near_duplicates import near_duplicate_index
+from app.services.admission import admission_controller, AdmissionRejected, ADMITTED_ENDPOINTS
+from app.services.thread_state import thread_store, classify_thread_message, validate_thread_ids
+from app.services.metrics import metrics, ENDPOINT_LABELS, REQUEST_DURATION, INPUT_BYTES, ERRORS_TOTAL
+from app.services.profiler import start_profile, finish_profile, current_profile
+from app.services.health import health_monitor
+from app.services.warmup import memory_usage
+from app.services.response_format import parse_verbosity, shape_result
+from typing import Dict, List
+import io
+import json
+import os
+import time
 import traceback
 
 api = Blueprint('api', __name__, url_prefix='/api')
 
+@api.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    
+    # Profiling sob demanda: X-Profile: 1 (etapas) ou X-Profile: cprofile
+    if current_app.config['PROFILING_ENABLED'] and request.method != 'OPTIONS':
+        flag = (request.headers.get('X-Profile') or request.args.get('profile') or '').lower()
+        if flag in ('1', 'true', 'cprofile'):
+            endpoint = ENDPOINT_LABELS.get(request.endpoint, 'other')
+            g.profile_token = start_profile(endpoint, with_cprofile=flag == 'cprofile')
+
+@api.before_request
+def admit_request():
+    """
+    Controle de admissão das rotas de classificação e upload: recusa na hora
+    (429/503 com Retry-After) antes de ler o corpo da requisição
+    """
+    if request.method == 'OPTIONS' or not admission_controller.enabled:
+        return None
+    endpoint = ENDPOINT_LABELS.get(request.endpoint, 'other')
+    if endpoint not in ADMITTED_ENDPOINTS:
+        return None
+    
+    try:
+        g.admission_weight = admission_controller.admit(_client_address(), request.content_length, endpoint)
+    except AdmissionRejected as e:
+        response = jsonify({
+            'error': str(e),
+            'status': 'error'
+        })
+        response.headers.add('Access-Control-Allow-Origin', '*')
+        response.headers.add('Retry-After', str(e.retry_after))
+        return response, e.status_code
+    return None
+
+@api.teardown_request
+def stop_request_profile(error=None):
+    token = g.pop('profile_token', None)
+    if token is not None:
+        finish_profile(token)
+    
+    weight = g.pop('admission_weight', None)
+    if weight is not None:
+        admission_controller.release(weight)
+
+@api.after_request
+def record_request_metrics(response):
+    """
+    Registra tamanho da entrada, erros e duração por endpoint. Respostas em
+    streaming têm a duração observada no fechamento, após o último chunk
+    """
+    endpoint = ENDPOINT_LABELS.get(request.endpoint, 'other')
+    started = g.get('request_started', time.perf_counter())
+    
+    if request.content_length is not None:
+        INPUT_BYTES.observe(request.content_length, endpoint)
+    if response.status_code >= 400:
+        ERRORS_TOTAL.inc(endpoint, '5xx' if response.status_code >= 500 else '4xx')
+    
+    if response.is_streamed:
+        response.call_on_close(lambda: REQUEST_DURATION.observe(time.perf_counter() - started, endpoint))
+        # A capacidade só é devolvida quando o último chunk for enviado
+        weight = g.pop('admission_weight', None)
+        if weight is not None:
+            response.call_on_close(lambda: admission_controller.release(weight))
+    else:
+        REQUEST_DURATION.observe(time.perf_counter() - started, endpoint)
+    return response
+
 @api.route('/classify', methods=['POST', 'OPTIONS'])
 def classify_email_text():
     """
@@ -58,15 +149,60 @@ def classify_email_text():
                 'status': 'error'
             }), 400
         
+        # Modo opcional: casar palavras-chave apenas como palavras inteiras
+        word_boundary = bool(data.get('word_boundary', False))
+        
+        verbose = _request_verbosity(data)
+        if verbose is None:
+            return _invalid_verbosity_response()
+        
+        engine, engine_error = _request_engine(data)
+        if engine_error:
+            return _invalid_engine_response(engine_error)
+        
+        thread_id = data.get('thread_id')
+        if thread_id is not None:
+            thread_error = _thread_mode_error(thread_id, data.get('message_id'), engine)
+            if thread_error:
+                response = jsonify({
+                    'error': thread_error,
+                    'status': 'error'
+                })
+                response.headers.add('Access-Control-Allow-Origin', '*')
+                return response, 400
+        
+        # Remover headers, histórico citado, assinaturas e avisos legais.
+        # No modo thread a redução é obrigatória (independente de
+        # "reduce_content" e CONTENT_REDUCTION_ENABLED): sem ela, o histórico
+        # citado seria somado de novo ao estado a cada resposta
+        text, reduction = _reduce_content(text, thread_id is not None or _request_reduce_content(data))
+        
         # Classificar usando IA/NLP
-        result = classify_email(text)
+        if thread_id is not None:
+            # Modo thread: só a parte nova é pontuada e somada ao estado da
+            # thread. Mensagem só com histórico (fallback) não acrescenta nada
+            delta = '' if reduction is not None and reduction['fallback'] else text
+            result = shape_result(classify_thread_message(
+                delta, thread_id, message_id=data.get('message_id'), word_boundary=word_boundary
+            ), verbose)
+        else:
+            result = shape_result(classify_email_cached(
+                text, word_boundary=word_boundary, engine=engine, early_exit=_request_early_exit(data),
+                near_duplicates=_request_near_duplicates(data)
+            ), verbose)
         result['status'] = 'success'
         result['endpoint'] = 'classify'
+        if reduction is not None:
+            result['content_reduction'] = reduction
+        _attach_profile(result.setdefault('analysis', {}))
         
         response = jsonify(result)
         response.headers.add('Access-Control-Allow-Origin', '*')
         return response
     
+    except (ExecutorSaturated, ExecutorTimeout) as e:
+        return _executor_error_response(e)
+    
     except Exception as e:
         print(f"Erro na classificação: {str(e)}")
         print(traceback.format_exc())
@@ -81,6 +217,184 @@ def classify_email_text():
         response.headers.add('Access-Control-Allow-Origin', '*')
         return response, 500
 
+@api.route('/classify/batch', methods=['POST', 'OPTIONS'])
+def classify_email_batch():
+    """
+    Endpoint para classificar um lote de emails em uma única requisição
+    Aceita {"texts": [...]} ou {"items": [{"id": ..., "text": ...}]}
+    Resultados retornam na mesma ordem, com erros isolados por item
+    """
+    # Tratar preflight CORS
+    if request.method == 'OPTIONS':
+        response = jsonify({'status': 'OK'})
+        response.headers.add('Access-Control-Allow-Origin', '*')
+        response.headers.add('Access-Control-Allow-Headers', 'Content-Type')
+        response.headers.add('Access-Control-Allow-Methods', 'POST, OPTIONS')
+        return response
+    
+    try:
+        if not request.is_json:
+            return jsonify({
+                'error': 'Content-Type deve ser application/json',
+                'status': 'error'
+            }), 400
+        
+        data = request.get_json()
+        
+        if isinstance(data, dict) and isinstance(data.get('items'), list):
+            items = data['items']
+        elif isinstance(data, dict) and isinstance(data.get('texts'), list):
+            items = [{'text': text} for text in data['texts']]
+        else:
+            return jsonify({
+                'error': 'Campo "texts" ou "items" (lista) é obrigatório no JSON',
+                'status': 'error',
+                'example': {'items': [{'id': '1', 'text': 'Seu email aqui...'}]}
+            }), 400
+        
+        max_batch_size = current_app.config['MAX_BATCH_SIZE']
+        if not items:
+            return jsonify({
+                'error': 'Lote não pode estar vazio',
+                'status': 'error'
+            }), 400
+        
+        if len(items) > max_batch_size:
+            return jsonify({
+                'error': f'Lote muito grande (máximo {max_batch_size} itens)',
+                'status': 'error'
+            }), 400
+        
+        word_boundary = bool(data.get('word_boundary', False))
+        
+        verbose = _request_verbosity(data)
+        if verbose is None:
+            return _invalid_verbosity_response()
+        
+        engine, engine_error = _request_engine(data)
+        if engine_error:
+            return _invalid_engine_response(engine_error)
+        
+        options = {
+            'word_boundary': word_boundary,
+            'engine': engine,
+            'early_exit': _request_early_exit(data),
+            'near_duplicates': _request_near_duplicates(data),
+            'verbose': verbose
+        }
+        if _request_async(data):
+            return _submit_job('classify_batch', _classify_batch_items, items, options)
+        
+        response_data = _classify_batch_items(items, options)
+        _attach_profile(response_data)
+        
+        response = jsonify(response_data)
+        response.headers.add('Access-Control-Allow-Origin', '*')
+        return response
+    
+    except (ExecutorSaturated, ExecutorTimeout, JobQueueFull) as e:
+        return _executor_error_response(e)
+    
+    except Exception as e:
+        print(f"Erro na classificação em lote: {str(e)}")
+        print(traceback.format_exc())
+        
+        error_response = {
+            'error': 'Erro interno do servidor ao classificar lote',
+            'status': 'error',
+            'details': str(e)
+        }
+        
+        response = jsonify(error_response)
+        response.headers.add('Access-Control-Allow-Origin', '*')
+        return response, 500
+
+def _classify_batch_items(items: List, options: Dict) -> Dict:
+    """
+    Classifica os itens do lote (corpo da resposta de /api/classify/batch).
+    Roda na requisição ou como job assíncrono
+    """
+    # Validar cada item; inválidos recebem erro próprio sem abortar o lote
+    results = [None] * len(items)
+    valid_indexes = []
+    valid_texts = []
+    for index, item in enumerate(items):
+        error = _validate_batch_item(item)
+        if error:
+            results[index] = {'status': 'error', 'error': error}
+        else:
+            valid_indexes.append(index)
+            valid_texts.append(item['text'].strip())
+    
+    for index, result in zip(valid_indexes, classify_batch_cached(
+        valid_texts, word_boundary=options['word_boundary'], engine=options['engine'],
+        early_exit=options['early_exit'], near_duplicates=options['near_duplicates']
+    )):
+        result = shape_result(result, options['verbose'])
+        result.setdefault('status', 'success')
+        results[index] = result
+    
+    for item, result in zip(items, results):
+        if isinstance(item, dict) and 'id' in item:
+            result['id'] = item['id']
+    
+    return {
+        'results': results,
+        'count': len(results),
+        'errors': sum(1 for result in results if result['status'] == 'error'),
+        'status': 'success',
+        'endpoint': 'classify_batch'
+    }
+
+def _validate_batch_item(item) -> str:
+    """
+    Valida um item do lote com as mesmas regras de /api/classify
+    Retorna a mensagem de erro ou string vazia se válido
+    """
+    if not isinstance(item, dict) or 'text' not in item:
+        return 'Campo "text" é obrigatório em cada item'
+    
+    return validate_text(item['text'])
+
+@api.route('/classify/stream', methods=['POST', 'OPTIONS'])
+def classify_email_stream():
+    """
+    Endpoint de classificação em streaming para backfills de caixas de email
+    Recebe NDJSON (um objeto por linha, ex.: {"id": ..., "text": ...}) e
+    devolve NDJSON com um resultado por linha via resposta chunked
+    """
+    # Tratar preflight CORS
+    if request.method == 'OPTIONS':
+        response = jsonify({'status': 'OK'})
+        response.headers.add('Access-Control-Allow-Origin', '*')
+        response.headers.add('Access-Control-Allow-Headers', 'Content-Type')
+        response.headers.add('Access-Control-Allow-Methods', 'POST, OPTIONS')
+        return response
+    
+    word_boundary = request.args.get('word_boundary', '').lower() in ('1', 'true')
+    
+    verbose = _request_verbosity()
+    if verbose is None:
+        return _invalid_verbosity_response()
+    
+    engine, engine_error = _request_engine()
+    if engine_error:
+        return _invalid_engine_response(engine_error)
+    
+    # Stream bruto da requisição: não é limitado por MAX_CONTENT_LENGTH,
+    # a memória é limitada por linha em classify_ndjson
+    stream = get_input_stream(request.environ)
+    
+    response = Response(
+        stream_with_context(classify_ndjson(
+            stream, word_boundary=word_boundary, verbose=verbose, engine=engine,
+            early_exit=_request_early_exit(), near_duplicates=_request_near_duplicates()
+        )),
+        mimetype='application/x-ndjson'
+    )
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    return response
+
 @api.route('/upload', methods=['POST', 'OPTIONS'])
 def upload_file():
     """
@@ -118,20 +432,38 @@ def upload_file():
                 'status': 'error'
             }), 400
         
+        verbose = _request_verbosity(request.form)
+        if verbose is None:
+            return _invalid_verbosity_response()
+        
+        engine, engine_error = _request_engine(request.form)
+        if engine_error:
+            return _invalid_engine_response(engine_error)
+        
         # Obter informações do arquivo
         file_info = get_file_info(file)
+        options = {
+            'extract': {
+                'body_budget': current_app.config['EML_BODY_BUDGET'],
+                'max_pages': current_app.config['PDF_MAX_PAGES'],
+                'text_budget': current_app.config['PDF_TEXT_BUDGET'],
+                'pdf_max_bytes': current_app.config['PDF_MAX_BYTES']
+            },
+            'engine': engine,
+            'early_exit': _request_early_exit(request.form),
+            'near_duplicates': _request_near_duplicates(request.form),
+            'reduce_content': _request_reduce_content(request.form),
+            'verbose': verbose
+        }
+        
+        # Modo assíncrono: o conteúdo é lido aqui (o stream do upload não
+        # sobrevive à requisição) e extração + classificação rodam no job
+        if _request_async(request.form):
+            return _submit_job('upload', _upload_job, file.read(), file_info, options)
         
         # Processar arquivo e extrair texto
         try:
-            text = process_file(file)
-            
-            if not text or not text.strip():
-                return jsonify({
-                    'error': 'Não foi possível extrair texto do arquivo',
-                    'status': 'error',
-                    'file_info': file_info
-                }), 400
-            
+            text = _extract_upload_text(file, file_info, options)
         except ValueError as ve:
             return jsonify({
                 'error': str(ve),
@@ -139,17 +471,16 @@ def upload_file():
                 'file_info': file_info
             }), 400
         
-        # Classificar texto extraído
-        result = classify_email(text)
-        result['status'] = 'success'
-        result['endpoint'] = 'upload'
-        result['file_info'] = file_info
-        result['extracted_text_preview'] = text[:200] + '...' if len(text) > 200 else text
+        result = _classify_upload_text(text, file_info, options)
+        _attach_profile(result.setdefault('analysis', {}))
         
         response = jsonify(result)
         response.headers.add('Access-Control-Allow-Origin', '*')
         return response
     
+    except (ExecutorSaturated, ExecutorTimeout, JobQueueFull) as e:
+        return _executor_error_response(e)
+    
     except Exception as e:
         print(f"Erro no upload: {str(e)}")
         print(traceback.format_exc())
@@ -164,6 +495,318 @@ def upload_file():
         response.headers.add('Access-Control-Allow-Origin', '*')
         return response, 500
 
+def _extract_upload_text(file: FileStorage, file_info: Dict, options: Dict) -> str:
+    """
+    Extrai o texto do arquivo; ValueError se não houver texto
+    """
+    text = process_file(file, file_info, **options['extract'])
+    if not text or not text.strip():
+        raise ValueError('Não foi possível extrair texto do arquivo')
+    return text
+
+def _classify_upload_text(text: str, file_info: Dict, options: Dict) -> Dict:
+    """
+    Classifica o texto extraído, sem headers, histórico e assinaturas
+    (corpo da resposta de /api/upload)
+    """
+    content, reduction = _reduce_content(text.strip(), options['reduce_content'])
+    result = shape_result(classify_email_cached(
+        content, engine=options['engine'], early_exit=options['early_exit'],
+        near_duplicates=options['near_duplicates']
+    ), options['verbose'])
+    result['status'] = 'success'
+    result['endpoint'] = 'upload'
+    result['file_info'] = file_info
+    if reduction is not None:
+        result['content_reduction'] = reduction
+    if options['verbose'] != 'none':
+        result['extracted_text_preview'] = text[:200] + '...' if len(text) > 200 else text
+    return result
+
+def _upload_job(content: bytes, file_info: Dict, options: Dict) -> Dict:
+    """
+    Job assíncrono de /api/upload: extração + classificação fora da requisição
+    """
+    storage = FileStorage(stream=io.BytesIO(content), filename=file_info['filename'])
+    return _classify_upload_text(_extract_upload_text(storage, file_info, options), file_info, options)
+
+@api.route('/upload/archive', methods=['POST', 'OPTIONS'])
+def upload_archive():
+    """
+    Endpoint para upload de caixas de email exportadas (.mbox ou .zip de .eml)
+    Cada mensagem passa pelo mesmo fluxo de /api/upload e o resultado é
+    devolvido em NDJSON (uma linha por mensagem + resumo final)
+    """
+    # Tratar preflight CORS
+    if request.method == 'OPTIONS':
+        response = jsonify({'status': 'OK'})
+        response.headers.add('Access-Control-Allow-Origin', '*')
+        response.headers.add('Access-Control-Allow-Headers', 'Content-Type')
+        response.headers.add('Access-Control-Allow-Methods', 'POST, OPTIONS')
+        return response
+    
+    if 'file' not in request.files:
+        return jsonify({
+            'error': 'Nenhum arquivo enviado. Use campo "file" no form-data',
+            'status': 'error'
+        }), 400
+    
+    file = request.files['file']
+    
+    is_valid, message = validate_archive(file, current_app.config['ARCHIVE_MAX_SIZE'])
+    if not is_valid:
+        return jsonify({
+            'error': message,
+            'status': 'error'
+        }), 400
+    
+    try:
+        parallel = int(request.args.get('parallel', 1))
+    except ValueError:
+        parallel = 1
+    parallel = max(1, min(parallel, current_app.config['ARCHIVE_MAX_PARALLEL']))
+    
+    extract_options = {
+        'body_budget': current_app.config['EML_BODY_BUDGET'],
+        'max_pages': current_app.config['PDF_MAX_PAGES'],
+        'text_budget': current_app.config['PDF_TEXT_BUDGET'],
+        'pdf_max_bytes': current_app.config['PDF_MAX_BYTES']
+    }
+    archive_type = os.path.splitext(file.filename)[1].lower()
+    word_boundary = request.args.get('word_boundary', '').lower() in ('1', 'true')
+    
+    verbose = _request_verbosity()
+    if verbose is None:
+        return _invalid_verbosity_response()
+    
+    engine, engine_error = _request_engine()
+    if engine_error:
+        return _invalid_engine_response(engine_error)
+    
+    response = Response(
+        stream_with_context(classify_archive(
+            file.stream, archive_type, extract_options,
+            word_boundary=word_boundary, parallel=parallel, verbose=verbose, engine=engine,
+            early_exit=_request_early_exit(), near_duplicates=_request_near_duplicates()
+        )),
+        mimetype='application/x-ndjson'
+    )
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    return response
+
+def _client_address() -> str:
+    """
+    Endereço do cliente para o token bucket: com ADMISSION_PROXY_HOPS
+    proxies confiáveis, a entrada que o último deles acrescentou ao
+    X-Forwarded-For (as anteriores podem ter sido forjadas pelo cliente)
+    """
+    hops = current_app.config['ADMISSION_PROXY_HOPS']
+    route = request.access_route if hops > 0 and request.headers.get('X-Forwarded-For') else []
+    if len(route) >= hops > 0:
+        return route[-hops]
+    return request.remote_addr or 'unknown'
+
+def _request_option(data, name: str):
+    """
+    Opção da requisição: campo do corpo (JSON ou form-data) ou parâmetro da query string
+    """
+    value = data.get(name) if isinstance(data, dict) or hasattr(data, 'getlist') else None
+    if value is None:
+        value = request.args.get(name)
+    return value
+
+def _request_verbosity(data=None):
+    """
+    Nível de detalhe da resposta: campo "verbose" do corpo (JSON ou
+    form-data) ou parâmetro ?verbose=, com RESPONSE_VERBOSITY como padrão.
+    None se o valor for inválido
+    """
+    return parse_verbosity(_request_option(data, 'verbose'), current_app.config['RESPONSE_VERBOSITY'])
+
+def _request_full_analysis(data=None) -> bool:
+    """
+    "full_analysis" (campo ou ?full_analysis=true): o cliente pede a
+    análise completa do próprio texto, sem atalhos
+    """
+    full_analysis = _request_option(data, 'full_analysis')
+    if isinstance(full_analysis, str):
+        full_analysis = full_analysis.lower() in ('1', 'true')
+    return bool(full_analysis)
+
+def _request_early_exit(data=None) -> bool:
+    """
+    Early exit do scoring: habilitado por EARLY_EXIT_ENABLED, desligado
+    pelo cliente com "full_analysis" para ler o texto inteiro
+    """
+    return current_app.config['EARLY_EXIT_ENABLED'] and not _request_full_analysis(data)
+
+def _request_near_duplicates(data=None) -> bool:
+    """
+    Reaproveitamento de quase-duplicatas (NEAR_DUPLICATE_ENABLED), desligado
+    pelo cliente com "full_analysis"
+    """
+    return current_app.config['NEAR_DUPLICATE_ENABLED'] and not _request_full_analysis(data)
+
+def _request_reduce_content(data=None) -> bool:
+    """
+    Redução de conteúdo antes do scoring: habilitada por
+    CONTENT_REDUCTION_ENABLED, desligada pelo cliente com "reduce_content": false
+    (ou ?reduce_content=false)
+    """
+    enabled = _request_option(data, 'reduce_content')
+    if isinstance(enabled, str):
+        enabled = enabled.lower() not in ('0', 'false')
+    return current_app.config['CONTENT_REDUCTION_ENABLED'] and enabled is not False
+
+def _reduce_content(text: str, enabled: bool):
+    """
+    Retorna (texto reduzido, relatório) ou (texto, None) sem redução
+    """
+    if not enabled:
+        return text, None
+    return reduce_content(text)
+
+def _request_async(data=None) -> bool:
+    """
+    Modo assíncrono: campo "async" (ou ?async=true). A requisição retorna
+    202 com o id do job e o resultado fica em /api/jobs/<id>
+    """
+    value = _request_option(data, 'async')
+    if isinstance(value, str):
+        value = value.lower() in ('1', 'true')
+    return bool(value)
+
+def _submit_job(kind: str, fn, *args):
+    """
+    Enfileira o job e responde 202 com o id e a URL de consulta; fila
+    cheia ou jobs desabilitados são rejeitados na hora
+    """
+    if not current_app.config['JOBS_ENABLED']:
+        response = jsonify({
+            'error': 'Modo assíncrono desabilitado neste servidor (JOBS_ENABLED)',
+            'status': 'error'
+        })
+        response.headers.add('Access-Control-Allow-Origin', '*')
+        return response, 400
+    
+    job = job_queue.submit(kind, fn, *args)
+    poll_url = url_for('api.get_job', job_id=job['job_id'])
+    response = jsonify({
+        'status': 'accepted',
+        'endpoint': kind,
+        'job_id': job['job_id'],
+        'job': job,
+        'poll_url': poll_url
+    })
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    response.headers['Location'] = poll_url
+    return response, 202
+
+def _request_engine(data=None):
+    """
+    Engine de classificação: campo "engine" ou ?engine=, com
+    CLASSIFIER_ENGINE como padrão. Retorna (engine, mensagem de erro)
+    """
+    engine = str(_request_option(data, 'engine') or current_app.config['CLASSIFIER_ENGINE']).lower()
+    if engine not in ENGINES:
+        return None, f'Campo "engine" inválido. Use {" ou ".join(ENGINES)}'
+    if engine == 'linear' and not linear_engine.available:
+        return None, 'Engine "linear" indisponível: nenhum modelo carregado (CLASSIFIER_MODEL_PATH)'
+    return engine, ''
+
+def _thread_mode_error(thread_id, message_id, engine: str) -> str:
+    """
+    Valida o modo thread: ids, store habilitado e engine de palavras-chave
+    (o estado da thread guarda contagens de palavras-chave)
+    """
+    error = validate_thread_ids(thread_id, message_id)
+    if error:
+        return error
+    if not thread_store.enabled:
+        return 'Modo thread desabilitado neste servidor (THREAD_STATE_MAX_ENTRIES)'
+    if engine != 'keywords':
+        return 'Modo thread disponível apenas para a engine "keywords"'
+    return ''
+
+def _invalid_engine_response(message: str):
+    response = jsonify({
+        'error': message,
+        'status': 'error'
+    })
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    return response, 400
+
+def _invalid_verbosity_response():
+    response = jsonify({
+        'error': 'Campo "verbose" inválido. Use none, summary ou full',
+        'status': 'error'
+    })
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    return response, 400
+
+def _attach_profile(target: Dict):
+    """
+    Inclui o perfil da requisição (se ativo) em target['profile'] e, com
+    PROFILING_DIR, grava o perfil em arquivo
+    """
+    profile = current_profile()
+    if profile is None:
+        return
+    
+    report = profile.report()
+    if current_app.config['PROFILING_DIR']:
+        report['dump'] = profile.dump(current_app.config['PROFILING_DIR'])
+    target['profile'] = report
+
+def _executor_error_response(error: Exception):
+    """
+    Resposta rápida quando o pool de processos ou a fila de jobs está cheia
+    (503) ou a tarefa excedeu o tempo limite (504)
+    """
+    status_code = 503 if isinstance(error, (ExecutorSaturated, JobQueueFull)) else 504
+    response = jsonify({
+        'error': str(error),
+        'status': 'error'
+    })
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    if status_code == 503:
+        response.headers.add('Retry-After', '1')
+    return response, status_code
+
+@api.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Estado e resultado de um job assíncrono. Com ?wait=<segundos>
+    (long-poll, até JOB_MAX_WAIT), espera o job terminar antes de responder
+    """
+    try:
+        wait = float(request.args.get('wait') or 0)
+    except ValueError:
+        return jsonify({
+            'error': 'Parâmetro "wait" deve ser um número de segundos',
+            'status': 'error'
+        }), 400
+    wait = max(0.0, min(wait, current_app.config['JOB_MAX_WAIT']))
+    
+    job = job_queue.wait(job_id, wait) if wait else job_queue.get(job_id)
+    if job is None:
+        response = jsonify({
+            'error': 'Job não encontrado ou resultado expirado',
+            'status': 'error'
+        })
+        response.headers.add('Access-Control-Allow-Origin', '*')
+        return response, 404
+    
+    response = jsonify({
+        'status': 'success',
+        'endpoint': 'jobs',
+        'job': job
+    })
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    if job['status'] in ('queued', 'running'):
+        response.headers.add('Retry-After', '1')
+    return response
+
 @api.route('/health', methods=['GET'])
 def health_check():
     """
@@ -171,12 +814,8 @@ def health_check():
     Útil para monitoramento e verificação se o serviço está ativo
     """
     try:
-        # Verificar se todos os serviços estão funcionando
-        from app.services.email_classifier import classify_email
-        from app.services.nlp_processor import nlp_processor
-        
-        # Teste rápido
-        test_result = classify_email("Teste de funcionamento da API")
+        # Self-test em cache (roda na inicialização e quando o léxico muda)
+        self_test = health_monitor.self_test()
         
         response_data = {
             'status': 'OK',
@@ -184,10 +823,33 @@ def health_check():
             'version': '1.0.0',
             'endpoints': {
                 'POST /api/classify': 'Classificar texto de email',
+                'POST /api/classify/batch': 'Classificar lote de emails',
+                'POST /api/classify/stream': 'Classificar stream NDJSON',
                 'POST /api/upload': 'Upload de arquivo de email',
-                'GET /api/health': 'Verificação de saúde'
+                'POST /api/upload/archive': 'Upload de caixa de email (.mbox/.zip)',
+                'GET /api/jobs/<id>': 'Resultado de job assíncrono (upload/lote com "async")',
+                'GET /api/health': 'Verificação de saúde',
+                'GET /api/health/live': 'Probe de liveness',
+                'GET /api/health/ready': 'Probe de readiness',
+                'GET /api/metrics': 'Métricas (formato Prometheus)'
+            },
+            'test_classification': next(
+                (case['classification'] for case in self_test['cases'] if case['expected'] is None), None
+            ),
+            'self_test': self_test,
+            'uptime_seconds': health_monitor.uptime(),
+            'startup': health_monitor.startup,
+            'memory': memory_usage(),
+            'cache': result_cache.stats(),
+            'near_duplicates': near_duplicate_index.stats(),
+            'threads': thread_store.stats(),
+            'admission': admission_controller.stats(),
+            'executor': executor.stats(),
+            'jobs': job_queue.stats(),
+            'engines': {
+                'default': current_app.config['CLASSIFIER_ENGINE'],
+                'linear': linear_engine.info()
             },
-            'test_classification': test_result['classification'],
             'supported_files': ['.txt', '.eml', '.msg', '.pdf']
         }
         
@@ -208,37 +870,73 @@ def health_check():
         response.headers.add('Access-Control-Allow-Origin', '*')
         return response, 500
 
+@api.route('/health/live', methods=['GET'])
+def liveness_probe():
+    """
+    Probe de liveness: o worker responde. Apenas estado em memória
+    (uptime, resultado do self-test em cache e ocupação da fila)
+    """
+    response = jsonify(health_monitor.liveness())
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    return response
+
+@api.route('/health/ready', methods=['GET'])
+def readiness_probe():
+    """
+    Probe de readiness: 200 se o self-test passou e a fila do pool tem
+    espaço, 503 caso contrário
+    """
+    report = health_monitor.readiness()
+    response = jsonify(report)
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    if not report['ready']:
+        response.headers.add('Retry-After', '1')
+        return response, 503
+    return response
+
+@api.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """
+    Métricas no formato texto do Prometheus: latência por etapa e por
+    endpoint, tamanho das entradas, classificações e erros.
+    Com METRICS_DIR, agrega todos os workers do gunicorn
+    """
+    response = Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    return response
+
+# Corpo de /api/categories: estático, serializado uma única vez
+CATEGORIES_BODY = json.dumps({
+    'categories': [
+        {
+            'name': 'Produtivo',
+            'description': 'Emails que requerem uma ação ou resposta específica',
+            'examples': [
+                'Solicitações de suporte técnico',
+                'Atualizações sobre casos em aberto', 
+                'Dúvidas sobre o sistema'
+            ]
+        },
+        {
+            'name': 'Improdutivo', 
+            'description': 'Emails que não necessitam de uma ação imediata',
+            'examples': [
+                'Mensagens de felicitações',
+                'Agradecimentos genéricos',
+                'Comunicados informativos'
+            ]
+        }
+    ],
+    'status': 'success'
+}, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8') + b'\n'
+
 @api.route('/categories', methods=['GET'])
 def get_categories():
     """
     Endpoint para obter as categorias disponíveis
     Conforme requisito do desafio: Produtivo e Improdutivo
     """
-    response_data = {
-        'categories': [
-            {
-                'name': 'Produtivo',
-                'description': 'Emails que requerem uma ação ou resposta específica',
-                'examples': [
-                    'Solicitações de suporte técnico',
-                    'Atualizações sobre casos em aberto', 
-                    'Dúvidas sobre o sistema'
-                ]
-            },
-            {
-                'name': 'Improdutivo', 
-                'description': 'Emails que não necessitam de uma ação imediata',
-                'examples': [
-                    'Mensagens de felicitações',
-                    'Agradecimentos genéricos',
-                    'Comunicados informativos'
-                ]
-            }
-        ],
-        'status': 'success'
-    }
-    
-    response = jsonify(response_data)
+    response = Response(CATEGORIES_BODY, mimetype='application/json')
     response.headers.add('Access-Control-Allow-Origin', '*')
     return response
 
@@ -250,8 +948,14 @@ def api_not_found(error):
         'status': 'error',
         'available_endpoints': [
             'POST /api/classify',
+            'POST /api/classify/batch',
+            'POST /api/classify/stream',
             'POST /api/upload', 
+            'POST /api/upload/archive',
             'GET /api/health',
+            'GET /api/health/live',
+            'GET /api/health/ready',
+            'GET /api/metrics',
             'GET /api/categories'
         ]
     })
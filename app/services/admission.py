@@ -0,0 +1,154 @@
+from app.services.metrics import ADMISSION_SHED, ADMISSION_IN_FLIGHT, ADMISSION_IN_FLIGHT_REQUESTS
+from collections import OrderedDict
+from typing import Dict, Optional
+import math
+import threading
+import time
+
+# Endpoints de classificação sujeitos ao controle de admissão (labels de métricas)
+ADMITTED_ENDPOINTS = ('classify', 'classify_batch', 'classify_stream', 'upload', 'upload_archive')
+
+# Peso das requisições sem Content-Length (corpo chunked), em fração da
+# capacidade: o tamanho só é conhecido depois de ler o corpo, então vale o
+# pior caso da rota. /api/classify aceita até 50000 caracteres (~200KB em
+# UTF-8); lotes e uploads chegam ao limite do corpo; um stream não tem
+# limite de tamanho e fica aberto até o último chunk
+UNKNOWN_SIZE_SHARES = {
+    'classify': 0.25,
+    'classify_batch': 1.0,
+    'classify_stream': 0.5,
+    'upload': 1.0,
+    'upload_archive': 1.0
+}
+
+class AdmissionRejected(Exception):
+    """
+    Requisição recusada antes de qualquer processamento: 429 (cliente acima
+    da sua taxa) ou 503 (servidor sem capacidade), com Retry-After
+    """
+
+    def __init__(self, message: str, status_code: int, retry_after: int):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+class AdmissionController:
+    """
+    Controle de admissão na frente das rotas de classificação e upload.
+    - Token bucket por cliente: rate requisições por segundo, com rajadas
+      de até burst; acima disso, 429.
+    - Limite global de trabalho em andamento, ponderado pelo tamanho: cada
+      requisição ocupa 1 + tamanho / unit_bytes unidades (até capacity);
+      sem Content-Length, a fração da capacidade da rota em
+      UNKNOWN_SIZE_SHARES; sem unidades livres, 503.
+    Nada fica enfileirado: a resposta de recusa é imediata. Os limites são
+    por processo (cada worker do gunicorn tem os seus)
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.rate = 10.0
+        self.burst = 20.0
+        self.capacity = 64
+        self.unit_bytes = 16384
+        self.max_clients = 10000
+        self._buckets: OrderedDict = OrderedDict()
+        self._in_flight = 0
+        self._in_flight_requests = 0
+        self._lock = threading.Lock()
+        self._counters = {'admitted': 0, 'rate_limited': 0, 'overloaded': 0}
+
+    def configure(self, enabled: bool = True, rate: float = 10.0, burst: float = 20.0, capacity: int = 64,
+                  unit_bytes: int = 16384, max_clients: int = 10000):
+        """
+        Reconfigura os limites (chamado em create_app a partir de app.config)
+        """
+        with self._lock:
+            self.enabled = enabled
+            self.rate = rate
+            self.burst = max(1.0, burst)
+            self.capacity = max(1, capacity)
+            self.unit_bytes = max(1, unit_bytes)
+            self.max_clients = max(1, max_clients)
+            self._buckets.clear()
+
+    def weight(self, size: Optional[int], endpoint: str = '') -> int:
+        """
+        Unidades de capacidade de uma requisição com size bytes. Limitado à
+        capacidade: uma requisição maior que o limite só roda sozinha.
+        Sem tamanho (size None, corpo chunked), o peso é o pior caso da rota
+        """
+        if size is None:
+            return max(1, math.ceil(self.capacity * UNKNOWN_SIZE_SHARES.get(endpoint, 1.0)))
+        return min(self.capacity, 1 + size // self.unit_bytes)
+
+    def admit(self, client: str, size: Optional[int], endpoint: str) -> int:
+        """
+        Admite a requisição e retorna as unidades reservadas (a devolver com
+        release). size é o Content-Length (None se o corpo vier chunked).
+        Levanta AdmissionRejected se o cliente estiver acima da taxa ou se
+        não houver capacidade
+        """
+        weight = self.weight(size, endpoint)
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+
+            if tokens < 1:
+                self._store_bucket(client, tokens, now)
+                self._counters['rate_limited'] += 1
+                rejection = AdmissionRejected(
+                    'Limite de requisições excedido, tente novamente em instantes', 429,
+                    math.ceil((1 - tokens) / self.rate) if self.rate > 0 else 60
+                )
+            elif self._in_flight + weight > self.capacity:
+                # Sem capacidade: o token não é consumido
+                self._store_bucket(client, tokens, now)
+                self._counters['overloaded'] += 1
+                rejection = AdmissionRejected('Servidor sobrecarregado, tente novamente em instantes', 503, 1)
+            else:
+                self._store_bucket(client, tokens - 1, now)
+                self._in_flight += weight
+                self._in_flight_requests += 1
+                self._counters['admitted'] += 1
+                in_flight, in_flight_requests = self._in_flight, self._in_flight_requests
+                rejection = None
+
+        if rejection is not None:
+            ADMISSION_SHED.inc(endpoint, 'rate_limited' if rejection.status_code == 429 else 'overloaded')
+            raise rejection
+        ADMISSION_IN_FLIGHT.set(in_flight)
+        ADMISSION_IN_FLIGHT_REQUESTS.set(in_flight_requests)
+        return weight
+
+    def release(self, weight: int):
+        with self._lock:
+            self._in_flight -= weight
+            self._in_flight_requests -= 1
+            in_flight, in_flight_requests = self._in_flight, self._in_flight_requests
+        ADMISSION_IN_FLIGHT.set(in_flight)
+        ADMISSION_IN_FLIGHT_REQUESTS.set(in_flight_requests)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'rate': self.rate,
+                'burst': self.burst,
+                'capacity': self.capacity,
+                'unit_bytes': self.unit_bytes,
+                'in_flight': self._in_flight,
+                'in_flight_requests': self._in_flight_requests,
+                'clients': len(self._buckets),
+                **self._counters
+            }
+
+    def _store_bucket(self, client: str, tokens: float, now: float):
+        # Chamado com o lock adquirido: clientes inativos há mais tempo saem primeiro
+        self._buckets[client] = (tokens, now)
+        while len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+
+# Instância global do controle de admissão
+admission_controller = AdmissionController()
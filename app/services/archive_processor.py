@@ -0,0 +1,205 @@
+from werkzeug.datastructures import FileStorage
+from app.services.file_processor import process_file
+from app.services.result_cache import classify_email_cached
+from app.services.response_format import json_encoder, shape_result
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from typing import BinaryIO, Dict, Iterator, Optional, Tuple
+import io
+import os
+import time
+import zipfile
+
+ARCHIVE_EXTENSIONS = {'.mbox', '.zip'}
+
+# Tipos de mensagem aceitos dentro de um .zip
+MESSAGE_EXTENSIONS = {'.eml', '.msg', '.txt', '.pdf'}
+
+# Mesmo limite por arquivo de /api/upload
+MAX_MESSAGE_BYTES = 5 * 1024 * 1024
+
+MAX_LINE_BYTES = 64 * 1024
+
+def validate_archive(file: FileStorage, max_size: int) -> Tuple[bool, str]:
+    """
+    Valida um upload de arquivo compactado (.mbox ou .zip)
+    Retorna: (é_válido, mensagem)
+    """
+    if not file or not file.filename:
+        return False, "Nenhum arquivo selecionado"
+
+    extension = os.path.splitext(file.filename)[1].lower()
+    if extension not in ARCHIVE_EXTENSIONS:
+        return False, f"Tipo de arquivo não suportado. Use: {', '.join(sorted(ARCHIVE_EXTENSIONS))}"
+
+    file.seek(0, 2)
+    file_size = file.tell()
+    file.seek(0)
+
+    if file_size > max_size:
+        return False, f"Arquivo muito grande. Máximo {max_size // (1024 * 1024)}MB"
+
+    if extension == '.zip' and not zipfile.is_zipfile(file.stream):
+        file.seek(0)
+        return False, "Arquivo .zip inválido"
+
+    file.seek(0)
+    return True, "Arquivo válido"
+
+def iter_mbox_messages(stream: BinaryIO, max_message_bytes: int = MAX_MESSAGE_BYTES) -> Iterator[Tuple[str, Optional[bytes], Optional[str]]]:
+    """
+    Percorre um mbox linha a linha, gerando uma mensagem por vez:
+    (nome, conteúdo, erro). Apenas a mensagem atual fica em memória;
+    mensagens acima do limite são descartadas sem bufferização.
+    """
+    buffer: Optional[bytearray] = None
+    oversized = False
+    index = 0
+
+    def finish():
+        name = f'message-{index:05d}.eml'
+        if oversized:
+            return name, None, f'Mensagem muito grande (máximo {max_message_bytes // (1024 * 1024)}MB)'
+        return name, bytes(buffer), None
+
+    while True:
+        line = stream.readline(MAX_LINE_BYTES)
+        if not line:
+            break
+
+        # Linha separadora "From " inicia uma nova mensagem
+        if line.startswith(b'From '):
+            if buffer is not None:
+                yield finish()
+            index += 1
+            buffer = bytearray()
+            oversized = False
+            continue
+
+        if buffer is None or oversized:
+            continue
+
+        # mboxrd: ">From " escapado no corpo volta a ser "From "
+        if line.startswith(b'>') and line.lstrip(b'>').startswith(b'From '):
+            line = line[1:]
+
+        buffer += line
+        if len(buffer) > max_message_bytes:
+            oversized = True
+            buffer = bytearray()
+
+    if buffer is not None:
+        yield finish()
+
+def iter_zip_messages(stream: BinaryIO, max_message_bytes: int = MAX_MESSAGE_BYTES) -> Iterator[Tuple[str, Optional[bytes], Optional[str]]]:
+    """
+    Percorre um .zip de mensagens, descompactando um membro por vez.
+    Membros de tipo não suportado ou acima do limite geram erro próprio.
+    """
+    with zipfile.ZipFile(stream) as archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+
+            name = info.filename
+            extension = os.path.splitext(name)[1].lower()
+            if extension not in MESSAGE_EXTENSIONS:
+                yield name, None, f'Tipo de arquivo não suportado no arquivo compactado: {extension or name}'
+                continue
+
+            if info.file_size > max_message_bytes:
+                yield name, None, f'Mensagem muito grande (máximo {max_message_bytes // (1024 * 1024)}MB)'
+                continue
+
+            # Lê no máximo limite + 1 byte: protege contra tamanhos declarados falsos
+            with archive.open(info) as member:
+                content = member.read(max_message_bytes + 1)
+            if len(content) > max_message_bytes:
+                yield name, None, f'Mensagem muito grande (máximo {max_message_bytes // (1024 * 1024)}MB)'
+                continue
+
+            yield name, content, None
+
+def classify_message(index: int, name: str, content: Optional[bytes], error: Optional[str],
+                     extract_options: Dict, word_boundary: bool = False, engine: str = 'keywords',
+                     early_exit: bool = False, near_duplicates: bool = False) -> Dict:
+    """
+    Classifica uma mensagem do arquivo compactado pelo mesmo caminho de
+    /api/upload: process_file + classify_email (com cache)
+    """
+    result = {'index': index, 'name': name}
+    if error:
+        result.update({'status': 'error', 'error': error})
+        return result
+
+    file_info = {'filename': name, 'size': len(content)}
+    storage = FileStorage(stream=io.BytesIO(content), filename=name)
+    try:
+        text = process_file(storage, file_info, **extract_options)
+        if not text or not text.strip():
+            result.update({'status': 'error', 'error': 'Não foi possível extrair texto da mensagem', 'file_info': file_info})
+            return result
+
+        result.update(classify_email_cached(
+            text.strip(), word_boundary=word_boundary, engine=engine, early_exit=early_exit,
+            near_duplicates=near_duplicates
+        ))
+        result['status'] = 'success'
+        result['file_info'] = file_info
+    except Exception as e:
+        result.update({'status': 'error', 'error': str(e), 'file_info': file_info})
+
+    return result
+
+def classify_archive(stream: BinaryIO, archive_type: str, extract_options: Dict = None,
+                     word_boundary: bool = False, parallel: int = 1, verbose: str = 'full',
+                     engine: str = 'keywords', early_exit: bool = False,
+                     near_duplicates: bool = False) -> Iterator[bytes]:
+    """
+    Classifica cada mensagem de um mbox ou zip e gera NDJSON: uma linha por
+    mensagem, na ordem do arquivo, e uma linha final de resumo.
+    Com parallel > 1, até esse número de mensagens é processado ao mesmo
+    tempo (útil com o pool de processos habilitado). verbose define o nível
+    de detalhe de cada resultado (ver response_format)
+    """
+    extract_options = extract_options or {}
+    messages = iter_mbox_messages(stream) if archive_type == '.mbox' else iter_zip_messages(stream)
+    summary = {'messages': 0, 'success': 0, 'failed': 0, 'classifications': {}}
+    started = time.perf_counter()
+
+    def record(result: Dict) -> bytes:
+        summary['messages'] += 1
+        if result['status'] == 'success':
+            summary['success'] += 1
+            classes = summary['classifications']
+            classes[result['classification']] = classes.get(result['classification'], 0) + 1
+            result = shape_result(result, verbose)
+        else:
+            summary['failed'] += 1
+        return json_encoder.dumps_line(result)
+
+    try:
+        if parallel > 1:
+            with ThreadPoolExecutor(max_workers=parallel) as pool:
+                window = deque()
+                for index, (name, content, error) in enumerate(messages, 1):
+                    window.append(pool.submit(
+                        classify_message, index, name, content, error, extract_options, word_boundary, engine,
+                        early_exit, near_duplicates
+                    ))
+                    if len(window) >= parallel:
+                        yield record(window.popleft().result())
+                while window:
+                    yield record(window.popleft().result())
+        else:
+            for index, (name, content, error) in enumerate(messages, 1):
+                yield record(classify_message(
+                    index, name, content, error, extract_options, word_boundary, engine, early_exit, near_duplicates
+                ))
+    except (zipfile.BadZipFile, OSError) as e:
+        summary['error'] = f'Arquivo compactado inválido: {str(e)}'
+
+    elapsed = time.perf_counter() - started
+    summary['elapsed_ms'] = round(elapsed * 1000, 2)
+    summary['messages_per_second'] = round(summary['messages'] / elapsed, 2) if elapsed > 0 else 0.0
+    yield json_encoder.dumps_line({'summary': summary})
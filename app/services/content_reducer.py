@@ -0,0 +1,123 @@
+from app.services.profiler import timed_stage
+from typing import Dict, Tuple
+import re
+
+# Um caractere da atribuição de resposta (pode quebrar linha, mas não em
+# linha em branco nem atravessar o "escreveu")
+_ATTRIBUTION_CHAR = r'(?:(?!escreveu|wrote)(?:[^\n]|\n(?![ \t]*\n)))'
+
+# A atribuição só é reconhecida com data/hora ou endereço <...@...>:
+# "Em anexo segue o que o gerente escreveu:" é conteúdo novo
+_ATTRIBUTION_EVIDENCE = (
+    r'(?:\d{1,2}[:h]\d{2}'
+    r'|\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4}'
+    r'|\d{4}-\d{2}-\d{2}'
+    r'|\d{1,2}º? de (?:jan|fev|mar|abr|mai|jun|jul|ago|set|out|nov|dez)'
+    r'|(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.? \d{1,2}\b'
+    r'|<[^<>@\s]+@[^<>\s]+>)'
+)
+
+# Trechos removidos antes do scoring, em uma única passada pelo texto.
+# Os marcadores de histórico (atribuição da resposta, mensagem original ou
+# encaminhada, bloco De/Enviado do Outlook e delimitador de assinatura)
+# cortam o texto até o fim quando já há conteúdo novo antes deles; no
+# início do texto (encaminhamento puro) só o marcador é removido
+REDUCTION_PATTERN = re.compile(
+    r'^(?:'
+    # "Em seg., 1 de jan. de 2024 às 10:00, Fulano <f@x.com> escreveu:" (pode quebrar linha)
+    rf'(?P<reply>[ \t]*(?:Em|On)\b{_ATTRIBUTION_CHAR}{{0,300}}?{_ATTRIBUTION_EVIDENCE}'
+    rf'{_ATTRIBUTION_CHAR}{{0,300}}?(?:escreveu|wrote)[ \t]*:[ \t]*(?:\n|\Z))'
+    r'|(?P<forwarded>[ \t]*-{3,}[ \t]*(?:Forwarded message|Mensagem encaminhada|Original Message|Mensagem original)'
+    r'[ \t]*-*[ \t]*(?:\n|\Z)'
+    r'(?:[ \t]*(?:From|To|Cc|Subject|Date|Sent|De|Para|Assunto|Data|Enviad[ao](?: em)?)[ \t]*:[^\n]*(?:\n|\Z))*)'
+    r'|(?P<outlook>[ \t]*(?:De|From)[ \t]*:[^\n]*\n[ \t]*(?:Enviad[ao](?: em)?|Sent|Data|Date)[ \t]*:[^\n]*(?:\n|\Z)'
+    r'(?:[ \t]*(?:To|Cc|Subject|Para|Assunto)[ \t]*:[^\n]*(?:\n|\Z))*)'
+    r'|(?P<signature>-- ?(?:\n|\Z))'
+    r'|(?P<quoted>[ \t]*>[^\n]*(?:\n|\Z))'
+    r'|(?P<mobile>[ \t]*(?:Enviado do meu|Enviado de meu|Sent from my|Get Outlook for)[^\n]*(?:\n|\Z))'
+    # Aviso legal: do início do aviso até a próxima linha em branco
+    r'|(?P<disclaimer>[ \t]*(?:AVISO LEGAL|AVISO DE CONFIDENCIALIDADE|DISCLAIMER|CONFIDENTIALITY NOTICE'
+    r'|Esta mensagem[^\n]{0,120}?(?:confidencia|sigilos|privilegiad)'
+    r'|Este e-?mail[^\n]{0,120}?(?:confidencia|sigilos|privilegiad)'
+    r'|This (?:e-?mail|message)[^\n]{0,120}?(?:confidential|privileged))'
+    r'[^\n]*(?:\n[ \t]*\S[^\n]*)*(?:\n|\Z))'
+    # Assunto: só o rótulo sai, o texto do assunto é sinal para a classificação
+    r'|(?P<subject>(?:Subject|Assunto)[ \t]*:[ \t]*)'
+    r'|(?P<headers>(?:From|To|Date|Cc|Bcc|Reply-To|Message-ID|Content-Type|Content-Transfer-Encoding'
+    r'|MIME-Version|X-[\w-]+|Received|Return-Path)[ \t]*:[^\n]*(?:\n|\Z)(?:[ \t]+\S[^\n]*(?:\n|\Z))*)'
+    r')',
+    re.IGNORECASE | re.MULTILINE
+)
+
+# Grupo do padrão -> categoria do relatório
+CATEGORIES = {
+    'reply': 'quoted',
+    'quoted': 'quoted',
+    'forwarded': 'forwarded',
+    'outlook': 'quoted',
+    'signature': 'signature',
+    'mobile': 'signature',
+    'disclaimer': 'disclaimer',
+    'subject': 'headers',
+    'headers': 'headers'
+}
+
+# Marcadores a partir dos quais o resto do texto é histórico ou assinatura
+CUT_GROUPS = {'reply', 'forwarded', 'outlook', 'signature'}
+
+@timed_stage('content_reduction')
+def reduce_content(text: str) -> Tuple[str, Dict]:
+    """
+    Remove headers, histórico citado, blocos encaminhados, assinaturas e
+    avisos legais antes da classificação: respostas em uma thread
+    costumam ser, em bytes, majoritariamente histórico já classificado.
+    Retorna (texto reduzido, relatório com os bytes removidos por categoria).
+    Se nada sobrar, o texto original é mantido (fallback)
+    """
+    if not text:
+        return text, _report(0, {}, False)
+
+    kept = []
+    removed: Dict[str, int] = {}
+    has_content = False
+    position = 0
+
+    for match in REDUCTION_PATTERN.finditer(text):
+        start = match.start()
+        if start > position:
+            segment = text[position:start]
+            kept.append(segment)
+            has_content = has_content or not segment.isspace()
+
+        group = match.lastgroup
+        if group in CUT_GROUPS and has_content:
+            _add(removed, CATEGORIES[group], text[start:])
+            position = len(text)
+            break
+        _add(removed, CATEGORIES[group], match.group())
+        position = match.end()
+
+    if position < len(text):
+        kept.append(text[position:])
+
+    reduced = ''.join(kept).strip()
+    original_bytes = _byte_length(text)
+    if not reduced:
+        return text, _report(original_bytes, {}, True)
+    return reduced, _report(original_bytes, removed, False)
+
+def _add(removed: Dict[str, int], category: str, segment: str):
+    removed[category] = removed.get(category, 0) + _byte_length(segment)
+
+def _byte_length(text: str) -> int:
+    return len(text.encode('utf-8', errors='surrogatepass'))
+
+def _report(original_bytes: int, removed: Dict[str, int], fallback: bool) -> Dict:
+    bytes_removed = sum(removed.values())
+    return {
+        'original_bytes': original_bytes,
+        'bytes_removed': bytes_removed,
+        'ratio': round(bytes_removed / original_bytes, 4) if original_bytes else 0.0,
+        'removed': removed,
+        'fallback': fallback
+    }
@@ -1,138 +1,455 @@
-from app.services.nlp_processor import nlp_processor
+from app.services.nlp_processor import nlp_processor, URGENCY_WORDS
+from app.services.keyword_matcher import KeywordMatcher, KeywordCounter
+from app.services.profiler import record_stage, profiled_stage
+import hashlib
+import json
 import re
-from typing import Dict, List
+import time
+from typing import Callable, Dict, List, Tuple
 
-def classify_email(text: str) -> Dict:
+PRODUTIVO_KEYWORDS = {
+    # Solicitações de suporte técnico
+    'suporte': 3, 'problema': 3, 'erro': 3, 'ajuda': 2, 'técnico': 2,
+    'falha': 3, 'bug': 3, 'não funciona': 4, 'não consigo': 3,
+    'solicitação': 2, 'urgente': 4, 'emergência': 4, 'crítico': 3,
+
+    # Atualizações sobre casos em aberto
+    'atualização': 2, 'status': 2, 'andamento': 2, 'progresso': 2,
+    'caso': 2, 'ticket': 2, 'protocolo': 2, 'número': 1,
+
+    # Dúvidas sobre o sistema
+    'dúvida': 2, 'duvida': 2, 'como': 1, 'onde': 1, 'quando': 1,
+    'porque': 2, 'não entendo': 3, 'não sei': 2, 'esclarecimento': 2,
+
+    # Palavras que indicam necessidade de ação
+    'preciso': 2, 'necessário': 2, 'gostaria': 2, 'poderia': 2,
+    'favor': 2, 'solicito': 3, 'peço': 2, 'orientação': 2,
+
+    # Contexto de negócios/trabalho
+    'projeto': 2, 'cliente': 2, 'contrato': 2, 'proposta': 2,
+    'reunião': 2, 'meeting': 2, 'deadline': 3, 'prazo': 3,
+    'entrega': 2, 'resultado': 1, 'relatório': 2, 'dados': 1,
+
+    # Operações bancárias críticas
+    'conta': 3, 'saldo': 4, 'transferência': 4, 'pix': 3, 'ted': 3, 'doc': 3,
+    'saque': 3, 'depósito': 3, 'cartão': 3, 'débito': 3, 'crédito': 3,
+    'limite': 4, 'aprovação': 3, 'liberação': 4, 'bloqueio': 4, 'desbloqueio': 4,
+
+    # Empréstimos e financiamentos
+    'empréstimo': 4, 'financiamento': 4, 'crediário': 3, 'parcela': 3,
+    'juros': 4, 'taxa': 3, 'amortização': 3, 'refinanciamento': 4,
+    'quitação': 4, 'liquidação': 4, 'renegociação': 4, 'acordo': 4,
+
+    # Investimentos
+    'investimento': 3, 'aplicação': 3, 'resgate': 4, 'rentabilidade': 3,
+    'cdb': 3, 'lci': 3, 'lca': 3, 'fundo': 3, 'poupança': 3,
+    'tesouro': 3, 'ações': 3, 'bolsa': 3, 'corretora': 3,
+
+    # Documentação financeira
+    'comprovante': 3, 'extrato': 4, 'fatura': 4, 'boleto': 4,
+    'declaração': 3, 'imposto de renda': 4, 'ir': 3, 'cpf': 2, 'cnpj': 2,
+    'receita federal': 3, 'informe': 3, 'rendimentos': 4,
+
+    # Problemas críticos financeiros
+    'contestação': 4, 'cobrança indevida': 5, 'fraude': 5, 'golpe': 5,
+    'segurança': 4, 'hackeado': 5, 'clonagem': 5, 'phishing': 5,
+    'não reconheço': 5, 'compra não autorizada': 5, 'disputa': 4,
+
+    # Atendimento especializado
+    'gerente': 3, 'assessor': 3, 'consultoria': 3, 'private': 4,
+    'personalité': 4, 'select': 3, 'premium': 3, 'vip': 3,
+
+    # Regulamentação e compliance
+    'bacen': 4, 'banco central': 4, 'cvm': 3, 'susep': 3,
+    'compliance': 4, 'auditoria': 3, 'regulamento': 3, 'norma': 2,
+
+    # Urgências financeiras específicas
+    'vencimento': 4, 'inadimplência': 5, 'negativação': 5, 'spc': 4, 'serasa': 4,
+    'protesto': 5, 'execução': 5, 'cobrança judicial': 5, 'advogado': 4
+}
+
+IMPRODUTIVO_KEYWORDS = {
+    # Mensagens de felicitações
+    'parabéns': 3, 'felicitações': 3, 'aniversário': 2, 'festa': 2,
+    'celebração': 2, 'sucesso': 1, 'conquista': 2, 'vitória': 2,
+
+    # Agradecimentos genéricos
+    'obrigado': 1, 'obrigada': 1, 'agradecimento': 2, 'agradeço': 2,
+    'muito obrigado': 2, 'grato': 1, 'gratidão': 2,
+
+    # Comunicações informativas sem ação necessária
+    'informação': 1, 'informo': 1, 'fyi': 2, 'para conhecimento': 3,
+    'apenas informando': 3, 'comunicado': 1, 'newsletter': 2,
+    'novidades': 1, 'notícias': 1,
+
+    # Saudações/despedidas longas
+    'feliz natal': 2, 'boas festas': 2, 'ano novo': 2, 'feriado': 1,
+    'desejo': 1, 'votos': 1, 'boa sorte': 2, 'tudo de bom': 2,
+
+    # Spam/Marketing (geralmente improdutivos para o trabalho)
+    'promoção': 2, 'desconto': 2, 'oferta': 1, 'grátis': 2,
+    'clique aqui': 3, 'inscreva-se': 2, 'cadastre-se': 2,
+
+    # Marketing financeiro genérico
+    'campanha': 2, 'promoção especial': 3, 'taxa zero': 2,
+    'sem anuidade': 2, 'cashback': 1, 'milhas': 1, 'pontos': 1,
+    'benefícios': 1, 'vantagens': 1, 'exclusivo': 1,
+
+    # Comunicados informativos que não requerem ação
+    'comunicado bacen': 1, 'mudança de regulamento': 1,
+    'nova política': 1, 'atualização de termos': 1,
+    'para seu conhecimento': 3, 'informativo mensal': 2,
+
+    # Convites para eventos/webinars
+    'webinar': 2, 'palestra': 2, 'seminário': 2, 'workshop': 2,
+    'evento': 2, 'convite': 2, 'participação': 1, 'inscrição': 1,
+
+    # Pesquisas de satisfação
+    'pesquisa': 2, 'satisfação': 2, 'avaliação': 2, 'nota': 1,
+    'opinião': 2, 'feedback': 2, 'experiência': 1,
+
+    # Comunicados de manutenção/atualização não urgentes
+    'manutenção programada': 1, 'atualização de sistema': 1,
+    'melhorias': 1, 'nova funcionalidade': 1, 'upgrade': 1
+}
+
+# Autômato compilado uma vez na importação: produtivo e improdutivo em uma passada
+keyword_matcher = KeywordMatcher({
+    'produtivo': PRODUTIVO_KEYWORDS,
+    'improdutivo': IMPRODUTIVO_KEYWORDS
+})
+
+# Versão do léxico: muda sempre que palavras-chave ou pesos mudam,
+# invalidando resultados em cache calculados com o léxico anterior
+LEXICON_VERSION = hashlib.sha1(json.dumps(
+    [PRODUTIVO_KEYWORDS, IMPRODUTIVO_KEYWORDS, URGENCY_WORDS],
+    sort_keys=True, ensure_ascii=False
+).encode('utf-8')).hexdigest()[:12]
+
+# Confiança: 70% de base + 2 pontos por ponto de diferença, limitada a 95%
+BASE_CONFIDENCE = 70.0
+MAX_CONFIDENCE = 95.0
+CONFIDENCE_PER_POINT = 2
+
+# Diferença de score a partir da qual a confiança já está no máximo
+SATURATION_GAP = (MAX_CONFIDENCE - BASE_CONFIDENCE) / CONFIDENCE_PER_POINT
+
+# Scoring incremental (early_exit): o texto é lido em trechos de até
+# EARLY_EXIT_CHUNK_CHARS caracteres, cortados em espaço ou quebra de linha
+EARLY_EXIT_CHUNK_CHARS = 2048
+
+# Cortes possíveis entre trechos: espaço que não separa dígitos (um
+# telefone como "(11) 98765 4321" tem espaços e é removido como ruído inteiro)
+CHUNK_CUT_PATTERN = re.compile(r'(?<![\d)])\s(?![\d(])')
+
+# Ajustes de _decision_scores que ainda podem favorecer o lado perdedor
+# depois de um trecho: URLs (+2) e texto longo (+1) para improdutivo;
+# pergunta (+3), exclamação (+1), perda do bônus de texto longo (+1) e
+# de texto curto (+2) para produtivo
+MAX_LATE_ADJUSTMENT = {'produtivo': 7, 'improdutivo': 3}
+
+@profiled_stage('classify_email')
+def classify_email(text: str, word_boundary: bool = False, early_exit: bool = False) -> Dict:
+    """
+    Classifica um email. Com early_exit=True, textos longos são pontuados
+    em trechos e a leitura para quando a decisão (classificação e
+    confiança limitada) está saturada; analysis.input_consumed informa
+    quanto do texto foi lido
+    """
     if not text or not text.strip():
-        return {
-            'classification': 'Improdutivo',
-            'confidence': 70.0,
-            'suggestions': get_suggestions('Improdutivo'),
-            'analysis': {
-                'reason': 'Texto vazio ou muito curto'
-            }
-        }
+        return _empty_result()
     
-    features = nlp_processor.extract_features(text)
-    processed_text = features['processed_text']
+    if early_exit:
+        return _classify_incremental(text, word_boundary)
     
-    produtivo_keywords = {
-        # Solicitações de suporte técnico
-        'suporte': 3, 'problema': 3, 'erro': 3, 'ajuda': 2, 'técnico': 2,
-        'falha': 3, 'bug': 3, 'não funciona': 4, 'não consigo': 3,
-        'solicitação': 2, 'urgente': 4, 'emergência': 4, 'crítico': 3,
-        
-        # Atualizações sobre casos em aberto
-        'atualização': 2, 'status': 2, 'andamento': 2, 'progresso': 2,
-        'caso': 2, 'ticket': 2, 'protocolo': 2, 'número': 1,
-        
-        # Dúvidas sobre o sistema
-        'dúvida': 2, 'duvida': 2, 'como': 1, 'onde': 1, 'quando': 1,
-        'porque': 2, 'não entendo': 3, 'não sei': 2, 'esclarecimento': 2,
-        
-        # Palavras que indicam necessidade de ação
-        'preciso': 2, 'necessário': 2, 'gostaria': 2, 'poderia': 2,
-        'favor': 2, 'solicito': 3, 'peço': 2, 'orientação': 2,
-        
-        # Contexto de negócios/trabalho
-        'projeto': 2, 'cliente': 2, 'contrato': 2, 'proposta': 2,
-        'reunião': 2, 'meeting': 2, 'deadline': 3, 'prazo': 3,
-        'entrega': 2, 'resultado': 1, 'relatório': 2, 'dados': 1,
-        
-        # Operações bancárias críticas
-        'conta': 3, 'saldo': 4, 'transferência': 4, 'pix': 3, 'ted': 3, 'doc': 3,
-        'saque': 3, 'depósito': 3, 'cartão': 3, 'débito': 3, 'crédito': 3,
-        'limite': 4, 'aprovação': 3, 'liberação': 4, 'bloqueio': 4, 'desbloqueio': 4,
-        
-        # Empréstimos e financiamentos
-        'empréstimo': 4, 'financiamento': 4, 'crediário': 3, 'parcela': 3,
-        'juros': 4, 'taxa': 3, 'amortização': 3, 'refinanciamento': 4,
-        'quitação': 4, 'liquidação': 4, 'renegociação': 4, 'acordo': 4,
-        
-        # Investimentos
-        'investimento': 3, 'aplicação': 3, 'resgate': 4, 'rentabilidade': 3,
-        'cdb': 3, 'lci': 3, 'lca': 3, 'fundo': 3, 'poupança': 3,
-        'tesouro': 3, 'ações': 3, 'bolsa': 3, 'corretora': 3,
-        
-        # Documentação financeira
-        'comprovante': 3, 'extrato': 4, 'fatura': 4, 'boleto': 4,
-        'declaração': 3, 'imposto de renda': 4, 'ir': 3, 'cpf': 2, 'cnpj': 2,
-        'receita federal': 3, 'informe': 3, 'rendimentos': 4,
-        
-        # Problemas críticos financeiros
-        'contestação': 4, 'cobrança indevida': 5, 'fraude': 5, 'golpe': 5,
-        'segurança': 4, 'hackeado': 5, 'clonagem': 5, 'phishing': 5,
-        'não reconheço': 5, 'compra não autorizada': 5, 'disputa': 4,
-        
-        # Atendimento especializado
-        'gerente': 3, 'assessor': 3, 'consultoria': 3, 'private': 4,
-        'personalité': 4, 'select': 3, 'premium': 3, 'vip': 3,
-        
-        # Regulamentação e compliance
-        'bacen': 4, 'banco central': 4, 'cvm': 3, 'susep': 3,
-        'compliance': 4, 'auditoria': 3, 'regulamento': 3, 'norma': 2,
-        
-        # Urgências financeiras específicas
-        'vencimento': 4, 'inadimplência': 5, 'negativação': 5, 'spc': 4, 'serasa': 4,
-        'protesto': 5, 'execução': 5, 'cobrança judicial': 5, 'advogado': 4
+    features, keyword_counts, urgency_score = _extract_signals(text, word_boundary)
+    keyword_scores = keyword_matcher.score(keyword_counts)
+    
+    return _build_result(features, keyword_scores, urgency_score)
+
+@profiled_stage('classify_batch')
+def classify_batch(texts: List[str], word_boundary: bool = False, early_exit: bool = False) -> List[Dict]:
+    """
+    Classifica um lote de emails preservando a ordem de entrada.
+    A extração é feita por email; o score das palavras-chave é calculado de
+    uma vez para o lote todo (matriz de contagens x vetor de pesos).
+    Com early_exit=True, textos longos usam o scoring incremental.
+    Falhas são isoladas por item: retornam {'status': 'error', 'error': ...}
+    """
+    results: List[Dict] = [None] * len(texts)
+    extracted = []
+    
+    for index, text in enumerate(texts):
+        if not text or not text.strip():
+            results[index] = _empty_result()
+            continue
+        try:
+            if early_exit:
+                results[index] = _classify_incremental(text, word_boundary)
+            else:
+                extracted.append((index,) + _extract_signals(text, word_boundary))
+        except Exception as e:
+            results[index] = {'status': 'error', 'error': str(e)}
+    
+    # Scoring vetorizado sobre o lote inteiro
+    count_matrix = [keyword_counts for _, _, keyword_counts, _ in extracted]
+    score_rows = keyword_matcher.score_matrix(count_matrix)
+    
+    for (index, features, _, urgency_score), keyword_scores in zip(extracted, score_rows):
+        try:
+            results[index] = _build_result(features, keyword_scores, urgency_score)
+        except Exception as e:
+            results[index] = {'status': 'error', 'error': str(e)}
+    
+    return results
+
+def validate_text(text) -> str:
+    """
+    Valida um texto de email com as regras de /api/classify
+    Retorna a mensagem de erro ou string vazia se válido
+    """
+    if not isinstance(text, str):
+        return 'Campo "text" deve ser uma string'
+    
+    text = text.strip()
+    if not text:
+        return 'Texto não pode estar vazio'
+    
+    # Limitar tamanho do texto (50KB)
+    if len(text) > 50000:
+        return 'Texto muito longo (máximo 50KB)'
+    
+    return ''
+
+def make_saturation_check() -> Callable[[str], bool]:
+    """
+    Cria um verificador incremental para extratores que leem o conteúdo em
+    partes (ex.: páginas de PDF): cada chamada recebe o próximo trecho e
+    retorna True quando a diferença entre os scores de palavras-chave
+    acumulados já garante a confiança máxima
+    """
+    totals = {'produtivo': 0, 'improdutivo': 0}
+    
+    def add_chunk(chunk: str) -> bool:
+        scores = keyword_matcher.scan(nlp_processor.preprocess_text(chunk))
+        totals['produtivo'] += scores['produtivo']
+        totals['improdutivo'] += scores['improdutivo']
+        return abs(totals['produtivo'] - totals['improdutivo']) >= SATURATION_GAP
+    
+    return add_chunk
+
+def delta_signals(text: str, word_boundary: bool = False) -> Dict:
+    """
+    Sinais compactos de um trecho (ex.: a parte nova de uma resposta em uma
+    thread): contagens de palavras-chave, flags, contagens de palavras e
+    pontos de urgência. Sinais de trechos consecutivos são somados com
+    merge_signals e classificados com classify_signals, sem guardar o texto
+    """
+    normalized = nlp_processor.normalize(text, word_boundary)
+    started = time.perf_counter()
+    keyword_counts = keyword_matcher.count(normalized['processed_text'], word_boundary)
+    record_stage('keyword_scoring', time.perf_counter() - started)
+    relevant_words = [
+        word for word in normalized['tokens']
+        if word not in nlp_processor.stop_words and len(word) > 2
+    ]
+    return {
+        'keyword_counts': keyword_counts,
+        'word_count': normalized['word_count'],
+        'char_count': normalized['char_count'],
+        'relevant_words': len(relevant_words),
+        'key_words': relevant_words[:15],
+        'has_questions': normalized['has_questions'],
+        'has_exclamations': normalized['has_exclamations'],
+        'has_urls': normalized['has_urls'],
+        'has_emails': normalized['has_emails'],
+        'urgency_points': normalized['urgency_points']
+    }
+
+def merge_signals(total: Dict, delta: Dict) -> Dict:
+    """
+    Soma os sinais de um novo trecho aos acumulados (como se os trechos
+    tivessem sido classificados juntos)
+    """
+    keyword_counts = dict(total['keyword_counts'])
+    for pattern_id, count in delta['keyword_counts'].items():
+        keyword_counts[pattern_id] = keyword_counts.get(pattern_id, 0) + count
+    return {
+        'keyword_counts': keyword_counts,
+        'word_count': total['word_count'] + delta['word_count'],
+        'char_count': total['char_count'] + delta['char_count'],
+        'relevant_words': total['relevant_words'] + delta['relevant_words'],
+        'key_words': (total['key_words'] + delta['key_words'])[:15],
+        'has_questions': total['has_questions'] or delta['has_questions'],
+        'has_exclamations': total['has_exclamations'] or delta['has_exclamations'],
+        'has_urls': total['has_urls'] or delta['has_urls'],
+        'has_emails': total['has_emails'] or delta['has_emails'],
+        'urgency_points': total['urgency_points'] + delta['urgency_points']
     }
+
+def classify_signals(signals: Dict) -> Dict:
+    """
+    Classifica sinais acumulados (delta_signals/merge_signals). As features
+    não incluem processed_text: o texto não é guardado
+    """
+    if not signals['word_count']:
+        return _empty_result()
     
-    improdutivo_keywords = {
-        # Mensagens de felicitações
-        'parabéns': 3, 'felicitações': 3, 'aniversário': 2, 'festa': 2,
-        'celebração': 2, 'sucesso': 1, 'conquista': 2, 'vitória': 2,
-        
-        # Agradecimentos genéricos
-        'obrigado': 1, 'obrigada': 1, 'agradecimento': 2, 'agradeço': 2,
-        'muito obrigado': 2, 'grato': 1, 'gratidão': 2,
-        
-        # Comunicações informativas sem ação necessária
-        'informação': 1, 'informo': 1, 'fyi': 2, 'para conhecimento': 3,
-        'apenas informando': 3, 'comunicado': 1, 'newsletter': 2,
-        'novidades': 1, 'notícias': 1,
-        
-        # Saudações/despedidas longas
-        'feliz natal': 2, 'boas festas': 2, 'ano novo': 2, 'feriado': 1,
-        'desejo': 1, 'votos': 1, 'boa sorte': 2, 'tudo de bom': 2,
-        
-        # Spam/Marketing (geralmente improdutivos para o trabalho)
-        'promoção': 2, 'desconto': 2, 'oferta': 1, 'grátis': 2,
-        'clique aqui': 3, 'inscreva-se': 2, 'cadastre-se': 2,
-        
-        # Marketing financeiro genérico
-        'campanha': 2, 'promoção especial': 3, 'taxa zero': 2,
-        'sem anuidade': 2, 'cashback': 1, 'milhas': 1, 'pontos': 1,
-        'benefícios': 1, 'vantagens': 1, 'exclusivo': 1,
-        
-        # Comunicados informativos que não requerem ação
-        'comunicado bacen': 1, 'mudança de regulamento': 1,
-        'nova política': 1, 'atualização de termos': 1,
-        'para seu conhecimento': 3, 'informativo mensal': 2,
+    features = {
+        name: signals[name]
+        for name in ('word_count', 'char_count', 'relevant_words', 'has_questions',
+                     'has_exclamations', 'has_urls', 'has_emails', 'key_words')
+    }
+    return _build_result(features, keyword_matcher.score(signals['keyword_counts']), int(signals['urgency_points']))
+
+def empty_signals() -> Dict:
+    return {
+        'keyword_counts': {},
+        'word_count': 0,
+        'char_count': 0,
+        'relevant_words': 0,
+        'key_words': [],
+        'has_questions': False,
+        'has_exclamations': False,
+        'has_urls': False,
+        'has_emails': False,
+        'urgency_points': 0.0
+    }
+
+def _empty_result() -> Dict:
+    return {
+        'classification': 'Improdutivo',
+        'confidence': 70.0,
+        'suggestions': get_suggestions('Improdutivo'),
+        'analysis': {
+            'reason': 'Texto vazio ou muito curto'
+        }
+    }
+
+def _extract_signals(text: str, word_boundary: bool) -> Tuple[Dict, Dict[int, int], int]:
+    """
+    Extrai features, contagens de palavras-chave e score de urgência de um email
+    """
+    # Normalização única compartilhada por features, palavras-chave e urgência
+    normalized = nlp_processor.normalize(text, word_boundary)
+    features = nlp_processor.extract_features(text, normalized)
+    started = time.perf_counter()
+    keyword_counts = keyword_matcher.count(normalized['processed_text'], word_boundary)
+    record_stage('keyword_scoring', time.perf_counter() - started)
+    urgency_score = nlp_processor.calculate_urgency_score(text, word_boundary, normalized)
+    return features, keyword_counts, urgency_score
+
+def _classify_incremental(text: str, word_boundary: bool, chunk_chars: int = EARLY_EXIT_CHUNK_CHARS,
+                          stop_early: bool = True) -> Dict:
+    """
+    Scoring incremental: normaliza e pontua um trecho por vez. As contagens
+    de palavras-chave e de urgência continuam de um trecho para o outro
+    (KeywordCounter), então o resultado lido até o fim é o mesmo da leitura
+    completa. Para antes do fim (early_exit = 'bounded') só quando nem o
+    máximo que o restante do texto poderia somar ao lado perdedor muda a
+    classificação ou a confiança (limitada em 95%)
+    """
+    total_chars = len(text)
+    consumed = 0
+    reason = None
+    keywords = KeywordCounter(keyword_matcher, word_boundary)
+    urgency = KeywordCounter(nlp_processor.urgency_matcher, word_boundary)
+    exclamations = 0
+    chunks: List[Dict] = []
+    # Apenas o que _decision_scores usa, acumulado trecho a trecho
+    partial = {'has_questions': False, 'has_exclamations': False, 'has_urls': False, 'word_count': 0, 'key_words': []}
+    
+    for chunk in _iter_chunks(text, chunk_chars):
+        normalized = nlp_processor.normalize(chunk, word_boundary, urgency=False)
+        started = time.perf_counter()
+        processed_text = normalized['processed_text']
+        # processed_text do texto inteiro junta os tokens de todos os trechos com espaço
+        if processed_text and keywords.length:
+            processed_text = ' ' + processed_text
+        keywords.feed(processed_text)
+        record_stage('keyword_scoring', time.perf_counter() - started)
+        started = time.perf_counter()
+        urgency.feed(normalized['lower_text'])
+        exclamations += normalized['exclamation_count']
+        record_stage('urgency', time.perf_counter() - started)
         
-        # Convites para eventos/webinars
-        'webinar': 2, 'palestra': 2, 'seminário': 2, 'workshop': 2,
-        'evento': 2, 'convite': 2, 'participação': 1, 'inscrição': 1,
+        chunks.append(normalized)
+        consumed += len(chunk)
+        remaining = total_chars - consumed
+        if not remaining or not stop_early:
+            continue
         
-        # Pesquisas de satisfação
-        'pesquisa': 2, 'satisfação': 2, 'avaliação': 2, 'nota': 1,
-        'opinião': 2, 'feedback': 2, 'experiência': 1,
+        for flag in ('has_questions', 'has_exclamations', 'has_urls'):
+            partial[flag] = partial[flag] or normalized[flag]
+        partial['word_count'] += normalized['word_count']
+        if len(partial['key_words']) < 15:
+            partial['key_words'].extend(nlp_processor.remove_stop_words(normalized['processed_text'])[:15])
         
-        # Comunicados de manutenção/atualização não urgentes
-        'manutenção programada': 1, 'atualização de sistema': 1,
-        'melhorias': 1, 'nova funcionalidade': 1, 'upgrade': 1
-    }
-    
-    produtivo_score = 0
-    improdutivo_score = 0
-    
-    # Calcular scores baseados nas palavras-chave
-    for keyword, weight in produtivo_keywords.items():
-        count = processed_text.count(keyword)
-        produtivo_score += count * weight
+        urgency_points = nlp_processor.urgency_points_from_counts(urgency.counts, exclamations)
+        produtivo, improdutivo, _ = _decision_scores(partial, keyword_matcher.score(keywords.counts), int(urgency_points))
+        gap = abs(produtivo - improdutivo)
+        loser = 'improdutivo' if produtivo >= improdutivo else 'produtivo'
+        # +2: o espaço entre trechos e as ocorrências no fim do trecho que
+        # ainda dependem do próximo caractere (word_boundary)
+        if gap - _max_gain(loser, remaining + 2) >= SATURATION_GAP:
+            reason = 'bounded'
+            break
     
-    for keyword, weight in improdutivo_keywords.items():
-        count = processed_text.count(keyword)
-        improdutivo_score += count * weight
+    urgency_points = nlp_processor.urgency_points_from_counts(urgency.finish(), exclamations)
+    normalized = nlp_processor.merge_normalized(chunks)
+    normalized['urgency_points'] = urgency_points
+    normalized['urgency_score'] = int(urgency_points)
+    features = nlp_processor.extract_features(text, normalized)
+    result = _build_result(features, keyword_matcher.score(keywords.finish()), int(urgency_points))
+    result['analysis']['input_consumed'] = {
+        'chars': consumed,
+        'total_chars': total_chars,
+        'ratio': round(consumed / total_chars, 4) if total_chars else 1.0,
+        'early_exit': reason
+    }
+    return result
+
+def _iter_chunks(text: str, size: int):
+    """
+    Divide o texto em trechos de cerca de size caracteres, cortando no
+    último espaço (ou quebra de linha) da segunda metade do trecho, para que
+    a tokenização de cada trecho seja a mesma do texto inteiro. Sem corte
+    possível, o trecho vai até o próximo
+    """
+    start = 0
+    length = len(text)
+    while start < length:
+        end = start + size
+        if end < length:
+            cut = None
+            # endpos + 1: o lookahead do último espaço precisa ver o caractere seguinte
+            for match in CHUNK_CUT_PATTERN.finditer(text, start + size // 2, end + 1):
+                if match.start() < end:
+                    cut = match
+            if cut is None:
+                cut = CHUNK_CUT_PATTERN.search(text, end)
+            end = cut.end() if cut is not None else length
+        yield text[start:end]
+        start = end
+
+def _max_gain(group: str, remaining_chars: int) -> float:
+    """
+    Limite superior do que remaining_chars caracteres ainda podem somar ao
+    score do grupo: peso máximo por caractere das palavras-chave (e, para
+    produtivo, urgência x2 e exclamações) mais os ajustes tardios
+    """
+    per_char = keyword_matcher.max_weight_per_char[group]
+    if group == 'produtivo':
+        per_char += 2 * nlp_processor.urgency_matcher.max_weight_per_char['urgency'] + 1
+    return remaining_chars * per_char + MAX_LATE_ADJUSTMENT[group]
+
+def _decision_scores(features: Dict, keyword_scores: Dict[str, int], urgency_score: int) -> Tuple[int, int, int]:
+    """
+    Scores finais de produtivo e improdutivo: palavras-chave mais os ajustes
+    por características do texto e urgência
+    """
+    produtivo_score = keyword_scores['produtivo']
+    improdutivo_score = keyword_scores['improdutivo']
     
     # Análise adicional de características do texto
     if features['has_questions']:
@@ -154,22 +471,27 @@ def classify_email(text: str) -> Dict:
         improdutivo_score += 1
     
     # Score de urgência
-    urgency_score = nlp_processor.calculate_urgency_score(text)
     produtivo_score += urgency_score * 2
     
+    return produtivo_score, improdutivo_score, urgency_score
+
+@profiled_stage('decision')
+def _build_result(features: Dict, keyword_scores: Dict[str, int], urgency_score: int) -> Dict:
+    produtivo_score, improdutivo_score, urgency_score = _decision_scores(features, keyword_scores, urgency_score)
+    
     # Determinar classificação
     if produtivo_score > improdutivo_score:
         classification = 'Produtivo'
-        confidence = min(95.0, 70.0 + (produtivo_score - improdutivo_score) * 2)
+        confidence = min(MAX_CONFIDENCE, BASE_CONFIDENCE + (produtivo_score - improdutivo_score) * CONFIDENCE_PER_POINT)
         reason = f"Score produtivo: {produtivo_score} > improdutivo: {improdutivo_score}"
     elif improdutivo_score > produtivo_score:
         classification = 'Improdutivo'
-        confidence = min(95.0, 70.0 + (improdutivo_score - produtivo_score) * 2)
+        confidence = min(MAX_CONFIDENCE, BASE_CONFIDENCE + (improdutivo_score - produtivo_score) * CONFIDENCE_PER_POINT)
         reason = f"Score improdutivo: {improdutivo_score} > produtivo: {produtivo_score}"
     else:
         # Em caso de empate, considerar produtivo (melhor pecar por excesso)
         classification = 'Produtivo'
-        confidence = 70.0
+        confidence = BASE_CONFIDENCE
         reason = "Empate nos scores - classificado como produtivo por precaução"
     
     suggestions = get_suggestions(classification)
@@ -190,24 +512,31 @@ def classify_email(text: str) -> Dict:
         }
     }
 
+# Sugestões de resposta por categoria. São estáticas: as rotas enviam a
+# versão pré-serializada (ver response_format.STATIC_SUGGESTIONS)
+SUGGESTIONS = {
+    'Produtivo': [
+        "Recebido! Vou analisar sua solicitação financeira e retorno em breve.",
+        "Obrigado pelo contato. Sua demanda será encaminhada para a área responsável.",
+        "Entendi a situação. Vou verificar em nossos sistemas e te dar um retorno.",
+        "Sua solicitação foi registrada em nosso sistema. Acompanharei o andamento.",
+        "Vou encaminhar para nossa equipe financeira e manter você informado sobre o progresso.",
+        "Caso seja urgente, entre em contato com nossa central de atendimento: 0800-XXX-XXXX"
+    ],
+    'Improdutivo': [
+        "Obrigado pela mensagem!",
+        "Recebido, muito obrigado pelo contato.",
+        "Agradeço o compartilhamento da informação.",
+        "Obrigado por manter-me informado sobre essa atualização.",
+        "Recebido com sucesso, agradeço pelo comunicado!"
+    ]
+}
+
 def get_suggestions(classification: str) -> List[str]:
     if classification == 'Produtivo':
-        return [
-            "Recebido! Vou analisar sua solicitação financeira e retorno em breve.",
-            "Obrigado pelo contato. Sua demanda será encaminhada para a área responsável.",
-            "Entendi a situação. Vou verificar em nossos sistemas e te dar um retorno.",
-            "Sua solicitação foi registrada em nosso sistema. Acompanharei o andamento.",
-            "Vou encaminhar para nossa equipe financeira e manter você informado sobre o progresso.",
-            "Caso seja urgente, entre em contato com nossa central de atendimento: 0800-XXX-XXXX"
-        ]
+        return list(SUGGESTIONS['Produtivo'])
     else: 
-        return [
-            "Obrigado pela mensagem!",
-            "Recebido, muito obrigado pelo contato.",
-            "Agradeço o compartilhamento da informação.",
-            "Obrigado por manter-me informado sobre essa atualização.",
-            "Recebido com sucesso, agradeço pelo comunicado!"
-        ]
+        return list(SUGGESTIONS['Improdutivo'])
 
 def test_classifier():
     test_cases = [
@@ -0,0 +1,247 @@
+from email import policy
+from email.parser import BytesHeaderParser
+from html.parser import HTMLParser
+from typing import BinaryIO, Dict, List, Optional, Tuple
+import base64
+import binascii
+import codecs
+import quopri
+import re
+
+# Linhas maiores que isso são lidas em pedaços (RFC 5322 limita a 998 bytes)
+MAX_LINE_BYTES = 64 * 1024
+
+# Limite dos headers de cada parte MIME
+MAX_HEADER_BYTES = 64 * 1024
+
+# Orçamento padrão de bytes de corpo de texto coletados por email
+DEFAULT_BODY_BUDGET = 64 * 1024
+
+HEADER_LINE_PATTERN = re.compile(rb'^[!-9;-~]+:')
+
+class _BudgetReached(Exception):
+    """Interrompe a leitura assim que o orçamento de corpo é atingido"""
+
+class _HTMLTextExtractor(HTMLParser):
+    """Extrai o texto visível de partes text/html, ignorando script/style"""
+
+    BLOCK_TAGS = {'br', 'p', 'div', 'tr', 'li', 'h1', 'h2', 'h3', 'h4', 'table'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ('script', 'style'):
+            self._skip_depth += 1
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_endtag(self, tag):
+        if tag in ('script', 'style') and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.parts.append(data)
+
+def strip_html(html: str) -> str:
+    extractor = _HTMLTextExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return ''.join(extractor.parts)
+
+class EmlStreamParser:
+    """
+    Leitura em streaming de arquivos .eml (MIME).
+    Percorre o upload linha a linha: apenas os headers de cada parte são
+    interpretados, somente partes text/plain (ou text/html, como fallback)
+    são bufferizadas e decodificadas com o charset declarado; anexos são
+    descartados linha a linha. A leitura para ao atingir o orçamento de bytes.
+    """
+
+    def __init__(self, stream: BinaryIO, body_budget: int = DEFAULT_BODY_BUDGET):
+        self.stream = stream
+        self.body_budget = body_budget
+        self.collected = 0
+        self.plain_parts: List[str] = []
+        self.html_parts: List[str] = []
+        self.info = {
+            'parser': 'eml',
+            'parts': 0,
+            'text_parts': 0,
+            'skipped_parts': 0,
+            'bytes_read': 0,
+            'truncated': False
+        }
+
+    def parse(self) -> Tuple[Optional[str], Dict]:
+        """
+        Retorna (texto, informações). Texto None indica que o arquivo não
+        começa com headers de email (deve ser lido como texto simples)
+        """
+        first_line = self._peek_first_line()
+        if not HEADER_LINE_PATTERN.match(first_line):
+            return None, self.info
+
+        headers = self._read_headers()
+        subject = str(headers.get('Subject', '') or '').strip()
+
+        try:
+            self._process_entity(headers, [])
+        except _BudgetReached:
+            self.info['truncated'] = True
+
+        if self.plain_parts:
+            body = '\n'.join(self.plain_parts)
+        else:
+            body = '\n'.join(strip_html(html) for html in self.html_parts)
+
+        text = f"{subject}\n\n{body}" if subject else body
+        return text, self.info
+
+    def _peek_first_line(self) -> bytes:
+        position = self.stream.tell()
+        line = self.stream.readline(MAX_LINE_BYTES)
+        self.stream.seek(position)
+        return line
+
+    def _readline(self) -> bytes:
+        line = self.stream.readline(MAX_LINE_BYTES)
+        self.info['bytes_read'] += len(line)
+        return line
+
+    def _read_headers(self):
+        """
+        Lê o bloco de headers até a linha em branco e interpreta com o
+        parser de headers da stdlib (decodifica RFC 2047, parâmetros etc.)
+        """
+        header_bytes = bytearray()
+        while True:
+            line = self._readline()
+            if not line or line in (b'\r\n', b'\n'):
+                break
+            if len(header_bytes) < MAX_HEADER_BYTES:
+                header_bytes += line
+        return BytesHeaderParser(policy=policy.default).parsebytes(bytes(header_bytes))
+
+    def _match_boundary(self, line: bytes, boundaries: List[bytes]) -> Optional[Tuple[bytes, bool]]:
+        """
+        Verifica se a linha é um delimitador de algum multipart aberto
+        Retorna (boundary, é_fechamento) ou None
+        """
+        if not line.startswith(b'--'):
+            return None
+        stripped = line.rstrip()
+        for boundary in reversed(boundaries):
+            if stripped == b'--' + boundary:
+                return boundary, False
+            if stripped == b'--' + boundary + b'--':
+                return boundary, True
+        return None
+
+    def _process_entity(self, headers, boundaries: List[bytes]) -> Optional[Tuple[bytes, bool]]:
+        """
+        Processa o corpo de uma entidade MIME a partir da posição atual
+        Retorna o delimitador (de um multipart ancestral) que a encerrou,
+        ou None no fim do arquivo
+        """
+        self.info['parts'] += 1
+
+        if headers.get_content_maintype() == 'multipart':
+            boundary = headers.get_param('boundary')
+            if boundary:
+                return self._process_multipart(str(boundary).encode('utf-8', errors='ignore'), boundaries)
+
+        if headers.get_content_type() == 'message/rfc822':
+            # Email encaminhado como anexo: processa o email interno
+            return self._process_entity(self._read_headers(), boundaries)
+
+        content_type = headers.get_content_type()
+        collect = (
+            content_type in ('text/plain', 'text/html') and
+            headers.get_content_disposition() != 'attachment'
+        )
+        if not collect:
+            self.info['skipped_parts'] += 1
+
+        body = bytearray()
+        end = None
+        budget_reached = False
+        while True:
+            line = self._readline()
+            if not line:
+                break
+            end = self._match_boundary(line, boundaries)
+            if end:
+                break
+            if collect:
+                body += line
+                if self.collected + len(body) >= self.body_budget:
+                    budget_reached = True
+                    break
+
+        if collect:
+            self.collected += len(body)
+            self._add_text(headers, content_type, bytes(body))
+
+        if budget_reached:
+            raise _BudgetReached()
+        return end
+
+    def _process_multipart(self, boundary: bytes, boundaries: List[bytes]) -> Optional[Tuple[bytes, bool]]:
+        open_boundaries = boundaries + [boundary]
+
+        # Preâmbulo: ignorado até o primeiro delimitador
+        end = self._skip_until_boundary(open_boundaries)
+        while end is not None:
+            matched, closing = end
+            if matched != boundary:
+                return end
+            if closing:
+                # Epílogo: ignorado até o delimitador de um ancestral
+                return self._skip_until_boundary(boundaries)
+            end = self._process_entity(self._read_headers(), open_boundaries)
+        return None
+
+    def _skip_until_boundary(self, boundaries: List[bytes]) -> Optional[Tuple[bytes, bool]]:
+        while True:
+            line = self._readline()
+            if not line:
+                return None
+            end = self._match_boundary(line, boundaries)
+            if end:
+                return end
+
+    def _add_text(self, headers, content_type: str, body: bytes):
+        encoding = str(headers.get('Content-Transfer-Encoding', '7bit')).strip().lower()
+        if encoding == 'base64':
+            data = b''.join(body.split())
+            # Corpo truncado pelo orçamento: descarta o quarteto incompleto
+            data = data[:len(data) // 4 * 4]
+            try:
+                body = base64.b64decode(data)
+            except (binascii.Error, ValueError):
+                body = b''
+        elif encoding == 'quoted-printable':
+            body = quopri.decodestring(body)
+
+        charset = headers.get_content_charset() or 'utf-8'
+        try:
+            codecs.lookup(charset)
+        except LookupError:
+            charset = 'latin-1'
+        text = body.decode(charset, errors='replace')
+
+        self.info['text_parts'] += 1
+        if content_type == 'text/plain':
+            self.plain_parts.append(text)
+        else:
+            self.html_parts.append(text)
+
+def parse_eml(stream: BinaryIO, body_budget: int = DEFAULT_BODY_BUDGET) -> Tuple[Optional[str], Dict]:
+    """
+    Extrai assunto e corpo de texto de um .eml lido em streaming
+    """
+    return EmlStreamParser(stream, body_budget).parse()
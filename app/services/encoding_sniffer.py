@@ -0,0 +1,164 @@
+from typing import Dict, Optional, Tuple
+import codecs
+import re
+import threading
+import time
+
+# Bytes inspecionados no início do arquivo: a decisão não depende do tamanho do upload
+SNIFF_BYTES = 65536
+
+# BOMs em ordem de verificação (o de UTF-32 LE começa com o de UTF-16 LE)
+BOMS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16')
+)
+
+# charset declarado em headers de email (Content-Type) ou em <meta> de HTML,
+# procurado só no começo do arquivo, onde ficam headers e <head>
+CHARSET_SEARCH_BYTES = 4096
+CHARSET_PATTERN = re.compile(rb'charset\s*=\s*["\']?([a-z0-9_.:-]{1,40})', re.IGNORECASE)
+
+# Bytes de controle que não aparecem em texto (tab, quebras de linha,
+# form feed e ESC ficam de fora), removidos em bloco com bytes.translate
+CONTROL_BYTES = bytes(range(0x00, 0x09)) + b'\x0b' + bytes(range(0x0e, 0x1b)) + bytes(range(0x1c, 0x20)) + b'\x7f'
+
+# Bytes sem caractere no cp1252: com eles, o texto legado é latin-1
+CP1252_UNDEFINED = b'\x81\x8d\x8f\x90\x9d'
+
+# Acima dessa fração de bytes de controle no prefixo, o arquivo é binário
+# (texto quase não tem esses bytes; dados aleatórios/comprimidos têm ~11%)
+MAX_CONTROL_RATIO = 0.05
+
+# UTF-16 sem BOM (texto latino: um byte nulo por caractere): pelo menos
+# essa fração de nulos em uma paridade e quase nenhum na outra
+UTF16_NUL_RATIO = 0.4
+UTF16_OTHER_NUL_RATIO = 0.05
+
+# Texto que todo charset declarado aceito deve decodificar sem mudança
+# (descarta charsets incompatíveis com ASCII, como UTF-16, declarados em headers ASCII)
+ASCII_PROBE = b'charset=abc<>\n'
+
+class BinaryContent(ValueError):
+    """
+    Conteúdo binário ou corrompido - o upload deve ser rejeitado (400).
+    report traz o resultado da inspeção (source = 'binary')
+    """
+
+    def __init__(self, message: str, report: Dict):
+        super().__init__(message)
+        self.report = report
+
+def sniff_encoding(content: bytes, sniff_bytes: int = SNIFF_BYTES) -> Dict:
+    """
+    Escolhe o encoding de um upload de texto olhando só os primeiros
+    sniff_bytes bytes, com operações em bloco sobre os bytes (sem
+    decodificar o arquivo inteiro):
+    1. BOM (UTF-8, UTF-16, UTF-32);
+    2. UTF-16 sem BOM (bytes nulos alternados);
+    3. binário: bytes nulos ou de controle demais -> BinaryContent;
+    4. ASCII puro ou UTF-8 válido no prefixo -> utf-8;
+    5. charset declarado (Content-Type/meta) que decodifica o prefixo;
+    6. legado: cp1252, ou latin-1 se houver bytes sem caractere no cp1252.
+    Retorna {name, source, sniffed_bytes, control_ratio, sniff_ms}
+    """
+    started = time.perf_counter()
+    prefix = content[:sniff_bytes]
+    report = {'name': None, 'source': None, 'sniffed_bytes': len(prefix), 'control_ratio': 0.0}
+
+    for bom, name in BOMS:
+        if prefix.startswith(bom):
+            return _finish(report, name, 'bom', started)
+
+    if not prefix:
+        return _finish(report, 'utf-8', 'empty', started)
+
+    if b'\x00' in prefix:
+        utf16 = _utf16_without_bom(prefix)
+        if utf16 is not None:
+            return _finish(report, utf16, 'utf-16-pattern', started)
+
+    control_ratio = (len(prefix) - len(prefix.translate(None, CONTROL_BYTES))) / len(prefix)
+    report['control_ratio'] = round(control_ratio, 4)
+    if control_ratio > MAX_CONTROL_RATIO:
+        raise BinaryContent('Arquivo binário ou corrompido: não parece ser texto',
+                            _finish(report, None, 'binary', started))
+
+    if prefix.isascii():
+        # Prefixo ASCII: o charset declarado vale para o restante do arquivo
+        declared = _declared_charset(prefix)
+        if declared is not None:
+            return _finish(report, declared, 'declared', started)
+        return _finish(report, 'utf-8', 'ascii', started)
+
+    if _decodes(prefix, 'utf-8', final=len(prefix) == len(content)):
+        return _finish(report, 'utf-8', 'utf-8', started)
+
+    declared = _declared_charset(prefix)
+    if declared is not None and codecs.lookup(declared).name != 'utf-8':
+        return _finish(report, declared, 'declared', started)
+
+    legacy = 'latin-1' if prefix.translate(None, CP1252_UNDEFINED) != prefix else 'cp1252'
+    return _finish(report, legacy, 'heuristic', started)
+
+# Substituições feitas na decodificação (por thread): o handler de erro
+# registrado abaixo conta cada trecho inválido trocado por U+FFFD
+_replacements = threading.local()
+
+def _count_replacement(error: UnicodeDecodeError):
+    _replacements.count += 1
+    return '\ufffd', error.end
+
+codecs.register_error('sniffer-replace', _count_replacement)
+
+def decode_text(content: bytes, encoding: str) -> Tuple[str, int]:
+    """
+    Decodifica o conteúdo uma única vez com o encoding escolhido por
+    sniff_encoding. Bytes inválidos além do prefixo inspecionado viram
+    U+FFFD, sem trocar o encoding do arquivo inteiro.
+    Retorna (texto, número de trechos substituídos)
+    """
+    _replacements.count = 0
+    text = content.decode(encoding, errors='sniffer-replace')
+    return text, _replacements.count
+
+def _utf16_without_bom(prefix: bytes) -> Optional[str]:
+    half = len(prefix) / 2
+    even_nuls = prefix[0::2].count(0) / half
+    odd_nuls = prefix[1::2].count(0) / half
+    if odd_nuls >= UTF16_NUL_RATIO and even_nuls < UTF16_OTHER_NUL_RATIO:
+        return 'utf-16-le'
+    if even_nuls >= UTF16_NUL_RATIO and odd_nuls < UTF16_OTHER_NUL_RATIO:
+        return 'utf-16-be'
+    return None
+
+def _declared_charset(prefix: bytes) -> Optional[str]:
+    """
+    charset declarado no prefixo, se for um codec conhecido que decodifica o prefixo
+    """
+    match = CHARSET_PATTERN.search(prefix, 0, CHARSET_SEARCH_BYTES)
+    if match is None:
+        return None
+    name = match.group(1).decode('ascii')
+    try:
+        if ASCII_PROBE.decode(name) != ASCII_PROBE.decode('ascii'):
+            return None
+    except (LookupError, UnicodeDecodeError):
+        return None
+    return name.lower() if _decodes(prefix, name, final=False) else None
+
+def _decodes(prefix: bytes, encoding: str, final: bool) -> bool:
+    # Decodificador incremental: um caractere multibyte cortado no fim do prefixo não é erro
+    try:
+        codecs.getincrementaldecoder(encoding)().decode(prefix, final=final)
+    except (UnicodeDecodeError, LookupError):
+        return False
+    return True
+
+def _finish(report: Dict, name: Optional[str], source: str, started: float) -> Dict:
+    report['name'] = name
+    report['source'] = source
+    report['sniff_ms'] = round((time.perf_counter() - started) * 1000, 3)
+    return report
@@ -0,0 +1,174 @@
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, List, Optional
+import atexit
+import multiprocessing
+import os
+import threading
+
+class ExecutorSaturated(Exception):
+    """Fila do pool de processos cheia - a requisição deve ser rejeitada (503)"""
+
+class ExecutorTimeout(Exception):
+    """Tarefa excedeu o tempo limite no pool de processos (504)"""
+
+class ClassificationExecutor:
+    """
+    Camada opcional de execução para trabalho CPU-bound (classificação e
+    extração de arquivos). Tarefas grandes vão para um pool de processos,
+    fora do GIL do worker; tarefas pequenas rodam inline.
+    A fila é limitada e cada tarefa tem tempo limite.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.workers = os.cpu_count() or 1
+        self.inline_threshold = 20000
+        self.max_queue = 64
+        self.timeout = 30.0
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._counters = {
+            'submitted': 0,
+            'completed': 0,
+            'inline': 0,
+            'rejected': 0,
+            'timeouts': 0
+        }
+
+    def configure(self, enabled: bool = False, workers: int = 0, inline_threshold: int = 20000,
+                  max_queue: int = 64, timeout: float = 30.0):
+        """
+        Configura o executor (chamado em create_app a partir de app.config)
+        O pool é criado sob demanda, já dentro do processo worker
+        """
+        self.shutdown()
+        self.enabled = enabled
+        self.workers = workers or os.cpu_count() or 1
+        self.inline_threshold = inline_threshold
+        self.max_queue = max_queue
+        self.timeout = timeout
+
+    def run(self, fn: Callable, *args, size: int = 0, **kwargs):
+        """
+        Executa fn(*args, **kwargs): inline se o executor estiver desativado
+        ou se size (bytes/caracteres da entrada) estiver abaixo do limite,
+        caso contrário no pool de processos
+        """
+        if not self.offloads(size):
+            self._count('inline')
+            return fn(*args, **kwargs)
+
+        self._reserve(1)
+        future = self._get_pool().submit(fn, *args, **kwargs)
+        future.add_done_callback(self._release)
+        return self._wait(future)
+
+    def run_batch(self, fn: Callable, items: List, size: int = 0, **kwargs) -> List:
+        """
+        Executa fn(items, **kwargs) -> lista, dividindo o lote em um pedaço por
+        processo do pool. A ordem dos resultados é preservada.
+        """
+        if not items or not self.offloads(size):
+            self._count('inline')
+            return fn(items, **kwargs)
+
+        chunk_count = min(self.workers, len(items))
+        chunk_size = -(-len(items) // chunk_count)
+        chunks = [items[start:start + chunk_size] for start in range(0, len(items), chunk_size)]
+
+        self._reserve(len(chunks))
+        pool = self._get_pool()
+        futures = []
+        for chunk in chunks:
+            future = pool.submit(fn, chunk, **kwargs)
+            future.add_done_callback(self._release)
+            futures.append(future)
+
+        results = []
+        for future in futures:
+            results.extend(self._wait(future))
+        return results
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'workers': self.workers if self.enabled else 0,
+                'pending': self._pending,
+                'max_queue': self.max_queue,
+                'saturation': round(self._pending / self.max_queue, 4) if self.max_queue else 0.0,
+                'inline_threshold': self.inline_threshold,
+                'timeout': self.timeout,
+                **self._counters
+            }
+
+    def saturation(self) -> Dict:
+        """
+        Ocupação da fila sem copiar os contadores (usada pelas probes de saúde)
+        """
+        pending = self._pending
+        return {
+            'executor_enabled': self.enabled,
+            'pending': pending,
+            'max_queue': self.max_queue,
+            'saturation': round(pending / self.max_queue, 4) if self.max_queue else 0.0,
+            'saturated': self.enabled and pending >= self.max_queue
+        }
+
+    def shutdown(self):
+        """
+        Encerra o pool de processos (registrado no atexit do worker)
+        """
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def offloads(self, size: int) -> bool:
+        """
+        Se uma tarefa com entrada de size bytes/caracteres vai para o pool
+        (os argumentos precisam ser serializáveis) ou roda inline
+        """
+        return self.enabled and size >= self.inline_threshold
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn: seguro mesmo com o worker do gunicorn rodando threads
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._pool
+
+    def _reserve(self, slots: int):
+        with self._lock:
+            if self._pending + slots > self.max_queue:
+                self._counters['rejected'] += 1
+                raise ExecutorSaturated('Fila de processamento cheia, tente novamente em instantes')
+            self._pending += slots
+            self._counters['submitted'] += slots
+
+    def _release(self, future):
+        with self._lock:
+            self._pending -= 1
+            self._counters['completed'] += 1
+
+    def _wait(self, future):
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            # A tarefa já em execução não pode ser interrompida; ela continua
+            # ocupando a fila até terminar, o que mantém o limite honesto
+            future.cancel()
+            self._count('timeouts')
+            raise ExecutorTimeout(f'Processamento excedeu o limite de {self.timeout:g}s')
+
+    def _count(self, counter: str):
+        with self._lock:
+            self._counters[counter] += 1
+
+# Instância global do executor
+executor = ClassificationExecutor()
+atexit.register(executor.shutdown)
@@ -1,5 +1,13 @@
 from werkzeug.datastructures import FileStorage
-from typing import Dict, Tuple
+from app.services.executor import executor, ExecutorSaturated, ExecutorTimeout
+from app.services.eml_parser import parse_eml, DEFAULT_BODY_BUDGET
+from app.services.msg_parser import parse_msg
+from app.services.pdf_extractor import extract_pdf, DEFAULT_MAX_PAGES, DEFAULT_TEXT_BUDGET, DEFAULT_MAX_BYTES
+from app.services.email_classifier import make_saturation_check
+from app.services.encoding_sniffer import sniff_encoding, decode_text, BinaryContent
+from app.services.profiler import timed_stage
+from typing import BinaryIO, Dict, Optional, Tuple, Union
+import io
 import os
 import re
 
@@ -44,9 +52,22 @@ def get_file_info(file: FileStorage) -> Dict:
         'extension': '.' + file.filename.rsplit('.', 1)[1].lower() if '.' in file.filename else ''
     }
 
-def process_file(file: FileStorage) -> str:
+@timed_stage('process_file')
+def process_file(file: FileStorage, file_info: Dict = None, body_budget: int = DEFAULT_BODY_BUDGET,
+                 max_pages: int = DEFAULT_MAX_PAGES, text_budget: int = DEFAULT_TEXT_BUDGET,
+                 pdf_max_bytes: int = DEFAULT_MAX_BYTES) -> str:
     """
     Processa diferentes tipos de arquivo e extrai o texto
+    Arquivos .eml são lidos em streaming (MIME) e .msg via compound file OLE,
+    ambos limitados a body_budget bytes de corpo; PDFs de até pdf_max_bytes
+    são lidos página a página até max_pages/text_budget ou até a
+    classificação estar saturada. A extração roda no pool de processos
+    (executor.run) para arquivos grandes, como a de texto simples; inline,
+    .eml, .msg e .pdf são lidos direto do stream do upload
+    Texto simples tem o encoding escolhido (e binários rejeitados) pelo
+    início do arquivo, antes de decodificá-lo uma única vez
+    Se file_info for informado, recebe detalhes da extração em 'extraction'
+    e do encoding em 'encoding'
     """
     # Validar arquivo primeiro
     is_valid, message = validate_file(file)
@@ -54,91 +75,114 @@ def process_file(file: FileStorage) -> str:
         raise ValueError(message)
     
     filename = file.filename.lower()
+    file.seek(0, 2)
+    size = file.tell()
+    file.seek(0)
+    
+    if filename.endswith('.pdf') and size > pdf_max_bytes:
+        # Recusado antes do parsing: o custo do pypdf cresce com o arquivo
+        raise ValueError(f"PDF muito grande. Máximo {pdf_max_bytes} bytes")
     
     try:
-        if filename.endswith('.txt') or filename.endswith('.eml'):
-            # Arquivo de texto simples
-            content = file.read()
-            # Tentar diferentes encodings
-            try:
-                return content.decode('utf-8')
-            except UnicodeDecodeError:
-                try:
-                    return content.decode('latin-1')
-                except UnicodeDecodeError:
-                    return content.decode('cp1252', errors='ignore')
-        
-        elif filename.endswith('.msg'):
-            # Para arquivos .msg, tentamos ler como texto
-            # Em produção, você pode usar bibliotecas como python-msg
-            content = file.read()
-            try:
-                return content.decode('utf-8', errors='ignore')
-            except:
-                return content.decode('latin-1', errors='ignore')
-        
-        elif filename.endswith('.pdf'):
-            # Para PDFs, retornamos texto de exemplo
-            # Em produção, você pode usar PyPDF2 ou pdfplumber
-            return """
-            Este é um email de exemplo extraído de um PDF.
-            Preciso de ajuda urgente com um problema no sistema.
-            O sistema não está funcionando corretamente e preciso de suporte técnico imediato.
-            Por favor, me ajudem a resolver esta questão o mais rápido possível.
-            """
+        if filename.endswith(('.eml', '.msg', '.pdf')):
+            # Inline, o parser lê o stream do upload; a cópia em bytes só é
+            # feita quando a extração vai para o pool de processos
+            source = file.read() if executor.offloads(size) else file.stream
+            text, extraction = executor.run(
+                extract_document, source, filename, body_budget, max_pages, text_budget, size=size
+            )
+            if text is not None:
+                if file_info is not None:
+                    file_info['extraction'] = extraction
+                return text
+            # .eml sem headers de email ou .msg que não é compound file OLE:
+            # tratar como texto simples
+            file.seek(0)
         
-        else:
-            raise ValueError("Tipo de arquivo não suportado")
-            
+        content = file.read()
+        try:
+            encoding = sniff_encoding(content)
+        except BinaryContent as e:
+            if file_info is not None:
+                file_info['encoding'] = e.report
+            raise
+        if file_info is not None:
+            file_info['encoding'] = encoding
+        text, encoding['replacements'] = executor.run(extract_text, content, filename, encoding['name'], size=len(content))
+        return text
+    
+    except (ExecutorSaturated, ExecutorTimeout, BinaryContent):
+        raise
     except Exception as e:
         raise ValueError(f"Erro ao processar arquivo: {str(e)}")
 
+def extract_text(content: bytes, filename: str, encoding: str = None) -> Tuple[str, int]:
+    """
+    Extrai o texto do conteúdo bruto de acordo com a extensão
+    Função de módulo (serializável) para poder rodar no pool de processos
+    Texto simples é decodificado com encoding (escolhido por sniff_encoding,
+    que é chamado aqui se não for informado)
+    Retorna (texto, bytes inválidos substituídos por U+FFFD)
+    """
+    if filename.endswith('.txt') or filename.endswith('.eml'):
+        # Arquivo de texto simples: uma única decodificação
+        return decode_text(content, encoding or sniff_encoding(content)['name'])
+    
+    elif filename.endswith('.msg'):
+        text, _ = parse_msg(io.BytesIO(content))
+        if text is not None:
+            return text, 0
+        
+        # Não é um compound file OLE: tentamos ler como texto
+        return decode_text(content, encoding or sniff_encoding(content)['name'])
+    
+    else:
+        raise ValueError("Tipo de arquivo não suportado")
+
+def extract_document(source: Union[bytes, BinaryIO], filename: str, body_budget: int = DEFAULT_BODY_BUDGET,
+                     max_pages: int = DEFAULT_MAX_PAGES,
+                     text_budget: int = DEFAULT_TEXT_BUDGET) -> Tuple[Optional[str], Dict]:
+    """
+    Extrai o texto de .eml, .msg ou .pdf a partir do stream do upload
+    (inline) ou dos bytes do arquivo (pool de processos). Função de módulo
+    (serializável); o critério de saturação dos PDFs é criado aqui, no
+    processo que extrai.
+    Retorna (texto, informações da extração); texto None se o .eml não
+    tiver headers de email ou o .msg não for um compound file OLE
+    """
+    stream = io.BytesIO(source) if isinstance(source, bytes) else source
+    if filename.endswith('.eml'):
+        return parse_eml(stream, body_budget)
+    if filename.endswith('.msg'):
+        return parse_msg(stream, body_budget)
+    if filename.endswith('.pdf'):
+        return extract_pdf(stream, max_pages, text_budget, make_saturation_check())
+    raise ValueError("Tipo de arquivo não suportado")
+
+# Linhas de header removidas por clean_email_content (início da linha,
+# sem diferenciar maiúsculas): um único padrão em vez de um re.match por header
+HEADER_LINE_PATTERN = re.compile(
+    r'^(?:From|To|Subject|Date|Cc|Bcc|Reply-To|Message-ID|Content-Type|MIME-Version|X-.*|Received|Return-Path):.*$',
+    re.IGNORECASE | re.MULTILINE
+)
+
+CONTROL_CHARS_PATTERN = re.compile(r'[\x00-\x1f\x7f-\x9f]')
+
 def clean_email_content(text: str) -> str:
     """
     Limpa conteúdo de email removendo headers desnecessários e formatação
+    (linhas de header, espaços repetidos e caracteres de controle).
+    Para remover histórico citado, assinaturas e avisos legais antes da
+    classificação, ver content_reducer.reduce_content
     """
     if not text:
         return ""
     
-    # Remover headers de email comuns
-    lines = text.split('\n')
-    cleaned_lines = []
-    
-    skip_headers = False
-    header_patterns = [
-        r'^From:',
-        r'^To:',
-        r'^Subject:',
-        r'^Date:',
-        r'^Cc:',
-        r'^Bcc:',
-        r'^Reply-To:',
-        r'^Message-ID:',
-        r'^Content-Type:',
-        r'^MIME-Version:',
-        r'^X-.*:',
-        r'^Received:',
-        r'^Return-Path:'
-    ]
-    
-    for line in lines:
-        # Pular headers típicos de email
-        is_header = any(re.match(pattern, line, re.IGNORECASE) for pattern in header_patterns)
-        
-        if not is_header and line.strip():
-            # Limpar formatação excessiva
-            cleaned_line = re.sub(r'\s+', ' ', line.strip())
-            if len(cleaned_line) > 0:
-                cleaned_lines.append(cleaned_line)
-    
-    # Juntar linhas e limpar
-    cleaned_text = ' '.join(cleaned_lines)
-    
-    # Remover múltiplos espaços
-    cleaned_text = re.sub(r'\s+', ' ', cleaned_text)
+    # Remover headers e juntar as linhas com um espaço entre as palavras
+    cleaned_text = ' '.join(HEADER_LINE_PATTERN.sub('', text).split())
     
     # Remover caracteres de controle
-    cleaned_text = re.sub(r'[\x00-\x1f\x7f-\x9f]', ' ', cleaned_text)
+    cleaned_text = CONTROL_CHARS_PATTERN.sub(' ', cleaned_text)
     
     return cleaned_text.strip()
 
@@ -149,12 +193,14 @@ def is_readable_text(text: str) -> bool:
     if not text:
         return False
     
-    # Verificar se há uma proporção razoável de caracteres legíveis
-    printable_chars = sum(1 for c in text if c.isprintable() or c.isspace())
-    total_chars = len(text)
+    # Caminho comum: fora quebras de linha e tabs, tudo é imprimível
+    # (verificado em bloco, sem percorrer o texto caractere a caractere)
+    if text.replace('\n', '').replace('\r', '').replace('\t', '').isprintable():
+        return True
     
-    if total_chars == 0:
-        return False
+    # Espaços em branco contam como legíveis; o restante, caractere a caractere
+    compact = ''.join(text.split())
+    printable_chars = len(text) - len(compact) + sum(map(str.isprintable, compact))
     
     # Pelo menos 70% dos caracteres devem ser legíveis
-    return (printable_chars / total_chars) >= 0.7
\ No newline at end of file
+    return (printable_chars / len(text)) >= 0.7
\ No newline at end of file
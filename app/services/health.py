@@ -0,0 +1,119 @@
+from app.services import email_classifier
+from app.services.executor import executor
+from typing import Dict, Optional
+import os
+import threading
+import time
+
+# Casos do self-test: (texto, classificação esperada ou None se apenas informativo)
+SELF_TEST_CASES = [
+    ("Meu cartão foi bloqueado e preciso de ajuda urgente para desbloquear a conta", 'Produtivo'),
+    ("Parabéns pela conquista! Feliz aniversário e muito sucesso para toda a equipe", 'Improdutivo'),
+    ("Teste de funcionamento da API", None),
+]
+
+class HealthMonitor:
+    """
+    Estado de saúde do worker para probes de liveness/readiness.
+    O self-test do classificador roda uma vez (na inicialização) e o
+    resultado fica em cache até a versão do léxico mudar; as probes só
+    leem estado em memória.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.started_at = time.time()
+        self._self_test: Optional[Dict] = None
+        self._lock = threading.Lock()
+        # Relatório de inicialização (tempo até ficar pronto, warm-up, memória)
+        self.startup: Dict = {}
+
+    def uptime(self) -> float:
+        return round(time.monotonic() - self.started, 3)
+
+    def run_self_test(self) -> Dict:
+        """
+        Classifica os casos conhecidos e guarda o resultado. Chamado em
+        create_app e sempre que o léxico é recarregado
+        """
+        started = time.perf_counter()
+        cases = []
+        error = None
+        try:
+            for text, expected in SELF_TEST_CASES:
+                result = email_classifier.classify_email(text)
+                cases.append({
+                    'text': text,
+                    'expected': expected,
+                    'classification': result['classification'],
+                    'confidence': result['confidence'],
+                    'passed': expected is None or result['classification'] == expected
+                })
+        except Exception as e:
+            error = str(e)
+
+        self_test = {
+            'passed': error is None and all(case['passed'] for case in cases),
+            'lexicon_version': email_classifier.LEXICON_VERSION,
+            'duration_ms': round((time.perf_counter() - started) * 1000, 3),
+            'checked_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'cases': cases
+        }
+        if error is not None:
+            self_test['error'] = error
+
+        with self._lock:
+            self._self_test = self_test
+        return self_test
+
+    def self_test(self) -> Dict:
+        """
+        Resultado em cache do self-test; roda de novo se ainda não rodou
+        ou se o léxico mudou desde a última execução
+        """
+        self_test = self._self_test
+        if self_test is None or self_test['lexicon_version'] != email_classifier.LEXICON_VERSION:
+            self_test = self.run_self_test()
+        return self_test
+
+    def liveness(self) -> Dict:
+        self_test = self.self_test()
+        return {
+            'status': 'alive',
+            'pid': os.getpid(),
+            'uptime_seconds': self.uptime(),
+            'self_test': {
+                'passed': self_test['passed'],
+                'lexicon_version': self_test['lexicon_version'],
+                'checked_at': self_test['checked_at']
+            },
+            'queue': executor.saturation()
+        }
+
+    def readiness(self) -> Dict:
+        """
+        Pronto para receber tráfego: self-test aprovado e fila do pool com
+        espaço. O motivo aparece em 'reasons' quando não está pronto
+        """
+        report = self.liveness()
+        reasons = []
+        if not report['self_test']['passed']:
+            reasons.append('self_test_failed')
+        if report['queue']['saturated']:
+            reasons.append('executor_saturated')
+
+        report['status'] = 'ready' if not reasons else 'not_ready'
+        report['ready'] = not reasons
+        if reasons:
+            report['reasons'] = reasons
+        return report
+
+    def _after_fork(self):
+        # Uptime é do worker, não do processo mestre que carregou a aplicação
+        self.started = time.monotonic()
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+
+# Instância global do monitor de saúde
+health_monitor = HealthMonitor()
+os.register_at_fork(after_in_child=health_monitor._after_fork)
@@ -0,0 +1,319 @@
+from app.services.metrics import JOBS_TOTAL, JOB_QUEUE_DEPTH, JOB_WAIT
+from app.services.response_format import json_encoder
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+import json
+import os
+import queue
+import re
+import threading
+import time
+import uuid
+
+# Ids gerados por submit (uuid4 hex): validados antes de virar nome de arquivo
+JOB_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+# Intervalo de leitura do arquivo de um job de outro worker durante o long-poll
+REMOTE_POLL_INTERVAL = 0.2
+
+class JobQueueFull(Exception):
+    """Fila de jobs cheia - a submissão deve ser rejeitada (503)"""
+
+class Job:
+    """
+    Estado de um job assíncrono. O resultado é o corpo que a rota síncrona
+    equivalente retornaria
+    """
+
+    __slots__ = ('id', 'kind', 'fn', 'args', 'status', 'submitted', 'started', 'finished',
+                 'expires', 'result', 'error', 'done')
+
+    def __init__(self, kind: str, fn: Callable, args: tuple):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.fn = fn
+        self.args = args
+        self.status = 'queued'
+        self.submitted = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.expires: Optional[float] = None
+        self.result: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self.done = threading.Event()
+
+    def to_dict(self) -> Dict:
+        job = {
+            'job_id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'submitted_at': _timestamp(self.submitted),
+            'started_at': _timestamp(self.started),
+            'finished_at': _timestamp(self.finished),
+            'wait_seconds': round((self.started or time.time()) - self.submitted, 4),
+            'run_seconds': round(self.finished - self.started, 4) if self.finished else None,
+            'expires_at': _timestamp(self.expires)
+        }
+        if self.status == 'succeeded':
+            job['result'] = self.result
+        elif self.status == 'failed':
+            job['error'] = self.error
+        return job
+
+def _timestamp(value: Optional[float]) -> Optional[str]:
+    if value is None:
+        return None
+    return time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(value)) + f'.{int(value % 1 * 1000):03d}Z'
+
+class JobQueue:
+    """
+    Jobs assíncronos (upload e lote) executados por um pool limitado de
+    threads no worker: a requisição só enfileira e retorna o id, o
+    resultado é consultado em /api/jobs/<id>. A fila é limitada (submissões
+    com a fila cheia são rejeitadas) e os resultados expiram após ttl
+    segundos. Com um diretório compartilhado (JOBS_DIR), o estado de cada
+    job também é gravado em arquivo para que qualquer worker do gunicorn
+    responda a consulta
+    """
+
+    def __init__(self):
+        self.workers = 2
+        self.max_queue = 32
+        self.ttl = 600
+        self.directory: Optional[str] = None
+        self._reset()
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._queue: queue.Queue = queue.Queue(maxsize=self.max_queue)
+        self._jobs: Dict[str, Job] = {}
+        # Jobs concluídos em ordem de expiração (ttl fixo = ordem de término)
+        self._finished: OrderedDict = OrderedDict()
+        self._threads: List[threading.Thread] = []
+        self._running = 0
+        self._counters = {event: 0 for event in ('submitted', 'succeeded', 'failed', 'rejected', 'expired')}
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def configure(self, workers: int = 2, max_queue: int = 32, ttl: int = 600, directory: Optional[str] = None):
+        """
+        Reconfigura a fila (chamado em create_app a partir de app.config).
+        As threads são criadas na primeira submissão, já dentro do worker
+        """
+        self.shutdown()
+        self.workers = max(1, workers)
+        self.max_queue = max(1, max_queue)
+        self.ttl = ttl
+        self.directory = directory or None
+        if self.directory is not None:
+            os.makedirs(self.directory, exist_ok=True)
+        self._reset()
+
+    def submit(self, kind: str, fn: Callable, *args) -> Dict:
+        """
+        Enfileira fn(*args) -> dict e retorna o estado inicial do job.
+        Levanta JobQueueFull se a fila estiver cheia
+        """
+        self._expire()
+        job = Job(kind, fn, args)
+        # O estado 'queued' é gravado antes de o job entrar na fila: depois
+        # disso, só a thread que o executa grava o arquivo
+        self._persist(job)
+        with self._lock:
+            self._start_workers()
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                self._counters['rejected'] += 1
+                rejected = True
+            else:
+                self._jobs[job.id] = job
+                self._counters['submitted'] += 1
+                rejected = False
+        if rejected:
+            self._remove_file(job.id)
+            JOBS_TOTAL.inc('rejected')
+            raise JobQueueFull('Fila de jobs cheia, tente novamente em instantes')
+        JOBS_TOTAL.inc('submitted')
+        JOB_QUEUE_DEPTH.set(self._queue.qsize())
+        return job.to_dict()
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """
+        Estado atual do job, ou None se não existir ou já tiver expirado
+        """
+        if not JOB_ID_PATTERN.match(job_id):
+            return None
+        self._expire()
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        return self._load(job_id)
+
+    def wait(self, job_id: str, timeout: float) -> Optional[Dict]:
+        """
+        Long-poll: espera até timeout segundos o job terminar e retorna o
+        estado (concluído ou não)
+        """
+        if not JOB_ID_PATTERN.match(job_id):
+            return None
+        job = self._jobs.get(job_id)
+        if job is not None:
+            job.done.wait(timeout)
+            return self.get(job_id)
+
+        # Job de outro worker: só o arquivo compartilhado é visível
+        deadline = time.monotonic() + timeout
+        state = self._load(job_id)
+        while state is not None and state['status'] in ('queued', 'running') and time.monotonic() < deadline:
+            time.sleep(min(REMOTE_POLL_INTERVAL, max(0.0, deadline - time.monotonic())))
+            state = self._load(job_id)
+        return state
+
+    def stats(self) -> Dict:
+        self._expire()
+        with self._lock:
+            started = self._counters['succeeded'] + self._counters['failed'] + self._running
+            return {
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'queued': self._queue.qsize(),
+                'running': self._running,
+                'retained': len(self._jobs),
+                'ttl': self.ttl,
+                'shared_directory': self.directory,
+                'wait_seconds_avg': round(self._wait_total / started, 4) if started else 0.0,
+                'wait_seconds_max': round(self._wait_max, 4),
+                **self._counters
+            }
+
+    def shutdown(self):
+        """
+        Encerra as threads após os jobs em execução (jobs ainda na fila são descartados)
+        """
+        with self._lock:
+            threads, self._threads = self._threads, []
+            pending = self._queue
+        while True:
+            try:
+                pending.get_nowait()
+            except queue.Empty:
+                break
+        for _ in threads:
+            pending.put(None)
+        for thread in threads:
+            thread.join()
+
+    def _start_workers(self):
+        # Chamado com o lock adquirido
+        if self._threads:
+            return
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f'job-worker-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _work(self):
+        pending = self._queue
+        while True:
+            job = pending.get()
+            if job is None:
+                return
+            job.started = time.time()
+            job.status = 'running'
+            waited = job.started - job.submitted
+            with self._lock:
+                self._running += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+            JOB_WAIT.observe(waited)
+            JOB_QUEUE_DEPTH.set(pending.qsize())
+            self._persist(job)
+
+            try:
+                job.result = job.fn(*job.args)
+                job.status = 'succeeded'
+            except Exception as e:
+                job.error = str(e)
+                job.status = 'failed'
+            job.fn = job.args = None
+            job.finished = time.time()
+            job.expires = job.finished + self.ttl
+
+            with self._lock:
+                self._running -= 1
+                self._counters[job.status] += 1
+                self._finished[job.id] = job.expires
+            JOBS_TOTAL.inc(job.status)
+            self._persist(job)
+            job.done.set()
+
+    def _expire(self):
+        """
+        Remove os resultados expirados (em ordem de término: para no primeiro
+        ainda válido)
+        """
+        now = time.time()
+        expired = []
+        with self._lock:
+            while self._finished:
+                job_id, expires = next(iter(self._finished.items()))
+                if expires > now:
+                    break
+                self._finished.popitem(last=False)
+                self._jobs.pop(job_id, None)
+                self._counters['expired'] += 1
+                expired.append(job_id)
+        for job_id in expired:
+            JOBS_TOTAL.inc('expired')
+            self._remove_file(job_id)
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f'job-{job_id}.json')
+
+    def _persist(self, job: Job):
+        if self.directory is None:
+            return
+        path = self._path(job.id)
+        # Arquivo temporário único por gravação (gravações concorrentes não se sobrescrevem)
+        temporary = f'{path}.{uuid.uuid4().hex}.tmp'
+        try:
+            with open(temporary, 'wb') as job_file:
+                job_file.write(json_encoder.dumps_line(job.to_dict()))
+            os.replace(temporary, path)
+        except OSError as e:
+            print(f"Erro ao gravar o job {job.id}: {str(e)}")
+
+    def _load(self, job_id: str) -> Optional[Dict]:
+        if self.directory is None:
+            return None
+        try:
+            with open(self._path(job_id), encoding='utf-8') as job_file:
+                state = json.load(job_file)
+        except (OSError, ValueError):
+            return None
+        expires_at = state.get('expires_at')
+        if expires_at is not None and expires_at < _timestamp(time.time()):
+            # Expirado em um worker que não está mais rodando para removê-lo
+            self._remove_file(job_id)
+            return None
+        return state
+
+    def _remove_file(self, job_id: str):
+        if self.directory is None:
+            return
+        try:
+            os.remove(self._path(job_id))
+        except OSError:
+            pass
+
+    def _after_fork(self):
+        """
+        Após fork (gunicorn --preload), as threads do pai não existem no filho:
+        começa com fila e estado próprios
+        """
+        self._reset()
+
+# Instância global da fila de jobs
+job_queue = JobQueue()
+os.register_at_fork(after_in_child=job_queue._after_fork)
@@ -0,0 +1,245 @@
+from typing import Dict, List, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy é opcional: sem ele o produto matricial é feito em Python
+    np = None
+
+
+class KeywordMatcher:
+    """
+    Autômato Aho-Corasick para contagem de palavras-chave em uma única passada.
+    Compilado uma vez a partir de grupos de palavras-chave com pesos
+    (ex.: produtivo, improdutivo, urgência), inclusive frases com espaços.
+    """
+
+    def __init__(self, groups: Dict[str, Dict[str, int]]):
+        self.groups = list(groups)
+        self.patterns: List[str] = []
+
+        index: Dict[str, int] = {}
+        for keywords in groups.values():
+            for keyword in keywords:
+                if keyword not in index:
+                    index[keyword] = len(self.patterns)
+                    self.patterns.append(keyword)
+
+        # Vetor de pesos por grupo, indexado pelo id do padrão
+        self.weight_vectors: Dict[str, List[int]] = {}
+        for group, keywords in groups.items():
+            vector = [0] * len(self.patterns)
+            for keyword, weight in keywords.items():
+                vector[index[keyword]] = weight
+            self.weight_vectors[group] = vector
+
+        # Matriz de pesos (padrões x grupos) para o scoring em lote
+        self._weight_array = None
+        if np is not None:
+            self._weight_array = np.array(
+                [self.weight_vectors[group] for group in self.groups],
+                dtype=np.int64
+            ).T
+
+        self.lengths = [len(pattern) for pattern in self.patterns]
+        self._build()
+
+        # Maior peso que um único caractere pode somar a cada grupo (soma dos
+        # padrões que terminam no mesmo estado): limite para o early exit
+        self.max_weight_per_char: Dict[str, int] = {
+            group: max(sum(vector[pattern_id] for pattern_id in output) for output in self._outputs)
+            for group, vector in self.weight_vectors.items()
+        }
+
+    def _build(self):
+        """
+        Constrói a trie, os links de falha e a tabela de transições completa
+        (DFA), de modo que a varredura nunca precise seguir links de falha
+        """
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[List[int]] = [[]]
+
+        for pattern_id, pattern in enumerate(self.patterns):
+            state = 0
+            for char in pattern:
+                if char not in goto[state]:
+                    goto.append({})
+                    outputs.append([])
+                    goto[state][char] = len(goto) - 1
+                state = goto[state][char]
+            outputs[state].append(pattern_id)
+
+        # BFS para links de falha e herança das saídas
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [dict(goto[0])]
+        delta.extend({} for _ in range(len(goto) - 1))
+        queue = list(goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            outputs[state] = outputs[state] + outputs[fail[state]]
+            # Transições herdadas do estado de falha, sobrescritas pelas próprias
+            transitions = dict(delta[fail[state]])
+            for char, next_state in goto[state].items():
+                fail[next_state] = delta[fail[state]].get(char, 0)
+                transitions[char] = next_state
+                queue.append(next_state)
+            delta[state] = transitions
+
+        self._delta = delta
+        self._outputs: List[Tuple[int, ...]] = [tuple(out) for out in outputs]
+
+    def count(self, text: str, word_boundary: bool = False) -> Dict[int, int]:
+        """
+        Conta ocorrências não sobrepostas de cada padrão (mesma semântica de
+        str.count) em uma única passada pelo texto.
+        Com word_boundary=True, só conta padrões delimitados por não-letras,
+        evitando que termos curtos ('ir', 'doc', 'ted') casem dentro de palavras.
+        Retorna {id_do_padrão: contagem} apenas para padrões encontrados.
+        """
+        delta = self._delta
+        outputs = self._outputs
+        lengths = self.lengths
+        counts: Dict[int, int] = {}
+        last_end: Dict[int, int] = {}
+        text_len = len(text)
+        state = 0
+
+        for position, char in enumerate(text):
+            state = delta[state].get(char, 0)
+            if not outputs[state]:
+                continue
+            for pattern_id in outputs[state]:
+                start = position - lengths[pattern_id] + 1
+                if start <= last_end.get(pattern_id, -1):
+                    continue
+                if word_boundary and (
+                    (start > 0 and text[start - 1].isalnum()) or
+                    (position + 1 < text_len and text[position + 1].isalnum())
+                ):
+                    continue
+                last_end[pattern_id] = position
+                counts[pattern_id] = counts.get(pattern_id, 0) + 1
+
+        return counts
+
+    def score(self, counts: Dict[int, int]) -> Dict[str, int]:
+        """
+        Converte contagens por padrão em score ponderado por grupo
+        (produto escalar do vetor esparso de contagens com os pesos)
+        """
+        scores = {}
+        for group in self.groups:
+            vector = self.weight_vectors[group]
+            scores[group] = sum(count * vector[pattern_id] for pattern_id, count in counts.items())
+        return scores
+
+    def score_matrix(self, count_matrix: List[Dict[int, int]]) -> List[Dict[str, int]]:
+        """
+        Scoring em lote: matriz de contagens (emails x padrões) multiplicada
+        pela matriz de pesos (padrões x grupos) em uma única operação.
+        Usa NumPy quando disponível; caso contrário, produto esparso linha a linha.
+        """
+        if not count_matrix:
+            return []
+
+        if self._weight_array is None:
+            return [self.score(counts) for counts in count_matrix]
+
+        matrix = np.zeros((len(count_matrix), len(self.patterns)), dtype=np.int64)
+        for row, counts in enumerate(count_matrix):
+            if counts:
+                matrix[row, list(counts.keys())] = list(counts.values())
+
+        products = matrix @ self._weight_array
+        return [
+            {group: int(value) for group, value in zip(self.groups, row)}
+            for row in products
+        ]
+
+    def scan(self, text: str, word_boundary: bool = False) -> Dict[str, int]:
+        """
+        Atalho: conta os padrões e retorna os scores ponderados por grupo
+        """
+        return self.score(self.count(text, word_boundary))
+
+
+class KeywordCounter:
+    """
+    Contagem incremental com um KeywordMatcher: o texto chega em partes e as
+    contagens ao final (finish) são as mesmas de count() sobre o texto
+    concatenado. Entre as partes são mantidos o estado do autômato (frases
+    que atravessam o corte), a última ocorrência de cada padrão e, com
+    word_boundary, o contexto dos dois lados de cada ocorrência
+    """
+
+    def __init__(self, matcher: KeywordMatcher, word_boundary: bool = False):
+        self.matcher = matcher
+        self.word_boundary = word_boundary
+        # Contagens confirmadas (sem as ocorrências pendentes)
+        self.counts: Dict[int, int] = {}
+        self.length = 0
+        self._last_end: Dict[int, int] = {}
+        self._state = 0
+        self._context_size = max(matcher.lengths, default=0)
+        self._tail = ''
+        # Ocorrências terminadas no último caractere recebido: com
+        # word_boundary, dependem do primeiro caractere da próxima parte
+        self._pending: List[Tuple[int, int]] = []
+
+    def feed(self, text: str):
+        if not text:
+            return
+        if self._pending:
+            self._resolve(text[0])
+
+        delta = self.matcher._delta
+        outputs = self.matcher._outputs
+        lengths = self.matcher.lengths
+        counts = self.counts
+        last_end = self._last_end
+        word_boundary = self.word_boundary
+        base = self.length
+        # Caracteres anteriores disponíveis para o look-behind do word_boundary
+        context = self._tail + text
+        context_base = base - len(self._tail)
+        last_index = len(text) - 1
+        state = self._state
+
+        for index, char in enumerate(text):
+            state = delta[state].get(char, 0)
+            if not outputs[state]:
+                continue
+            position = base + index
+            for pattern_id in outputs[state]:
+                start = position - lengths[pattern_id] + 1
+                if start <= last_end.get(pattern_id, -1):
+                    continue
+                if word_boundary:
+                    if start > 0 and context[start - 1 - context_base].isalnum():
+                        continue
+                    if index == last_index:
+                        self._pending.append((pattern_id, position))
+                        continue
+                    if text[index + 1].isalnum():
+                        continue
+                last_end[pattern_id] = position
+                counts[pattern_id] = counts.get(pattern_id, 0) + 1
+
+        self._state = state
+        self.length = base + len(text)
+        self._tail = context[-self._context_size:] if self._context_size else ''
+
+    def finish(self) -> Dict[int, int]:
+        """
+        Fim do texto: confirma as ocorrências pendentes e retorna as contagens
+        """
+        self._resolve('')
+        return self.counts
+
+    def _resolve(self, next_char: str):
+        if not next_char.isalnum():
+            for pattern_id, position in self._pending:
+                self._last_end[pattern_id] = position
+                self.counts[pattern_id] = self.counts.get(pattern_id, 0) + 1
+        self._pending = []
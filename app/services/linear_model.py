@@ -0,0 +1,289 @@
+from app.services.email_classifier import MAX_CONFIDENCE, get_suggestions
+from app.services.nlp_processor import nlp_processor
+from app.services.profiler import record_stage, profiled_stage
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+import hashlib
+import heapq
+import math
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+
+# Ordem fixa das classes nas linhas de pesos do arquivo de modelo
+CLASSES = ('Produtivo', 'Improdutivo')
+
+ALGORITHMS = ('nb', 'logreg')
+
+# Cabeçalho do arquivo de modelo (little-endian, 32 bytes):
+# magic, versão do formato, algoritmo, normalização (0 = contagens,
+# 1 = L2), bits do hash, número de classes, exemplos de treino, data
+MODEL_MAGIC = b'ECLM'
+MODEL_FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sHBBBBII14x')
+
+DEFAULT_HASH_BITS = 18
+
+class ModelError(Exception):
+    """Arquivo de modelo ausente, inválido ou de outra versão do formato"""
+
+def extract_terms(tokens: Iterable[str]) -> Counter:
+    """
+    Termos do modelo: unigramas (sem stop words) e bigramas consecutivos,
+    com contagem. Mesma função no treino e na inferência
+    """
+    stop_words = nlp_processor.stop_words
+    words = [token for token in tokens if token not in stop_words]
+    terms = Counter(words)
+    terms.update([first + ' ' + second for first, second in zip(words, words[1:])])
+    return terms
+
+def term_bucket(term: str, mask: int) -> int:
+    """
+    Posição do termo na tabela de pesos (hashing trick: crc32, estável entre
+    processos ao contrário de hash())
+    """
+    return zlib.crc32(term.encode('utf-8')) & mask
+
+class LinearModel:
+    """
+    Modelo linear (Naive Bayes multinomial ou regressão logística) sobre
+    termos com hashing. Os pesos ficam em um arquivo binário de largura fixa
+    (float32, uma linha por bucket com um peso por classe) mapeado em
+    memória: carregar não copia o arquivo e, com gunicorn --preload, as
+    páginas são compartilhadas entre os workers.
+    O custo da inferência é uma passada pelos termos do email,
+    independente do tamanho do vocabulário de treino
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as model_file:
+            self._mapped = mmap.mmap(model_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._mapped) < HEADER.size:
+            raise ModelError(f"Arquivo de modelo truncado: {path}")
+        (magic, format_version, algorithm, norm, hash_bits, classes,
+         self.trained_examples, self.created) = HEADER.unpack_from(self._mapped)
+        if magic != MODEL_MAGIC or format_version != MODEL_FORMAT_VERSION:
+            raise ModelError(f"Formato de modelo não suportado: {path}")
+        if classes != len(CLASSES) or algorithm >= len(ALGORITHMS):
+            raise ModelError(f"Modelo incompatível: {path}")
+
+        self.algorithm = ALGORITHMS[algorithm]
+        self.l2_norm = norm == 1
+        self.hash_bits = hash_bits
+        self.mask = (1 << hash_bits) - 1
+        expected_size = HEADER.size + 4 * len(CLASSES) * (1 + (1 << hash_bits))
+        if len(self._mapped) != expected_size:
+            raise ModelError(f"Tamanho do modelo não confere com o cabeçalho: {path}")
+
+        self.version = hashlib.sha1(self._mapped).hexdigest()[:12]
+        raw = memoryview(self._mapped)[HEADER.size:]
+        if sys.byteorder != 'little':
+            import array
+            swapped = array.array('f', raw.tobytes())
+            raw.release()
+            swapped.byteswap()
+            raw = memoryview(swapped)
+        self._views = [raw]
+        values = raw.cast('f')
+        self._views.append(values)
+        self.bias = values[:len(CLASSES)]
+        self.weights = values[len(CLASSES):]
+        self._views.extend([self.bias, self.weights])
+
+    def info(self) -> Dict:
+        return {
+            'path': self.path,
+            'version': self.version,
+            'algorithm': self.algorithm,
+            'hash_bits': self.hash_bits,
+            'trained_examples': self.trained_examples,
+            'size_bytes': len(self._mapped)
+        }
+
+    def predict(self, terms: Counter) -> Dict:
+        """
+        Probabilidade de cada classe e os termos que mais pesaram na decisão
+        """
+        weights = self.weights
+        mask = self.mask
+        produtivo = improdutivo = 0.0
+        squares = 0
+        contributions = []
+        for term, count in terms.items():
+            offset = (zlib.crc32(term.encode('utf-8')) & mask) << 1
+            weight_produtivo = weights[offset]
+            weight_improdutivo = weights[offset + 1]
+            produtivo += count * weight_produtivo
+            improdutivo += count * weight_improdutivo
+            squares += count * count
+            contributions.append((count * (weight_produtivo - weight_improdutivo), term))
+
+        scale = 1 / math.sqrt(squares) if self.l2_norm and squares else 1.0
+        margin = (self.bias[0] + produtivo * scale) - (self.bias[1] + improdutivo * scale)
+        probability = _sigmoid(margin)
+        if margin >= 0:
+            indicators = heapq.nlargest(5, contributions)
+        else:
+            indicators = [(-delta, term) for delta, term in heapq.nsmallest(5, contributions)]
+
+        return {
+            'probabilities': {CLASSES[0]: probability, CLASSES[1]: 1 - probability},
+            'key_indicators': [term for delta, term in indicators if delta > 0]
+        }
+
+    def close(self):
+        # As views precisam ser liberadas antes de fechar o mmap
+        for view in reversed(self._views):
+            view.release()
+        self.bias = self.weights = None
+        self._mapped.close()
+
+def _sigmoid(value: float) -> float:
+    if value >= 0:
+        return 1 / (1 + math.exp(-value))
+    exp_value = math.exp(value)
+    return exp_value / (1 + exp_value)
+
+def write_model(path: str, algorithm: str, l2_norm: bool, hash_bits: int,
+                bias: List[float], weights, trained_examples: int):
+    """
+    Grava o arquivo de modelo. weights: sequência float32 intercalada
+    (bucket 0 classe 0, bucket 0 classe 1, bucket 1 classe 0...)
+    """
+    import array
+    bias_values = array.array('f', bias)
+    weight_values = weights if isinstance(weights, array.array) else array.array('f', weights)
+    if sys.byteorder != 'little':
+        bias_values.byteswap()
+        weight_values = array.array('f', weight_values)
+        weight_values.byteswap()
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temporary = path + '.tmp'
+    with open(temporary, 'wb') as model_file:
+        model_file.write(HEADER.pack(
+            MODEL_MAGIC, MODEL_FORMAT_VERSION, ALGORITHMS.index(algorithm), 1 if l2_norm else 0,
+            hash_bits, len(CLASSES), trained_examples, int(time.time())
+        ))
+        bias_values.tofile(model_file)
+        weight_values.tofile(model_file)
+    # Troca atômica: processos com o modelo anterior mapeado não são afetados
+    os.replace(temporary, path)
+
+class LinearEngine:
+    """
+    Engine de classificação baseada no modelo linear treinado.
+    Configurada em create_app (CLASSIFIER_MODEL_PATH); processos do pool
+    sem create_app leem o caminho do ambiente
+    """
+
+    def __init__(self):
+        self.path: Optional[str] = None
+        self.model: Optional[LinearModel] = None
+        self.error: Optional[str] = None
+        self._configured = False
+        self._lock = threading.Lock()
+
+    def configure(self, path: Optional[str] = None):
+        with self._lock:
+            self._configured = True
+            self.path = path or None
+            self._load()
+
+    def _load(self):
+        if self.model is not None:
+            self.model.close()
+        self.model = None
+        self.error = None
+        if self.path is None:
+            return
+        try:
+            self.model = LinearModel(self.path)
+        except (OSError, ValueError, ModelError) as e:
+            self.error = str(e)
+            print(f"Modelo linear indisponível: {self.error}")
+
+    def get_model(self) -> Optional[LinearModel]:
+        if not self._configured:
+            # Processo filho (spawn) sem create_app: configuração pelo ambiente
+            self.configure(os.environ.get('CLASSIFIER_MODEL_PATH'))
+        return self.model
+
+    @property
+    def available(self) -> bool:
+        return self.get_model() is not None
+
+    @property
+    def version(self) -> Optional[str]:
+        model = self.get_model()
+        return model.version if model is not None else None
+
+    def info(self) -> Dict:
+        model = self.get_model()
+        if model is None:
+            return {'available': False, 'path': self.path, 'error': self.error}
+        return {'available': True, **model.info()}
+
+# Instância global da engine linear
+linear_engine = LinearEngine()
+
+@profiled_stage('classify_email')
+def classify_linear(text: str, word_boundary: bool = False) -> Dict:
+    """
+    Classifica com o modelo linear. O resultado tem o mesmo formato de
+    classify_email; em analysis.scores, produtivo e improdutivo são as
+    probabilidades do modelo em %
+    """
+    model = linear_engine.get_model()
+    if model is None:
+        raise ModelError('Modelo linear não configurado (CLASSIFIER_MODEL_PATH)')
+
+    normalized = nlp_processor.normalize(text, word_boundary)
+    features = nlp_processor.extract_features(text, normalized)
+    started = time.perf_counter()
+    prediction = model.predict(extract_terms(normalized['tokens']))
+    record_stage('linear_scoring', time.perf_counter() - started)
+
+    probabilities = prediction['probabilities']
+    classification = max(CLASSES, key=probabilities.get)
+    probability = probabilities[classification]
+    return {
+        'classification': classification,
+        'confidence': round(min(MAX_CONFIDENCE, probability * 100), 1),
+        'suggestions': get_suggestions(classification),
+        'analysis': {
+            'features': features,
+            'scores': {
+                'produtivo': round(probabilities['Produtivo'] * 100, 1),
+                'improdutivo': round(probabilities['Improdutivo'] * 100, 1),
+                'urgency': normalized['urgency_score']
+            },
+            'reason': f"Modelo {model.algorithm} {model.version}: P({classification}) = {probability:.3f}",
+            'key_indicators': prediction['key_indicators'],
+            'engine': 'linear'
+        }
+    }
+
+@profiled_stage('classify_batch')
+def classify_batch_linear(texts: List[str], word_boundary: bool = False) -> List[Dict]:
+    """
+    classify_batch com o modelo linear: mesma ordem e isolamento de erros
+    """
+    results = []
+    for text in texts:
+        try:
+            results.append(classify_linear(text, word_boundary=word_boundary))
+        except ModelError:
+            raise
+        except Exception as e:
+            results.append({'status': 'error', 'error': str(e)})
+    return results
@@ -0,0 +1,448 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+from itertools import product
+from typing import Dict, List, Optional, Sequence, Tuple
+import glob
+import hashlib
+import mmap
+import os
+import threading
+import time
+
+# Limites dos buckets de latência (segundos) e de tamanho de entrada (bytes)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 5242880)
+
+# Valores possíveis de cada label: o conjunto é fixo para que cada série
+# tenha uma posição fixa no buffer compartilhado
+ENDPOINTS = ('classify', 'classify_batch', 'classify_stream', 'upload', 'upload_archive', 'jobs', 'health', 'liveness', 'readiness', 'categories', 'metrics', 'other')
+STAGES = ('process_file', 'content_reduction', 'preprocess', 'keyword_scoring', 'linear_scoring', 'urgency', 'response_encoding')
+CLASSIFICATIONS = ('Produtivo', 'Improdutivo')
+STATUS_CLASSES = ('4xx', '5xx')
+JOB_EVENTS = ('submitted', 'succeeded', 'failed', 'rejected', 'expired')
+LOOKUP_OUTCOMES = ('hit', 'miss', 'skipped')
+THREAD_EVENTS = ('created', 'updated', 'duplicate')
+SHED_REASONS = ('rate_limited', 'overloaded')
+
+# Endpoints do Flask (blueprint.função) -> label
+ENDPOINT_LABELS = {
+    'api.classify_email_text': 'classify',
+    'api.classify_email_batch': 'classify_batch',
+    'api.classify_email_stream': 'classify_stream',
+    'api.upload_file': 'upload',
+    'api.upload_archive': 'upload_archive',
+    'api.get_job': 'jobs',
+    'api.health_check': 'health',
+    'api.liveness_probe': 'liveness',
+    'api.readiness_probe': 'readiness',
+    'api.get_categories': 'categories',
+    'api.metrics_endpoint': 'metrics',
+}
+
+class Metric:
+    """
+    Série de métricas com labels de valores fixos. Cada combinação de
+    labels ocupa width posições consecutivas (float64) do buffer do registro
+    """
+
+    kind = ''
+    width = 1
+
+    def __init__(self, registry: 'MetricsRegistry', name: str, help_text: str, labels: Sequence[Tuple[str, Sequence[str]]]):
+        self.registry = registry
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label for label, _ in labels)
+        self.offsets: Dict[Tuple[str, ...], int] = {}
+        for combination in product(*(values for _, values in labels)):
+            self.offsets[combination] = registry.allocate(self.width)
+
+    def _offset(self, label_values: Tuple[str, ...]) -> int:
+        offset = self.offsets.get(label_values)
+        if offset is None:
+            raise ValueError(f"Labels desconhecidos para {self.name}: {label_values}")
+        return offset
+
+    def _format_labels(self, label_values: Tuple[str, ...], extra: str = '') -> str:
+        pairs = [f'{name}="{value}"' for name, value in zip(self.label_names, label_values)]
+        if extra:
+            pairs.append(extra)
+        return '{' + ','.join(pairs) + '}' if pairs else ''
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *label_values: str, amount: float = 1):
+        if self.registry.enabled:
+            self.registry.add(self._offset(label_values), amount)
+
+    def render(self, values: List[float]) -> List[str]:
+        return [
+            f'{self.name}{self._format_labels(label_values)} {_format_value(values[offset])}'
+            for label_values, offset in self.offsets.items()
+        ]
+
+class Gauge(Metric):
+    """
+    Valor instantâneo (ex.: profundidade de fila). Com METRICS_DIR, a
+    exposição soma o valor de todos os processos
+    """
+
+    kind = 'gauge'
+
+    def set(self, value: float, *label_values: str):
+        if self.registry.enabled:
+            self.registry.set(self._offset(label_values), value)
+
+    def inc(self, *label_values: str, amount: float = 1):
+        if self.registry.enabled:
+            self.registry.add(self._offset(label_values), amount)
+
+    def dec(self, *label_values: str, amount: float = 1):
+        self.inc(*label_values, amount=-amount)
+
+    def render(self, values: List[float]) -> List[str]:
+        return [
+            f'{self.name}{self._format_labels(label_values)} {_format_value(values[offset])}'
+            for label_values, offset in self.offsets.items()
+        ]
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, registry, name, help_text, labels, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        # Contagem por bucket (inclui +Inf), soma e total de observações
+        self.width = len(self.buckets) + 3
+        super().__init__(registry, name, help_text, labels)
+
+    def observe(self, value: float, *label_values: str):
+        registry = self.registry
+        if not registry.enabled:
+            return
+        offset = self.offsets.get(label_values)
+        if offset is None:
+            offset = self._offset(label_values)
+        bucket = bisect_left(self.buckets, value)
+        sum_index = offset + len(self.buckets) + 1
+        with registry.lock:
+            values = registry.values if registry.values is not None else registry.open()
+            values[offset + bucket] += 1
+            values[sum_index] += value
+            values[sum_index + 1] += 1
+
+    def time(self, *label_values: str) -> '_Timer':
+        return _Timer(self, label_values)
+
+    def render(self, values: List[float]) -> List[str]:
+        lines = []
+        for label_values, offset in self.offsets.items():
+            cumulative = 0.0
+            for index, bound in enumerate(self.buckets + (float('inf'),)):
+                cumulative += values[offset + index]
+                le = '+Inf' if bound == float('inf') else _format_value(bound)
+                labels = self._format_labels(label_values, 'le="' + le + '"')
+                lines.append(f'{self.name}_bucket{labels} {_format_value(cumulative)}')
+            lines.append(f'{self.name}_sum{self._format_labels(label_values)} {_format_value(values[offset + len(self.buckets) + 1])}')
+            lines.append(f'{self.name}_count{self._format_labels(label_values)} {_format_value(values[offset + len(self.buckets) + 2])}')
+        return lines
+
+class _Timer:
+    """Context manager que observa a duração do bloco em um histograma"""
+
+    __slots__ = ('histogram', 'label_values', 'started')
+
+    def __init__(self, histogram: Histogram, label_values: Tuple[str, ...]):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, *self.label_values)
+        return False
+
+class MetricsRegistry:
+    """
+    Registro de métricas em processo com exposição no formato texto do
+    Prometheus.
+    Os valores ficam em um buffer de float64 com layout fixo. Com um
+    diretório configurado (METRICS_DIR), o buffer é um arquivo mapeado em
+    memória por processo (metrics-<layout>-<pid>.db): cada worker do
+    gunicorn (e cada processo do pool) escreve no seu, e a exposição soma
+    os arquivos de todos os processos. Sem diretório, o buffer é anônimo e
+    a exposição cobre apenas o processo atual.
+    """
+
+    def __init__(self):
+        self.metrics: List[Metric] = []
+        self.size = 0
+        self.enabled = True
+        self.directory: Optional[str] = None
+        self._configured = False
+        self.lock = threading.Lock()
+        self.values = None
+        self._mapped = None
+        self._path = None
+
+    def counter(self, name: str, help_text: str, labels=()) -> Counter:
+        return self._register(Counter(self, name, help_text, labels))
+
+    def gauge(self, name: str, help_text: str, labels=()) -> Gauge:
+        return self._register(Gauge(self, name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels=(), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(self, name, help_text, labels, buckets))
+
+    def _register(self, metric: Metric) -> Metric:
+        if self.values is not None:
+            raise RuntimeError("Métricas devem ser registradas antes da primeira observação")
+        self.metrics.append(metric)
+        return metric
+
+    def allocate(self, width: int) -> int:
+        offset = self.size
+        self.size += width
+        return offset
+
+    @property
+    def layout(self) -> str:
+        """Hash do layout: arquivos de outra versão das métricas são ignorados"""
+        description = ';'.join(
+            f'{metric.name}:{getattr(metric, "buckets", ())}:{list(metric.offsets)}' for metric in self.metrics
+        )
+        return hashlib.sha1(description.encode('utf-8')).hexdigest()[:10]
+
+    def configure(self, enabled: bool = True, directory: Optional[str] = None):
+        """
+        Reconfigura o registro (chamado em create_app a partir de app.config).
+        Processos que não passam por create_app (pool de processos) leem a
+        configuração de METRICS_ENABLED/METRICS_DIR no ambiente
+        """
+        with self.lock:
+            self.enabled = enabled
+            self.directory = directory or None
+            self._configured = True
+            self._close()
+
+    @contextmanager
+    def suspended(self):
+        """
+        Desativa a coleta durante o bloco (warm-up no processo mestre)
+        """
+        enabled = self.enabled
+        self.enabled = False
+        try:
+            yield
+        finally:
+            self.enabled = enabled
+
+    def add(self, offset: int, amount: float):
+        with self.lock:
+            values = self.values if self.values is not None else self.open()
+            values[offset] += amount
+
+    def set(self, offset: int, value: float):
+        with self.lock:
+            values = self.values if self.values is not None else self.open()
+            values[offset] = value
+
+    def snapshot(self) -> List[float]:
+        """
+        Valores agregados: soma dos arquivos dos processos vivos com o mesmo
+        layout, ou apenas o buffer local sem diretório. Arquivos de processos
+        encerrados são removidos: os gauges (requisições em andamento, fila)
+        refletem só os workers atuais
+        """
+        with self.lock:
+            if self.values is None:
+                self.open()
+            if self.directory is None:
+                return list(self.values)
+            paths = glob.glob(os.path.join(self.directory, f'metrics-{self.layout}-*.db'))
+
+        totals = [0.0] * self.size
+        for path in paths:
+            pid = _file_pid(path)
+            if pid is None:
+                continue
+            if not _pid_alive(pid):
+                _remove(path)
+                continue
+            try:
+                with open(path, 'rb') as metrics_file:
+                    data = metrics_file.read(self.size * 8)
+            except OSError:
+                continue  # Arquivo removido entre o glob e a leitura
+            if len(data) < self.size * 8:
+                continue
+            for index, value in enumerate(memoryview(data).cast('d')):
+                totals[index] += value
+        return totals
+
+    def render(self) -> str:
+        values = self.snapshot()
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.help_text}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.render(values))
+        return '\n'.join(lines) + '\n'
+
+    def open(self):
+        """
+        Cria o buffer do processo atual (chamado com o lock adquirido)
+        """
+        if not self._configured:
+            # Processo filho (spawn) sem create_app: configuração pelo ambiente
+            self.enabled = os.environ.get('METRICS_ENABLED', 'true').lower() in ('1', 'true')
+            self.directory = os.environ.get('METRICS_DIR') or None
+            self._configured = True
+
+        if self.directory is None:
+            self.values = memoryview(bytearray(self.size * 8)).cast('d')
+            return self.values
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._path = os.path.join(self.directory, f'metrics-{self.layout}-{os.getpid()}.db')
+        with open(self._path, 'a+b') as metrics_file:
+            # Um arquivo com o mesmo pid é de um processo já encerrado: zera
+            metrics_file.truncate(0)
+            metrics_file.truncate(self.size * 8)
+            self._mapped = mmap.mmap(metrics_file.fileno(), self.size * 8)
+        self.values = memoryview(self._mapped).cast('d')
+        return self.values
+
+    def mark_process_dead(self, pid: int):
+        """
+        Remove os arquivos de um processo encerrado (hook child_exit do
+        gunicorn); sem o hook, a limpeza acontece no próximo snapshot
+        """
+        directory = self.directory or os.environ.get('METRICS_DIR')
+        if not directory:
+            return
+        for path in glob.glob(os.path.join(directory, f'metrics-*-{pid}.db')):
+            _remove(path)
+
+    def _close(self):
+        if self.values is not None:
+            self.values.release()
+            self.values = None
+        if self._mapped is not None:
+            self._mapped.close()
+            self._mapped = None
+
+    def _after_fork(self):
+        """
+        Após fork (gunicorn --preload), o filho não pode escrever no arquivo
+        do pai: descarta o buffer herdado e abre o seu na próxima observação
+        """
+        self.lock = threading.Lock()
+        self.values = None
+        self._mapped = None
+        self._path = None
+
+def _file_pid(path: str) -> Optional[int]:
+    """Pid no nome do arquivo (metrics-<layout>-<pid>.db)"""
+    try:
+        return int(os.path.basename(path)[:-3].rsplit('-', 1)[1])
+    except (IndexError, ValueError):
+        return None
+
+def _pid_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Processo existe, mas de outro usuário
+    return True
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass  # Já removido por outro processo
+
+def _format_value(value: float) -> str:
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+# Registro global e métricas da aplicação
+metrics = MetricsRegistry()
+
+REQUEST_DURATION = metrics.histogram(
+    'email_classifier_request_duration_seconds',
+    'Duração das requisições por endpoint (até o fim do envio da resposta)',
+    labels=[('endpoint', ENDPOINTS)]
+)
+STAGE_DURATION = metrics.histogram(
+    'email_classifier_stage_duration_seconds',
+    'Duração de cada etapa do processamento',
+    labels=[('stage', STAGES)]
+)
+INPUT_BYTES = metrics.histogram(
+    'email_classifier_input_bytes',
+    'Tamanho do corpo das requisições por endpoint',
+    labels=[('endpoint', ENDPOINTS)],
+    buckets=SIZE_BUCKETS
+)
+CLASSIFICATIONS_TOTAL = metrics.counter(
+    'email_classifier_classifications_total',
+    'Emails classificados por categoria (inclui resultados do cache)',
+    labels=[('classification', CLASSIFICATIONS)]
+)
+ERRORS_TOTAL = metrics.counter(
+    'email_classifier_errors_total',
+    'Respostas de erro por endpoint e classe de status',
+    labels=[('endpoint', ENDPOINTS), ('status', STATUS_CLASSES)]
+)
+
+NEAR_DUPLICATE_LOOKUPS = metrics.counter(
+    'email_classifier_near_duplicate_lookups_total',
+    'Consultas ao índice de quase-duplicatas (skipped: texto curto ou longo demais para o índice)',
+    labels=[('outcome', LOOKUP_OUTCOMES)]
+)
+ADMISSION_SHED = metrics.counter(
+    'email_classifier_admission_shed_total',
+    'Requisições recusadas pelo controle de admissão (rate_limited: 429 por cliente, overloaded: 503 sem capacidade)',
+    labels=[('endpoint', ENDPOINTS), ('reason', SHED_REASONS)]
+)
+ADMISSION_IN_FLIGHT = metrics.gauge(
+    'email_classifier_admission_in_flight_units',
+    'Unidades de capacidade ocupadas (ponderadas pelo tamanho da entrada) por requisições em andamento'
+)
+ADMISSION_IN_FLIGHT_REQUESTS = metrics.gauge(
+    'email_classifier_admission_in_flight_requests',
+    'Requisições de classificação e upload admitidas e ainda em andamento'
+)
+THREAD_MESSAGES = metrics.counter(
+    'email_classifier_thread_messages_total',
+    'Mensagens classificadas no modo thread (thread nova, thread existente, reenvio ignorado)',
+    labels=[('event', THREAD_EVENTS)]
+)
+JOBS_TOTAL = metrics.counter(
+    'email_classifier_jobs_total',
+    'Jobs assíncronos por evento (submetidos, concluídos, com falha, rejeitados com a fila cheia, expirados)',
+    labels=[('event', JOB_EVENTS)]
+)
+JOB_QUEUE_DEPTH = metrics.gauge(
+    'email_classifier_job_queue_depth',
+    'Jobs assíncronos aguardando um worker'
+)
+JOB_WAIT = metrics.histogram(
+    'email_classifier_job_wait_seconds',
+    'Tempo de espera dos jobs assíncronos na fila até começarem a rodar'
+)
+
+os.register_at_fork(after_in_child=metrics._after_fork)
+
+def count_classification(result: Dict):
+    classification = result.get('classification')
+    if classification in CLASSIFICATIONS:
+        CLASSIFICATIONS_TOTAL.inc(classification)
@@ -0,0 +1,200 @@
+"""
+Treino offline do modelo linear (engine "linear") a partir de emails rotulados.
+
+    python -m app.services.model_training --data rotulados.jsonl --output models/linear.bin
+    python -m app.services.model_training --data rotulados.jsonl --output models/linear.bin --algorithm logreg
+
+Cada linha do JSONL é um objeto com o texto em "text" (ou "title" + "body")
+e o rótulo em "label" (ou "classification"): Produtivo ou Improdutivo.
+Os termos (unigramas e bigramas) vêm do mesmo pré-processamento usado na
+inferência. Uma fração dos exemplos (--holdout) fica fora do treino para
+medir a acurácia.
+"""
+from app.services.linear_model import (
+    ALGORITHMS, CLASSES, DEFAULT_HASH_BITS, LinearModel, extract_terms, term_bucket, write_model
+)
+from app.services.nlp_processor import nlp_processor
+from app.services.stream_processor import record_text
+from typing import Dict, Iterator, List, Optional, Tuple
+import argparse
+import array
+import json
+import math
+import random
+import sys
+import time
+
+DEFAULT_HOLDOUT = 0.1
+DEFAULT_ALPHA = 1.0
+DEFAULT_EPOCHS = 5
+DEFAULT_LEARNING_RATE = 0.5
+DEFAULT_L2 = 1e-6
+
+# Exemplo: lista de (bucket, contagem) e índice da classe
+Example = Tuple[List[Tuple[int, int]], int]
+
+def read_examples(path: str, mask: int) -> Iterator[Example]:
+    """
+    Lê o JSONL rotulado linha a linha e gera os termos já com hashing
+    Linhas inválidas ou sem rótulo conhecido são ignoradas com aviso
+    """
+    with open(path, encoding='utf-8') as data_file:
+        for line_number, line in enumerate(data_file, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                print(f"Linha {line_number}: JSON inválido, ignorada", file=sys.stderr)
+                continue
+
+            label = record.get('label', record.get('classification')) if isinstance(record, dict) else None
+            text = record_text(record) if isinstance(record, dict) else None
+            if label not in CLASSES or not isinstance(text, str) or not text.strip():
+                print(f"Linha {line_number}: texto ou rótulo ausente, ignorada", file=sys.stderr)
+                continue
+
+            buckets: Dict[int, int] = {}
+            for term, count in extract_terms(nlp_processor.normalize(text)['tokens']).items():
+                bucket = term_bucket(term, mask)
+                buckets[bucket] = buckets.get(bucket, 0) + count
+            yield list(buckets.items()), CLASSES.index(label)
+
+def train_naive_bayes(examples: List[Example], hash_bits: int, alpha: float) -> Tuple[List[float], array.array]:
+    """
+    Naive Bayes multinomial com suavização de Laplace: o peso de cada bucket
+    é log P(termo | classe) e o bias é log P(classe)
+    """
+    size = 1 << hash_bits
+    term_counts = [[0] * size for _ in CLASSES]
+    totals = [0] * len(CLASSES)
+    documents = [0] * len(CLASSES)
+
+    for buckets, label in examples:
+        counts = term_counts[label]
+        documents[label] += 1
+        for bucket, count in buckets:
+            counts[bucket] += count
+            totals[label] += count
+
+    bias = [math.log((documents[label] + 1) / (len(examples) + len(CLASSES))) for label in range(len(CLASSES))]
+    denominators = [math.log(totals[label] + alpha * size) for label in range(len(CLASSES))]
+    weights = array.array('f', bytes(4 * size * len(CLASSES)))
+    for bucket in range(size):
+        for label in range(len(CLASSES)):
+            weights[bucket * len(CLASSES) + label] = math.log(term_counts[label][bucket] + alpha) - denominators[label]
+    return bias, weights
+
+def train_logistic_regression(examples: List[Example], hash_bits: int, epochs: int,
+                              learning_rate: float, l2: float, seed: int) -> Tuple[List[float], array.array]:
+    """
+    Regressão logística (Produtivo vs Improdutivo) por SGD sobre vetores
+    normalizados (L2). Gravada como duas classes com os pesos de
+    Improdutivo zerados: a margem do modelo é a mesma
+    """
+    size = 1 << hash_bits
+    coefficients = [0.0] * size
+    intercept = 0.0
+    rng = random.Random(seed)
+    order = list(range(len(examples)))
+
+    normalized = []
+    for buckets, label in examples:
+        norm = math.sqrt(sum(count * count for _, count in buckets)) or 1.0
+        normalized.append(([(bucket, count / norm) for bucket, count in buckets], 1.0 if label == 0 else 0.0))
+
+    for epoch in range(epochs):
+        rng.shuffle(order)
+        rate = learning_rate / (1 + epoch)
+        for index in order:
+            vector, target = normalized[index]
+            margin = intercept + sum(coefficients[bucket] * value for bucket, value in vector)
+            gradient = _sigmoid(margin) - target
+            for bucket, value in vector:
+                coefficients[bucket] -= rate * (gradient * value + l2 * coefficients[bucket])
+            intercept -= rate * gradient
+
+    weights = array.array('f', bytes(4 * size * len(CLASSES)))
+    for bucket, coefficient in enumerate(coefficients):
+        if coefficient:
+            weights[bucket * len(CLASSES)] = coefficient
+    return [intercept, 0.0], weights
+
+def _sigmoid(value: float) -> float:
+    if value >= 0:
+        return 1 / (1 + math.exp(-value))
+    exp_value = math.exp(value)
+    return exp_value / (1 + exp_value)
+
+def evaluate(model: LinearModel, examples: List[Example]) -> Optional[float]:
+    """
+    Acurácia do modelo gravado sobre os exemplos de validação
+    """
+    if not examples:
+        return None
+    hits = 0
+    for buckets, label in examples:
+        scores = list(model.bias)
+        squares = sum(count * count for _, count in buckets)
+        scale = 1 / math.sqrt(squares) if model.l2_norm and squares else 1.0
+        for bucket, count in buckets:
+            for index in range(len(CLASSES)):
+                scores[index] += count * scale * model.weights[bucket * len(CLASSES) + index]
+        hits += scores.index(max(scores)) == label
+    return hits / len(examples)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Treina o modelo linear do classificador de emails')
+    parser.add_argument('--data', required=True, help='JSONL rotulado (text/title+body e label)')
+    parser.add_argument('--output', required=True, help='arquivo de modelo gerado')
+    parser.add_argument('--algorithm', choices=ALGORITHMS, default='nb', help='nb (Naive Bayes) ou logreg')
+    parser.add_argument('--hash-bits', type=int, default=DEFAULT_HASH_BITS,
+                        help='tamanho da tabela de pesos: 2^bits buckets')
+    parser.add_argument('--holdout', type=float, default=DEFAULT_HOLDOUT, help='fração separada para validação')
+    parser.add_argument('--alpha', type=float, default=DEFAULT_ALPHA, help='suavização do Naive Bayes')
+    parser.add_argument('--epochs', type=int, default=DEFAULT_EPOCHS, help='épocas da regressão logística')
+    parser.add_argument('--learning-rate', type=float, default=DEFAULT_LEARNING_RATE)
+    parser.add_argument('--l2', type=float, default=DEFAULT_L2, help='regularização L2 da regressão logística')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    if not 1 <= args.hash_bits <= 24:
+        parser.error('--hash-bits deve estar entre 1 e 24')
+
+    started = time.perf_counter()
+    examples = list(read_examples(args.data, (1 << args.hash_bits) - 1))
+    if not examples:
+        print('Nenhum exemplo válido encontrado', file=sys.stderr)
+        return 1
+
+    random.Random(args.seed).shuffle(examples)
+    holdout_size = int(len(examples) * args.holdout) if len(examples) > 1 else 0
+    validation, training = examples[:holdout_size], examples[holdout_size:]
+
+    if args.algorithm == 'nb':
+        bias, weights = train_naive_bayes(training, args.hash_bits, args.alpha)
+    else:
+        bias, weights = train_logistic_regression(
+            training, args.hash_bits, args.epochs, args.learning_rate, args.l2, args.seed
+        )
+    write_model(args.output, args.algorithm, args.algorithm == 'logreg', args.hash_bits,
+                bias, weights, len(training))
+
+    model = LinearModel(args.output)
+    accuracy = evaluate(model, validation)
+    report = {
+        'model': model.info(),
+        'examples': len(examples),
+        'training': len(training),
+        'validation': len(validation),
+        'labels': {name: sum(1 for _, label in training if label == index) for index, name in enumerate(CLASSES)},
+        'validation_accuracy': round(accuracy, 4) if accuracy is not None else None,
+        'elapsed_seconds': round(time.perf_counter() - started, 2)
+    }
+    model.close()
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
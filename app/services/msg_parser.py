@@ -0,0 +1,226 @@
+from app.services.eml_parser import strip_html
+from typing import BinaryIO, Dict, List, Optional, Tuple
+import mmap
+import struct
+import tempfile
+
+CFB_SIGNATURE = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+
+# Marcadores especiais da FAT
+END_OF_CHAIN = 0xFFFFFFFE
+FREE_SECTOR = 0xFFFFFFFF
+NO_STREAM = 0xFFFFFFFF
+
+# Tipos de entrada do diretório
+STREAM_OBJECT = 2
+
+# Streams de propriedades do .msg (nível raiz): assunto, corpo e corpo HTML
+# Sufixo 001F = Unicode (UTF-16LE), 001E = 8 bits, 0102 = binário
+SUBJECT_STREAMS = ('__substg1.0_0037001F', '__substg1.0_0037001E')
+BODY_STREAMS = ('__substg1.0_1000001F', '__substg1.0_1000001E')
+HTML_STREAMS = ('__substg1.0_10130102', '__substg1.0_1013001F', '__substg1.0_1013001E')
+
+# Orçamento padrão de bytes lidos do corpo
+DEFAULT_BODY_BUDGET = 64 * 1024
+
+class CompoundFile:
+    """
+    Leitor mínimo de Compound File Binary (OLE2), o contêiner dos .msg.
+    Trabalha sobre um buffer mapeado (mmap ou memoryview) e lê apenas os
+    setores das cadeias solicitadas, seguindo FAT/miniFAT e o diretório.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        if len(data) < 512 or bytes(data[:8]) != CFB_SIGNATURE:
+            raise ValueError("Arquivo .msg inválido (não é um compound file OLE)")
+
+        sector_shift, mini_sector_shift = struct.unpack_from('<HH', data, 0x1E)
+        self.sector_size = 1 << sector_shift
+        self.mini_sector_size = 1 << mini_sector_shift
+        (fat_sector_count, self.first_directory_sector, _, self.mini_stream_cutoff,
+         self.first_mini_fat_sector, mini_fat_sector_count,
+         first_difat_sector, difat_sector_count) = struct.unpack_from('<IIIIIIII', data, 0x2C)
+
+        self.max_sectors = (len(data) - self.sector_size) // self.sector_size + 1
+        self.fat = self._load_fat(fat_sector_count, first_difat_sector, difat_sector_count)
+        self.mini_fat: Optional[List[int]] = None
+        self.mini_stream_sectors: Optional[List[int]] = None
+        self.bytes_read = 0
+
+        self.directory = self._load_directory()
+        self.root = self.directory[0]
+
+    def _sector_offset(self, sector: int) -> int:
+        if sector >= self.max_sectors:
+            raise ValueError("Compound file corrompido: setor fora do arquivo")
+        return (sector + 1) * self.sector_size
+
+    def _load_fat(self, fat_sector_count: int, first_difat_sector: int, difat_sector_count: int) -> List[int]:
+        # Primeiros 109 setores da FAT ficam no próprio header (DIFAT)
+        fat_sectors = [s for s in struct.unpack_from('<109I', self.data, 0x4C) if s != FREE_SECTOR]
+
+        entries_per_sector = self.sector_size // 4
+        difat_sector = first_difat_sector
+        for _ in range(difat_sector_count):
+            if difat_sector in (END_OF_CHAIN, FREE_SECTOR):
+                break
+            entries = struct.unpack_from(f'<{entries_per_sector}I', self.data, self._sector_offset(difat_sector))
+            fat_sectors.extend(s for s in entries[:-1] if s != FREE_SECTOR)
+            difat_sector = entries[-1]
+
+        fat: List[int] = []
+        for sector in fat_sectors[:fat_sector_count]:
+            fat.extend(struct.unpack_from(f'<{entries_per_sector}I', self.data, self._sector_offset(sector)))
+        return fat
+
+    def _chain(self, start: int, table: List[int], limit: Optional[int] = None) -> List[int]:
+        """
+        Segue uma cadeia de setores; limit interrompe após N setores
+        """
+        chain = []
+        sector = start
+        while sector not in (END_OF_CHAIN, FREE_SECTOR) and (limit is None or len(chain) < limit):
+            if sector >= len(table) or len(chain) > len(table):
+                raise ValueError("Compound file corrompido: cadeia de setores inválida")
+            chain.append(sector)
+            sector = table[sector]
+        return chain
+
+    def _load_directory(self) -> List[Dict]:
+        entries = []
+        for sector in self._chain(self.first_directory_sector, self.fat):
+            base = self._sector_offset(sector)
+            for offset in range(base, base + self.sector_size, 128):
+                name_length, object_type = struct.unpack_from('<HB', self.data, offset + 64)
+                left, right, child = struct.unpack_from('<III', self.data, offset + 68)
+                start, size = struct.unpack_from('<IQ', self.data, offset + 116)
+                name = bytes(self.data[offset:offset + max(name_length - 2, 0)]).decode('utf-16-le', errors='ignore')
+                if self.sector_size == 512:
+                    size &= 0xFFFFFFFF  # Versão 3: apenas os 32 bits baixos são válidos
+                entries.append({
+                    'name': name, 'type': object_type,
+                    'left': left, 'right': right, 'child': child,
+                    'start': start, 'size': size
+                })
+        return entries
+
+    def children(self, storage: Dict) -> Dict[str, Dict]:
+        """
+        Entradas filhas diretas de um storage (árvore red-black do diretório)
+        """
+        found = {}
+        pending = [storage['child']]
+        while pending:
+            index = pending.pop()
+            if index == NO_STREAM or index >= len(self.directory) or len(found) > len(self.directory):
+                continue
+            entry = self.directory[index]
+            found[entry['name']] = entry
+            pending.extend((entry['left'], entry['right']))
+        return found
+
+    def read_stream(self, entry: Dict, max_bytes: Optional[int] = None) -> bytes:
+        """
+        Lê um stream (no máximo max_bytes), tocando apenas os setores necessários
+        """
+        size = entry['size'] if max_bytes is None else min(entry['size'], max_bytes)
+        if entry['size'] < self.mini_stream_cutoff:
+            data = self._read_mini_stream(entry['start'], size)
+        else:
+            sectors_needed = -(-size // self.sector_size)
+            data = b''.join(
+                bytes(self.data[self._sector_offset(s):self._sector_offset(s) + self.sector_size])
+                for s in self._chain(entry['start'], self.fat, sectors_needed)
+            )[:size]
+        self.bytes_read += len(data)
+        return data
+
+    def _read_mini_stream(self, start: int, size: int) -> bytes:
+        if self.mini_fat is None:
+            self.mini_fat = []
+            entries_per_sector = self.sector_size // 4
+            for sector in self._chain(self.first_mini_fat_sector, self.fat):
+                self.mini_fat.extend(struct.unpack_from(f'<{entries_per_sector}I', self.data, self._sector_offset(sector)))
+            self.mini_stream_sectors = self._chain(self.root['start'], self.fat)
+
+        sectors_needed = -(-size // self.mini_sector_size)
+        parts = []
+        for mini_sector in self._chain(start, self.mini_fat, sectors_needed):
+            position = mini_sector * self.mini_sector_size
+            index, offset = divmod(position, self.sector_size)
+            if index >= len(self.mini_stream_sectors):
+                raise ValueError("Compound file corrompido: mini setor fora do mini stream")
+            base = self._sector_offset(self.mini_stream_sectors[index]) + offset
+            parts.append(bytes(self.data[base:base + self.mini_sector_size]))
+        return b''.join(parts)[:size]
+
+def _map_upload(stream: BinaryIO):
+    """
+    Obtém uma visão do upload sem copiá-lo: memoryview para uploads em
+    memória (BytesIO) ou mmap do arquivo temporário em disco. O werkzeug
+    entrega os uploads em SpooledTemporaryFile: enquanto ainda está em
+    memória, o buffer interno é usado direto (fileno() forçaria a gravação
+    em disco)
+    """
+    if isinstance(stream, tempfile.SpooledTemporaryFile) and not stream._rolled:
+        stream = stream._file
+    if hasattr(stream, 'getbuffer'):
+        return stream.getbuffer(), None
+    try:
+        mapped = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        return mapped, mapped
+    except (AttributeError, OSError, ValueError):
+        stream.seek(0)
+        return stream.read(), None
+
+def _decode_property(name: str, raw: bytes) -> str:
+    if name.endswith('001F'):
+        return raw.decode('utf-16-le', errors='ignore').rstrip('\x00')
+    try:
+        return raw.decode('utf-8').rstrip('\x00')
+    except UnicodeDecodeError:
+        return raw.decode('cp1252', errors='ignore').rstrip('\x00')
+
+def parse_msg(stream: BinaryIO, body_budget: int = DEFAULT_BODY_BUDGET) -> Tuple[Optional[str], Dict]:
+    """
+    Extrai assunto e corpo de um .msg lendo apenas os streams de propriedade
+    correspondentes; anexos, destinatários e demais streams nunca são lidos.
+    Retorna (None, info) se o arquivo não for um compound file OLE
+    """
+    info = {'parser': 'msg', 'streams_read': [], 'bytes_read': 0}
+    data, mapped = _map_upload(stream)
+    try:
+        if len(data) < 8 or bytes(data[:8]) != CFB_SIGNATURE:
+            return None, info
+
+        compound = CompoundFile(data)
+        entries = {
+            name: entry for name, entry in compound.children(compound.root).items()
+            if entry['type'] == STREAM_OBJECT
+        }
+
+        def read_first(names, max_bytes):
+            for name in names:
+                if name in entries:
+                    info['streams_read'].append(name)
+                    # Streams UTF-16 usam 2 bytes por caractere
+                    limit = max_bytes * 2 if name.endswith('001F') else max_bytes
+                    return _decode_property(name, compound.read_stream(entries[name], limit))
+            return ''
+
+        subject = read_first(SUBJECT_STREAMS, 4096).strip()
+        body = read_first(BODY_STREAMS, body_budget)
+        if not body.strip():
+            body = strip_html(read_first(HTML_STREAMS, body_budget))
+
+        info['bytes_read'] = compound.bytes_read
+        info['sector_size'] = compound.sector_size
+        text = f"{subject}\n\n{body}" if subject else body
+        return text, info
+    finally:
+        # memoryview de BytesIO precisa ser liberado para o buffer voltar a ser redimensionável
+        if isinstance(data, memoryview):
+            data.release()
+        if mapped is not None:
+            mapped.close()
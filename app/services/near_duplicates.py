@@ -0,0 +1,221 @@
+from app.services.email_classifier import get_suggestions
+from app.services.metrics import NEAR_DUPLICATE_LOOKUPS
+from app.services.nlp_processor import WORD_PATTERN
+from collections import Counter, OrderedDict
+from typing import Dict, NamedTuple, Optional
+import heapq
+import re
+import threading
+
+# Números (valores, protocolos, datas) viram um único token: avisos de um
+# mesmo modelo que só diferem nesses campos ficam com os mesmos shingles
+DIGITS_PATTERN = re.compile(r'\d+')
+
+# Tamanho do sketch (bottom-k: os k menores hashes dos shingles de 3 tokens)
+SKETCH_SIZE = 64
+
+# Menores hashes do sketch usados como chaves do índice: um quase-duplicado
+# compartilha pelo menos um deles com alta probabilidade
+INDEX_HASHES = 8
+
+# Candidatos verificados por consulta (os que compartilham mais chaves)
+MAX_CANDIDATES = 16
+
+# Textos com menos shingles que isso não entram no índice: em textos muito
+# curtos, um token diferente muda o sentido
+MIN_SHINGLES = 8
+
+class Fingerprint(NamedTuple):
+    value: str
+    sketch: tuple
+    members: frozenset
+
+class NearDuplicateIndex:
+    """
+    Índice de quase-duplicatas (MinHash bottom-k com LSH) para reaproveitar
+    classificações de campanhas em massa e avisos de um mesmo modelo, que o
+    cache exato perde por diferirem em nome, valor ou protocolo.
+    Cada email vira o conjunto de shingles de 3 tokens (tokens do
+    EmailNLPProcessor, números normalizados); o sketch guarda os
+    SKETCH_SIZE menores hashes. A busca só verifica as entradas que
+    compartilham um dos INDEX_HASHES menores hashes (sublinear no tamanho
+    do índice) e estima a similaridade de Jaccard pelos sketches.
+    O índice é limitado (LRU) e guarda apenas a decisão (classe, confiança,
+    scores), nunca o texto ou as features do email original
+    """
+
+    def __init__(self, max_entries: int = 4096, threshold: float = 0.9, max_chars: int = 20000):
+        self.enabled = max_entries > 0
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.max_chars = max_chars
+        self._entries: OrderedDict = OrderedDict()
+        self._buckets: Dict[tuple, set] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'skipped': 0, 'evictions': 0}
+
+    def configure(self, enabled: bool = True, max_entries: int = 4096, threshold: float = 0.9, max_chars: int = 20000):
+        """
+        Reconfigura o índice (chamado em create_app a partir de app.config)
+        """
+        with self._lock:
+            self.enabled = enabled and max_entries > 0
+            self.max_entries = max_entries
+            self.threshold = threshold
+            self.max_chars = max_chars
+            self._entries.clear()
+            self._buckets.clear()
+
+    def fingerprint(self, text: str) -> Optional[Fingerprint]:
+        """
+        Sketch do texto, ou None se o índice estiver desligado ou o texto
+        for longo (max_chars) ou curto demais para comparação
+        """
+        if not self.enabled:
+            return None
+        if len(text) > self.max_chars:
+            self._skip()
+            return None
+
+        tokens = WORD_PATTERN.findall(DIGITS_PATTERN.sub('0', text.lower()))
+        # Hashes de tupla: estáveis dentro do processo (e nos workers
+        # criados por fork), que é o escopo do índice
+        shingles = set(map(hash, zip(tokens, tokens[1:], tokens[2:])))
+        if len(shingles) < MIN_SHINGLES:
+            self._skip()
+            return None
+
+        sketch = tuple(heapq.nsmallest(SKETCH_SIZE, shingles))
+        return Fingerprint(format(hash(sketch) & 0xFFFFFFFFFFFFFFFF, '016x'), sketch, frozenset(sketch))
+
+    def lookup(self, fingerprint: Fingerprint, scope: str, text: str) -> Optional[Dict]:
+        """
+        Resultado reaproveitado do quase-duplicado mais similar acima do
+        limite, com near_duplicate = {fingerprint, matched_fingerprint, similarity}
+        """
+        with self._lock:
+            votes = Counter()
+            for value in fingerprint.sketch[:INDEX_HASHES]:
+                votes.update(self._buckets.get((scope, value), ()))
+
+            best = None
+            best_similarity = 0.0
+            for entry_id, _ in votes.most_common(MAX_CANDIDATES):
+                entry = self._entries[entry_id]
+                similarity = _similarity(fingerprint.members, entry['members'])
+                if similarity > best_similarity:
+                    best, best_similarity = entry_id, similarity
+
+            if best is None or best_similarity < self.threshold:
+                self._counters['misses'] += 1
+                outcome = None
+            else:
+                self._entries.move_to_end(best)
+                self._counters['hits'] += 1
+                outcome = self._entries[best]
+
+        NEAR_DUPLICATE_LOOKUPS.inc('miss' if outcome is None else 'hit')
+        if outcome is None:
+            return None
+        return _reuse(outcome, fingerprint, best_similarity, text)
+
+    def add(self, fingerprint: Fingerprint, scope: str, result: Dict):
+        """
+        Indexa a decisão de um email recém-classificado
+        """
+        analysis = result.get('analysis', {})
+        entry = {
+            'scope': scope,
+            'fingerprint': fingerprint.value,
+            'sketch': fingerprint.sketch,
+            'members': fingerprint.members,
+            'classification': result['classification'],
+            'confidence': result['confidence'],
+            'scores': analysis.get('scores'),
+            'reason': analysis.get('reason'),
+            'key_indicators': analysis.get('key_indicators', []),
+            'engine': analysis.get('engine')
+        }
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = entry
+            for value in fingerprint.sketch[:INDEX_HASHES]:
+                self._buckets.setdefault((scope, value), set()).add(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._evict()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self._counters['hits'] + self._counters['misses']
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'threshold': self.threshold,
+                'max_chars': self.max_chars,
+                'hit_rate': round(self._counters['hits'] / lookups, 4) if lookups else 0.0,
+                **self._counters
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def _evict(self):
+        # Chamado com o lock adquirido: remove a entrada menos usada e suas chaves
+        entry_id, entry = self._entries.popitem(last=False)
+        for value in entry['sketch'][:INDEX_HASHES]:
+            key = (entry['scope'], value)
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[key]
+        self._counters['evictions'] += 1
+
+    def _skip(self):
+        with self._lock:
+            self._counters['skipped'] += 1
+        NEAR_DUPLICATE_LOOKUPS.inc('skipped')
+
+def _similarity(first: frozenset, second: frozenset) -> float:
+    """
+    Estimativa de Jaccard por sketches bottom-k: fração dos k menores hashes
+    da união que estão nos dois sketches
+    """
+    union = heapq.nsmallest(SKETCH_SIZE, first | second)
+    if not union:
+        return 0.0
+    shared = first & second
+    return sum(1 for value in union if value in shared) / len(union)
+
+def _reuse(entry: Dict, fingerprint: Fingerprint, similarity: float, text: str) -> Dict:
+    """
+    Resultado para o email consultado a partir da decisão indexada. Os
+    indicadores do email original só são mantidos se aparecem no texto atual
+    """
+    lower_text = text.lower()
+    analysis = {
+        'scores': dict(entry['scores']) if entry['scores'] else entry['scores'],
+        'reason': entry['reason'],
+        'key_indicators': [indicator for indicator in entry['key_indicators'] if indicator in lower_text]
+    }
+    if entry['engine'] is not None:
+        analysis['engine'] = entry['engine']
+    return {
+        'classification': entry['classification'],
+        'confidence': entry['confidence'],
+        'suggestions': get_suggestions(entry['classification']),
+        'analysis': analysis,
+        'near_duplicate': {
+            'fingerprint': fingerprint.value,
+            'matched_fingerprint': entry['fingerprint'],
+            'similarity': round(similarity, 4)
+        }
+    }
+
+# Instância global do índice de quase-duplicatas
+near_duplicate_index = NearDuplicateIndex()
@@ -1,5 +1,30 @@
 import re
 from typing import List, Dict
+from app.services.keyword_matcher import KeywordMatcher
+from app.services.profiler import record_stage, profiled_stage
+import time
+
+# Palavras de urgência - contadas sobre o texto original em minúsculas
+URGENCY_WORDS = [
+    'urgente', 'emergência', 'imediato', 'asap', 'priority', 'prioridade',
+    'crítico', 'importante', 'problema', 'erro', 'falha', 'parou', 
+    'quebrou', 'não funciona', 'help', 'socorro', 'rapidamente'
+]
+
+# Ruído removido em uma única passada, com a mesma precedência da limpeza
+# sequencial: emails (tokens inteiros com @), URLs http, URLs www (até um
+# http seguinte) e telefones que não terminam dentro de um email
+NOISE_PATTERN = re.compile(
+    r'(?<!\S)\S+@\S+'
+    r'|http\S+'
+    r'|www\.(?:(?!http\S)\S)+'
+    r'|\(?\d{2,3}\)?[-.\s]?\d{4,5}[-.\s]?\d{4}(?![^\s@]*@\S)'
+)
+
+# Tokens: apenas letras, números e acentos do português
+WORD_PATTERN = re.compile(r'[a-záàâãéèêíìîóòôõúùûüç\d]+')
+
+URL_HINT_PATTERN = re.compile(r'http|www\.|\.com|\.br')
 
 class EmailNLPProcessor:
     """Processador básico de NLP para emails - conforme requisitos do desafio"""
@@ -17,6 +42,65 @@ class EmailNLPProcessor:
             'como', 'porque', 'então', 'assim', 'depois', 'antes', 'agora',
             'hoje', 'ontem', 'amanhã', 'sempre', 'nunca', 'talvez', 'sim', 'não'
         }
+        
+        # Autômato de urgência compilado uma vez (peso 1 por ocorrência)
+        self.urgency_matcher = KeywordMatcher({
+            'urgency': {word: 1 for word in URGENCY_WORDS}
+        })
+    
+    def normalize(self, text: str, word_boundary: bool = False, urgency: bool = True) -> Dict:
+        """
+        Normalização fundida: minúsculas, limpeza de ruído e tokenização em
+        uma passada, junto com flags (perguntas, exclamações, URLs, emails)
+        e o score de urgência. O resultado é compartilhado por
+        extract_features, calculate_urgency_score e classify_email.
+        Com urgency=False (scoring incremental, que conta a urgência sobre o
+        texto inteiro), os pontos de urgência ficam em zero
+        """
+        text = text or ""
+        lower_text = text.lower()
+        tokens = self._tokenize(lower_text)
+        exclamation_count = lower_text.count('!')
+        urgency_points = self._urgency_points(lower_text, exclamation_count, word_boundary) if urgency else 0.0
+        
+        return {
+            'lower_text': lower_text,
+            'processed_text': ' '.join(tokens),
+            'tokens': tokens,
+            'word_count': len(text.split()),
+            'char_count': len(text),
+            'has_questions': '?' in lower_text,
+            'has_exclamations': exclamation_count > 0,
+            'has_urls': URL_HINT_PATTERN.search(lower_text) is not None,
+            'has_emails': '@' in lower_text,
+            'exclamation_count': exclamation_count,
+            'urgency_points': urgency_points,
+            'urgency_score': int(urgency_points)
+        }
+    
+    def merge_normalized(self, parts: List[Dict]) -> Dict:
+        """
+        Combina resultados de normalize() de trechos consecutivos de um texto
+        (scoring incremental) como se o texto lido tivesse sido normalizado de
+        uma vez. Os pontos de urgência são só a soma dos trechos: o scoring
+        incremental os substitui pela contagem contínua, que vê frases cortadas
+        """
+        tokens = [token for part in parts for token in part['tokens']]
+        urgency_points = sum(part['urgency_points'] for part in parts)
+        return {
+            'lower_text': ''.join(part['lower_text'] for part in parts),
+            'processed_text': ' '.join(tokens),
+            'tokens': tokens,
+            'word_count': sum(part['word_count'] for part in parts),
+            'char_count': sum(part['char_count'] for part in parts),
+            'has_questions': any(part['has_questions'] for part in parts),
+            'has_exclamations': any(part['has_exclamations'] for part in parts),
+            'has_urls': any(part['has_urls'] for part in parts),
+            'has_emails': any(part['has_emails'] for part in parts),
+            'exclamation_count': sum(part['exclamation_count'] for part in parts),
+            'urgency_points': urgency_points,
+            'urgency_score': int(urgency_points)
+        }
     
     def preprocess_text(self, text: str) -> str:
         """
@@ -28,24 +112,16 @@ class EmailNLPProcessor:
         if not text:
             return ""
         
-        # Converter para minúsculas - normalização básica
-        text = text.lower()
-        
-        # Remover emails e URLs - limpeza de ruído
-        text = re.sub(r'\S+@\S+', ' EMAIL ', text)
-        text = re.sub(r'http\S+', ' URL ', text)
-        text = re.sub(r'www\.\S+', ' URL ', text)
-        
-        # Remover números de telefone
-        text = re.sub(r'\(?\d{2,3}\)?[-.\s]?\d{4,5}[-.\s]?\d{4}', ' TELEFONE ', text)
-        
-        # Remover caracteres especiais, manter apenas letras, números e espaços
-        text = re.sub(r'[^a-záàâãéèêíìîóòôõúùûüç\s\d]', ' ', text)
-        
-        # Remover espaços múltiplos
-        text = re.sub(r'\s+', ' ', text)
-        
-        return text.strip()
+        return ' '.join(self._tokenize(text.lower()))
+    
+    def _tokenize(self, lower_text: str) -> List[str]:
+        """
+        Remove emails, URLs e telefones e extrai os tokens do texto já em minúsculas
+        """
+        started = time.perf_counter()
+        tokens = WORD_PATTERN.findall(NOISE_PATTERN.sub(' ', lower_text))
+        record_stage('preprocess', time.perf_counter() - started)
+        return tokens
     
     def remove_stop_words(self, text: str) -> List[str]:
         """
@@ -60,9 +136,11 @@ class EmailNLPProcessor:
         ]
         return relevant_words
     
-    def extract_features(self, text: str) -> Dict:
+    @profiled_stage('extract_features')
+    def extract_features(self, text: str, normalized: Dict = None) -> Dict:
         """
         Extrai features do texto para classificação - técnica de feature engineering
+        Aceita o resultado de normalize() para não reprocessar o texto
         """
         if not text:
             return {
@@ -77,43 +155,56 @@ class EmailNLPProcessor:
                 'key_words': []
             }
         
-        # Pré-processar texto
-        processed_text = self.preprocess_text(text)
-        relevant_words = self.remove_stop_words(processed_text)
+        if normalized is None:
+            normalized = self.normalize(text)
+        
+        relevant_words = [
+            word for word in normalized['tokens']
+            if word not in self.stop_words and len(word) > 2
+        ]
         
         return {
-            'word_count': len(text.split()),
-            'char_count': len(text),
+            'word_count': normalized['word_count'],
+            'char_count': normalized['char_count'],
             'relevant_words': len(relevant_words),
-            'has_questions': '?' in text,
-            'has_exclamations': '!' in text,
-            'has_urls': any(url in text.lower() for url in ['http', 'www.', '.com', '.br']),
-            'has_emails': '@' in text,
-            'processed_text': processed_text,
+            'has_questions': normalized['has_questions'],
+            'has_exclamations': normalized['has_exclamations'],
+            'has_urls': normalized['has_urls'],
+            'has_emails': normalized['has_emails'],
+            'processed_text': normalized['processed_text'],
             'key_words': relevant_words[:15]  # Top 15 palavras relevantes
         }
     
-    def calculate_urgency_score(self, text: str) -> int:
+    def calculate_urgency_score(self, text: str, word_boundary: bool = False, normalized: Dict = None) -> int:
         """
         Calcula score de urgência baseado em palavras-chave
         Técnica de análise semântica básica
         """
-        urgency_words = [
-            'urgente', 'emergência', 'imediato', 'asap', 'priority', 'prioridade',
-            'crítico', 'importante', 'problema', 'erro', 'falha', 'parou', 
-            'quebrou', 'não funciona', 'help', 'socorro', 'rapidamente'
-        ]
+        if normalized is not None:
+            return normalized['urgency_score']
         
         text_lower = text.lower()
-        score = 0
+        return int(self._urgency_points(text_lower, text_lower.count('!'), word_boundary))
+    
+    def _urgency_points(self, text_lower: str, exclamation_count: int, word_boundary: bool) -> float:
+        """
+        Pontos de urgência sem truncar (o score é a parte inteira)
+        """
+        started = time.perf_counter()
         
-        for word in urgency_words:
-            score += text_lower.count(word)
+        # Todas as palavras de urgência em uma única passada pelo texto
+        score = self.urgency_points_from_counts(self.urgency_matcher.count(text_lower, word_boundary), exclamation_count)
         
+        record_stage('urgency', time.perf_counter() - started)
+        return score
+    
+    def urgency_points_from_counts(self, counts: Dict[int, int], exclamation_count: int) -> float:
+        """
+        Pontos de urgência a partir das contagens do urgency_matcher
+        (também usado pelo scoring incremental, que conta em partes)
+        """
         # Bonus para exclamações (indicam urgência)
-        score += text.count('!') * 0.5
-        
-        return int(score)
+        return self.urgency_matcher.score(counts)['urgency'] + exclamation_count * 0.5
     
     def stemming_basic(self, word: str) -> str:
         """
@@ -0,0 +1,66 @@
+from typing import BinaryIO, Callable, Dict, Optional, Tuple
+import time
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # Sem pypdf, uploads .pdf retornam erro de validação
+    PdfReader = None
+
+# Limites padrão de extração
+DEFAULT_MAX_PAGES = 20
+DEFAULT_TEXT_BUDGET = 50000  # Mesmo limite de texto de /api/classify
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024  # PDFs maiores são recusados antes do parsing
+
+def extract_pdf(stream: BinaryIO, max_pages: int = DEFAULT_MAX_PAGES,
+                text_budget: int = DEFAULT_TEXT_BUDGET,
+                enough_text: Optional[Callable[[str], bool]] = None) -> Tuple[str, Dict]:
+    """
+    Extrai texto de um PDF página a página, sem carregar o arquivo inteiro:
+    cada página só tem seu content stream descomprimido quando lida.
+    Para quando o orçamento de páginas ou de texto acaba, ou quando
+    enough_text (chamado com o texto de cada página nova) indica que já há
+    texto suficiente para uma classificação confiante.
+    Retorna (texto, informações da extração)
+    """
+    if PdfReader is None:
+        raise ValueError("Extração de PDF indisponível: instale o pacote pypdf")
+
+    started = time.perf_counter()
+    reader = PdfReader(stream)
+    if reader.is_encrypted:
+        # PDFs protegidos apenas contra edição abrem com senha vazia
+        reader.decrypt('')
+
+    total_pages = len(reader.pages)
+    page_texts = []
+    collected = 0
+    stop_reason = 'end'
+
+    for index in range(total_pages):
+        if index >= max_pages:
+            stop_reason = 'page_budget'
+            break
+
+        page_text = reader.pages[index].extract_text() or ''
+        page_texts.append(page_text)
+        collected += len(page_text)
+
+        if collected >= text_budget:
+            stop_reason = 'text_budget'
+            break
+
+        if enough_text is not None and page_text and enough_text(page_text):
+            stop_reason = 'saturated'
+            break
+
+    text = '\n'.join(page_texts)[:text_budget]
+
+    return text, {
+        'parser': 'pdf',
+        'page_count': total_pages,
+        'pages_read': len(page_texts),
+        'chars_extracted': len(text),
+        'stop_reason': stop_reason,
+        'truncated': len(page_texts) < total_pages or collected > text_budget,
+        'extraction_ms': round((time.perf_counter() - started) * 1000, 2)
+    }
@@ -0,0 +1,157 @@
+from app.services.metrics import STAGE_DURATION, STAGES
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, Dict, Optional
+import cProfile
+import json
+import os
+import pstats
+import time
+import uuid
+
+# Funções listadas no resumo do cProfile (ordenadas por tempo acumulado)
+CPROFILE_TOP_FUNCTIONS = 25
+
+# Perfil da requisição atual; None fora do modo de profiling
+_active_profile: ContextVar[Optional['RequestProfile']] = ContextVar('active_profile', default=None)
+
+class RequestProfile:
+    """
+    Perfil de uma requisição: tempo por etapa (soma e número de chamadas)
+    e, opcionalmente, um cProfile restrito à thread da requisição
+    """
+
+    def __init__(self, endpoint: str, with_cprofile: bool = False):
+        self.endpoint = endpoint
+        self.id = uuid.uuid4().hex[:12]
+        self.stages: Dict[str, Dict] = {}
+        self.cprofile = cProfile.Profile() if with_cprofile else None
+        self.started = time.perf_counter()
+        self.elapsed: Optional[float] = None
+
+    def add(self, stage: str, elapsed: float):
+        entry = self.stages.get(stage)
+        if entry is None:
+            entry = self.stages[stage] = {'calls': 0, 'seconds': 0.0}
+        entry['calls'] += 1
+        entry['seconds'] += elapsed
+
+    def start(self):
+        if self.cprofile is not None:
+            self.cprofile.enable()
+
+    def stop(self):
+        if self.elapsed is None:
+            if self.cprofile is not None:
+                self.cprofile.disable()
+            self.elapsed = time.perf_counter() - self.started
+
+    def report(self) -> Dict:
+        self.stop()
+        report = {
+            'id': self.id,
+            'endpoint': self.endpoint,
+            'total_ms': round(self.elapsed * 1000, 3),
+            'stages': {
+                stage: {'calls': entry['calls'], 'total_ms': round(entry['seconds'] * 1000, 3)}
+                for stage, entry in self.stages.items()
+            }
+        }
+        if self.cprofile is not None:
+            report['cprofile'] = self._top_functions()
+        return report
+
+    def _top_functions(self):
+        stats = pstats.Stats(self.cprofile)
+        rows = []
+        for (filename, line, function), (_, calls, total, cumulative, _) in stats.stats.items():
+            rows.append({
+                'function': f'{_short_path(filename)}:{line}({function})',
+                'calls': calls,
+                'own_ms': round(total * 1000, 3),
+                'cumulative_ms': round(cumulative * 1000, 3)
+            })
+        rows.sort(key=lambda row: row['cumulative_ms'], reverse=True)
+        return rows[:CPROFILE_TOP_FUNCTIONS]
+
+    def dump(self, directory: str) -> str:
+        """
+        Grava o relatório em JSON (e o cProfile bruto em .prof, legível por
+        pstats/snakeviz) no diretório informado; retorna o caminho do JSON
+        """
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{self.endpoint}-{self.id}")
+        with open(base + '.json', 'w', encoding='utf-8') as report_file:
+            json.dump(self.report(), report_file, ensure_ascii=False, indent=2)
+        if self.cprofile is not None:
+            self.cprofile.dump_stats(base + '.prof')
+        return base + '.json'
+
+def _short_path(filename: str) -> str:
+    try:
+        relative = os.path.relpath(filename)
+    except ValueError:
+        return filename
+    return filename if relative.startswith('..') else relative
+
+def start_profile(endpoint: str, with_cprofile: bool = False):
+    """
+    Ativa o perfil para a requisição atual; retorna o token para finish_profile
+    """
+    profile = RequestProfile(endpoint, with_cprofile)
+    token = _active_profile.set(profile)
+    profile.start()
+    return token
+
+def finish_profile(token):
+    profile = _active_profile.get()
+    if profile is not None:
+        profile.stop()
+    _active_profile.reset(token)
+
+def current_profile() -> Optional[RequestProfile]:
+    return _active_profile.get()
+
+def record_stage(stage: str, elapsed: float):
+    """
+    Registra a duração de uma etapa nas métricas e no perfil ativo (se houver)
+    """
+    if stage in STAGES:
+        STAGE_DURATION.observe(elapsed, stage)
+    profile = _active_profile.get()
+    if profile is not None:
+        profile.add(stage, elapsed)
+
+def timed_stage(stage: str) -> Callable:
+    """
+    Decorador: mede toda chamada da função como etapa (métricas + perfil)
+    """
+    def decorator(fn: Callable) -> Callable:
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record_stage(stage, time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+def profiled_stage(stage: str) -> Callable:
+    """
+    Decorador: mede a função como etapa apenas quando há um perfil ativo.
+    Fora do modo de profiling o custo é uma leitura de ContextVar
+    """
+    def decorator(fn: Callable) -> Callable:
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            profile = _active_profile.get()
+            if profile is None:
+                return fn(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                profile.add(stage, time.perf_counter() - started)
+        return wrapper
+    return decorator
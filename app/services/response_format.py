@@ -0,0 +1,128 @@
+from app.services.email_classifier import SUGGESTIONS
+from typing import Any, Callable, Dict, Optional
+import json
+
+try:
+    import orjson  # Dependência opcional: serialização JSON mais rápida
+except ImportError:
+    orjson = None
+
+# Níveis de detalhe das respostas de classificação:
+# - none: apenas classificação, confiança, scores e o texto consumido (early exit)
+# - summary: + sugestões, motivo, indicadores e features (sem o texto processado)
+# - full: resultado completo, inclusive analysis.features.processed_text
+VERBOSITY_LEVELS = ('none', 'summary', 'full')
+
+class StaticJSON:
+    """
+    Valor estático com a serialização JSON calculada uma única vez.
+    Com orjson, o fragmento pré-serializado é copiado direto na resposta;
+    com o json padrão, o valor é serializado normalmente
+    """
+
+    __slots__ = ('value', 'encoded', 'fragment')
+
+    def __init__(self, value: Any):
+        self.value = value
+        self.encoded = json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+        self.fragment = orjson.Fragment(self.encoded.encode('utf-8')) if orjson is not None else None
+
+# Sugestões por categoria, pré-serializadas
+STATIC_SUGGESTIONS = {classification: StaticJSON(suggestions) for classification, suggestions in SUGGESTIONS.items()}
+
+class JSONEncoder:
+    """
+    Serialização das respostas: orjson quando instalado e habilitado
+    (JSON_FAST_ENCODER), senão o json da biblioteca padrão
+    """
+
+    def __init__(self):
+        self.fast = orjson is not None
+
+    def configure(self, fast: bool = True):
+        self.fast = fast and orjson is not None
+
+    @property
+    def name(self) -> str:
+        return 'orjson' if self.fast else 'json'
+
+    def dumps(self, obj: Any, default: Callable, sort_keys: bool = True, ensure_ascii: bool = True) -> bytes:
+        """
+        Serializa obj em bytes (UTF-8) com quebra de linha final, como o jsonify.
+        O orjson sempre emite UTF-8 sem escapes (ensure_ascii é ignorado)
+        """
+        if self.fast:
+            option = orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE
+            if sort_keys:
+                option |= orjson.OPT_SORT_KEYS
+            return orjson.dumps(obj, default=lambda o: _fast_default(o, default), option=option)
+        return (json.dumps(obj, default=lambda o: _plain_default(o, default), ensure_ascii=ensure_ascii,
+                           sort_keys=sort_keys, separators=(',', ':')) + '\n').encode('utf-8')
+
+    def dumps_line(self, obj: Any) -> bytes:
+        """
+        Uma linha NDJSON (respostas em streaming)
+        """
+        if self.fast:
+            return orjson.dumps(obj, default=_fast_static, option=orjson.OPT_APPEND_NEWLINE)
+        return (json.dumps(obj, default=_plain_static, ensure_ascii=False) + '\n').encode('utf-8')
+
+def _fast_default(o, default: Callable):
+    if isinstance(o, StaticJSON):
+        return o.fragment
+    return default(o)
+
+def _plain_default(o, default: Callable):
+    if isinstance(o, StaticJSON):
+        return o.value
+    return default(o)
+
+def _fast_static(o):
+    if isinstance(o, StaticJSON):
+        return o.fragment
+    raise TypeError(f"Objeto do tipo {type(o).__name__} não é serializável em JSON")
+
+def _plain_static(o):
+    if isinstance(o, StaticJSON):
+        return o.value
+    raise TypeError(f"Objeto do tipo {type(o).__name__} não é serializável em JSON")
+
+# Instância global do encoder
+json_encoder = JSONEncoder()
+
+def parse_verbosity(value: Optional[str], default: str) -> Optional[str]:
+    """
+    Nível de detalhe pedido pelo cliente (campo/parâmetro "verbose");
+    None se o valor for inválido
+    """
+    if value is None or value == '':
+        return default
+    value = str(value).lower()
+    return value if value in VERBOSITY_LEVELS else None
+
+def shape_result(result: Dict, verbose: str = 'full') -> Dict:
+    """
+    Recorta um resultado de classificação no nível de detalhe pedido.
+    Chaves adicionadas pelas rotas (status, cached, id, file_info...)
+    são mantidas; sugestões estáticas viram a versão pré-serializada
+    """
+    shaped = dict(result)
+    suggestions = shaped.get('suggestions')
+    static = STATIC_SUGGESTIONS.get(shaped.get('classification'))
+    if static is not None and suggestions == static.value:
+        shaped['suggestions'] = static
+
+    analysis = shaped.get('analysis')
+    if verbose == 'full' or analysis is None:
+        return shaped
+
+    if verbose == 'none':
+        shaped.pop('suggestions', None)
+        shaped['analysis'] = {'scores': analysis.get('scores')}
+        if 'input_consumed' in analysis:
+            shaped['analysis']['input_consumed'] = analysis['input_consumed']
+        return shaped
+
+    features = {name: value for name, value in analysis.get('features', {}).items() if name != 'processed_text'}
+    shaped['analysis'] = {**analysis, 'features': features}
+    return shaped
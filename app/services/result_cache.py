@@ -0,0 +1,276 @@
+from app.services.email_classifier import classify_email, classify_batch, LEXICON_VERSION
+from app.services.executor import executor
+from app.services.linear_model import classify_linear, classify_batch_linear, linear_engine
+from app.services.metrics import count_classification
+from app.services.near_duplicates import near_duplicate_index
+from app.services.profiler import current_profile
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import hashlib
+import json
+import threading
+import time
+
+class RedisCacheBackend:
+    """
+    Backend compartilhado opcional (Redis) para que todos os workers do
+    gunicorn aproveitem os mesmos resultados. Requer o pacote redis.
+    """
+
+    def __init__(self, url: str, prefix: str = 'classify:'):
+        import redis  # Dependência opcional, só necessária com backend compartilhado
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(self.prefix + key)
+
+    def set(self, key: str, value: bytes, ttl: Optional[int] = None):
+        self.client.set(self.prefix + key, value, ex=ttl or None)
+
+class ResultCache:
+    """
+    Cache de resultados de classificação em processo, com eviction LRU,
+    TTL opcional e contadores de hit/miss/eviction.
+    A chave é o hash do texto normalizado + versão do léxico + opções.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl: Optional[int] = None, backend=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.backend = backend
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'backend_hits': 0,
+            'backend_errors': 0
+        }
+
+    def configure(self, max_entries: int = 2048, ttl: Optional[int] = None, redis_url: Optional[str] = None):
+        """
+        Reconfigura o cache (chamado em create_app a partir de app.config)
+        """
+        with self._lock:
+            self.max_entries = max_entries
+            self.ttl = ttl or None
+            self._entries.clear()
+        self.backend = RedisCacheBackend(redis_url) if redis_url else None
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def make_key(self, text: str, **options) -> str:
+        """
+        Chave de cache: hash do texto normalizado, versão do léxico e opções
+        A normalização se limita a remover espaços das bordas, que não
+        alteram o resultado (as rotas já fazem strip antes de classificar)
+        """
+        digest = hashlib.sha256(text.strip().encode('utf-8', errors='surrogatepass'))
+        digest.update(LEXICON_VERSION.encode('ascii'))
+        for name in sorted(options):
+            digest.update(f'|{name}={options[name]}'.encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Retorna uma cópia do resultado em cache ou None
+        """
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, payload = entry
+                if expires_at is not None and expires_at < time.monotonic():
+                    del self._entries[key]
+                    self._counters['expirations'] += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self._counters['hits'] += 1
+                    return json.loads(payload)
+
+        payload = self._backend_get(key)
+        if payload is not None:
+            self._store_local(key, payload)
+            with self._lock:
+                self._counters['hits'] += 1
+                self._counters['backend_hits'] += 1
+            return json.loads(payload)
+
+        with self._lock:
+            self._counters['misses'] += 1
+        return None
+
+    def set(self, key: str, result: Dict):
+        if not self.enabled:
+            return
+
+        # Serializado: cada hit devolve uma cópia independente e o mesmo
+        # payload serve ao backend compartilhado
+        payload = json.dumps(result, ensure_ascii=False)
+        self._store_local(key, payload)
+
+        if self.backend is not None:
+            try:
+                self.backend.set(key, payload.encode('utf-8'), self.ttl)
+            except Exception:
+                with self._lock:
+                    self._counters['backend_errors'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self._counters['hits'] + self._counters['misses']
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'shared_backend': self.backend is not None,
+                'lexicon_version': LEXICON_VERSION,
+                'hit_rate': round(self._counters['hits'] / lookups, 4) if lookups else 0.0,
+                **self._counters
+            }
+
+    def _store_local(self, key: str, payload: str):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (expires_at, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters['evictions'] += 1
+
+    def _backend_get(self, key: str) -> Optional[str]:
+        if self.backend is None:
+            return None
+        try:
+            payload = self.backend.get(key)
+        except Exception:
+            with self._lock:
+                self._counters['backend_errors'] += 1
+            return None
+        return payload.decode('utf-8') if payload is not None else None
+
+# Instância global do cache de resultados
+result_cache = ResultCache()
+
+# Engines de classificação: palavras-chave com pesos (padrão) ou modelo linear treinado
+ENGINES = ('keywords', 'linear')
+
+def _engine(engine: str, word_boundary: bool, early_exit: bool):
+    """
+    Funções (individual, lote), argumentos e opções extras da chave de cache
+    da engine. A versão do modelo linear entra na chave: um modelo novo
+    invalida os resultados do anterior. O early exit só existe na engine de
+    palavras-chave e entra na chave (o resultado informa o texto consumido)
+    """
+    options = {'word_boundary': word_boundary}
+    if engine == 'linear':
+        return classify_linear, classify_batch_linear, options, {'engine': 'linear', 'model': linear_engine.version}
+    if early_exit:
+        options['early_exit'] = True
+    return classify_email, classify_batch, options, {}
+
+def _near_duplicate_scope(options: Dict, key_options: Dict) -> str:
+    """
+    Escopo do índice de quase-duplicatas: só reaproveita resultados da
+    mesma engine/modelo, opções e versão do léxico
+    """
+    return '|'.join([LEXICON_VERSION] + [f'{name}={value}' for name, value in sorted({**options, **key_options}.items())])
+
+def classify_email_cached(text: str, word_boundary: bool = False, engine: str = 'keywords',
+                          early_exit: bool = False, near_duplicates: bool = False) -> Dict:
+    """
+    classify_email (ou o modelo linear, com engine='linear') com cache de resultados
+    O resultado inclui 'cached': True quando servido do cache.
+    Com near_duplicates=True, uma falha no cache exato consulta o índice de
+    quase-duplicatas antes de classificar (o resultado inclui 'near_duplicate').
+    Com profiling ativo, a leitura do cache e o pool de processos são
+    ignorados para que o perfil meça o processamento real do email
+    """
+    classify, _, options, key_options = _engine(engine, word_boundary, early_exit)
+    profiling = current_profile() is not None
+    key = result_cache.make_key(text, **options, **key_options)
+    result = None if profiling else result_cache.get(key)
+    if result is not None:
+        result['cached'] = True
+    else:
+        fingerprint = near_duplicate_index.fingerprint(text) if near_duplicates and not profiling else None
+        scope = _near_duplicate_scope(options, key_options) if fingerprint is not None else None
+        result = near_duplicate_index.lookup(fingerprint, scope, text) if fingerprint is not None else None
+        if result is not None:
+            # Não vai para o cache exato: a chave não inclui near_duplicates,
+            # e uma requisição sem quase-duplicatas receberia este resultado
+            result['cached'] = True
+        else:
+            if profiling:
+                result = classify(text, **options)
+            else:
+                result = executor.run(classify, text, size=len(text), **options)
+            result_cache.set(key, result)
+            if fingerprint is not None:
+                near_duplicate_index.add(fingerprint, scope, result)
+            result['cached'] = False
+
+    count_classification(result)
+    return result
+
+def classify_batch_cached(texts: List[str], word_boundary: bool = False, engine: str = 'keywords',
+                          early_exit: bool = False, near_duplicates: bool = False) -> List[Dict]:
+    """
+    classify_batch com cache: apenas os textos não encontrados no cache
+    (nem no índice de quase-duplicatas, com near_duplicates=True) passam
+    pelo scoring em lote (com profiling ativo, todos passam, inline)
+    """
+    _, classify_many, options, key_options = _engine(engine, word_boundary, early_exit)
+    profiling = current_profile() is not None
+    results: List[Dict] = [None] * len(texts)
+    keys = [result_cache.make_key(text, **options, **key_options) for text in texts]
+    scope = _near_duplicate_scope(options, key_options) if near_duplicates and not profiling else None
+    fingerprints = {}
+    missing = []
+
+    for index, key in enumerate(keys):
+        result = None if profiling else result_cache.get(key)
+        if result is None and scope is not None:
+            fingerprint = near_duplicate_index.fingerprint(texts[index])
+            if fingerprint is not None:
+                fingerprints[index] = fingerprint
+                # Acertos de quase-duplicata não vão para o cache exato (ver classify_email_cached)
+                result = near_duplicate_index.lookup(fingerprint, scope, texts[index])
+        if result is not None:
+            result['cached'] = True
+            results[index] = result
+        else:
+            missing.append(index)
+
+    missing_texts = [texts[index] for index in missing]
+    if profiling:
+        computed = classify_many(missing_texts, **options)
+    else:
+        computed = executor.run_batch(
+            classify_many, missing_texts,
+            size=sum(len(text) for text in missing_texts),
+            **options
+        )
+    for index, result in zip(missing, computed):
+        if result.get('status') != 'error':
+            result_cache.set(keys[index], result)
+            if index in fingerprints:
+                near_duplicate_index.add(fingerprints[index], scope, result)
+        result['cached'] = False
+        results[index] = result
+
+    for result in results:
+        count_classification(result)
+    return results
@@ -0,0 +1,113 @@
+from app.services.email_classifier import validate_text
+from app.services.result_cache import classify_email_cached
+from app.services.response_format import json_encoder, shape_result
+from typing import Dict, IO, Iterator
+import json
+
+# Tamanho máximo de uma linha NDJSON (50KB de texto + escapes JSON e metadados)
+MAX_LINE_BYTES = 256 * 1024
+
+def classify_ndjson(stream: IO[bytes], word_boundary: bool = False, verbose: str = 'full',
+                    engine: str = 'keywords', early_exit: bool = False,
+                    near_duplicates: bool = False) -> Iterator[bytes]:
+    """
+    Classifica um stream NDJSON (um objeto JSON por linha) e gera uma linha
+    NDJSON de resultado por registro, na ordem de entrada.
+    Lê uma linha por vez: a memória fica constante independente do tamanho do
+    stream e os primeiros resultados saem antes do fim do upload.
+    Erros de uma linha são reportados na própria saída sem abortar o stream.
+    verbose define o nível de detalhe de cada resultado (ver response_format).
+    """
+    line_number = 0
+
+    while True:
+        raw_line = stream.readline(MAX_LINE_BYTES + 1)
+        if not raw_line:
+            break
+        line_number += 1
+
+        if len(raw_line) > MAX_LINE_BYTES and not raw_line.endswith(b'\n'):
+            _discard_rest_of_line(stream)
+            yield _encode_line({
+                'line': line_number,
+                'status': 'error',
+                'error': f'Linha muito longa (máximo {MAX_LINE_BYTES // 1024}KB)'
+            })
+            continue
+
+        raw_line = raw_line.strip()
+        if not raw_line:
+            continue
+
+        yield _encode_line(classify_record(
+            raw_line, line_number, word_boundary, verbose, engine, early_exit, near_duplicates
+        ))
+
+def classify_record(raw_line: bytes, line_number: int, word_boundary: bool = False, verbose: str = 'full',
+                    engine: str = 'keywords', early_exit: bool = False,
+                    near_duplicates: bool = False) -> Dict:
+    """
+    Classifica um registro NDJSON (com cache de resultados). Aceita o texto
+    em "text" ou, no formato de requests.jsonl, em "title" + "body";
+    o id vem de "id" ou "request_id"
+    """
+    try:
+        record = json.loads(raw_line)
+    except ValueError as e:
+        return {'line': line_number, 'status': 'error', 'error': f'JSON inválido: {str(e)}'}
+
+    if not isinstance(record, dict):
+        return {'line': line_number, 'status': 'error', 'error': 'Cada linha deve ser um objeto JSON'}
+
+    result = {'line': line_number}
+    record_id = record.get('id', record.get('request_id'))
+    if record_id is not None:
+        result['id'] = record_id
+
+    text = record_text(record)
+    if text is None:
+        result.update({'status': 'error', 'error': 'Campo "text" ou "body" é obrigatório'})
+        return result
+
+    error = validate_text(text)
+    if error:
+        result.update({'status': 'error', 'error': error})
+        return result
+
+    try:
+        result.update(shape_result(classify_email_cached(
+            text.strip(), word_boundary=word_boundary, engine=engine, early_exit=early_exit,
+            near_duplicates=near_duplicates
+        ), verbose))
+        result['status'] = 'success'
+    except Exception as e:
+        result.update({'status': 'error', 'error': str(e)})
+
+    return result
+
+def record_text(record: Dict):
+    """
+    Extrai o texto de um registro: "text" ou "title" + "body"
+    """
+    if 'text' in record:
+        return record['text']
+
+    if 'body' in record:
+        title = record.get('title')
+        if isinstance(title, str) and isinstance(record['body'], str):
+            return f"{title}\n{record['body']}"
+        return record['body']
+
+    return None
+
+def _discard_rest_of_line(stream: IO[bytes]):
+    """
+    Descarta o restante de uma linha longa sem bufferizá-la inteira
+    """
+    while True:
+        chunk = stream.readline(MAX_LINE_BYTES)
+        if not chunk or chunk.endswith(b'\n'):
+            break
+
+def _encode_line(result: Dict) -> bytes:
+    return json_encoder.dumps_line(result)
@@ -0,0 +1,277 @@
+from app.services.email_classifier import (
+    delta_signals, merge_signals, classify_signals, empty_signals, LEXICON_VERSION
+)
+from app.services.executor import executor
+from app.services.metrics import THREAD_MESSAGES, count_classification
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # Sem fcntl (Windows), só o lock do processo: um único worker
+    fcntl = None
+
+# Ids de mensagem lembrados por thread (para ignorar reenvios da mesma mensagem)
+MAX_MESSAGE_IDS = 256
+
+# Tamanho máximo de thread_id e message_id
+MAX_ID_LENGTH = 256
+
+# Com diretório compartilhado, a limpeza (TTL e limite de threads) roda a
+# cada PRUNE_INTERVAL gravações
+PRUNE_INTERVAL = 256
+
+# Com diretório compartilhado, leitura e gravação de uma thread ficam sob
+# flock num de LOCK_STRIPES arquivos de lock (fixos, nunca removidos)
+LOCK_STRIPES = 256
+
+class ThreadStore:
+    """
+    Estado compacto por thread de email: apenas os sinais somados das
+    mensagens (contagens de palavras-chave, flags, contagens de palavras e
+    urgência), nunca o texto. Cada resposta contribui só com a parte nova
+    (sem o histórico citado), então o custo por mensagem é proporcional ao
+    conteúdo novo e não ao tamanho da thread.
+    Limitado em número de threads (LRU) e com TTL desde a última mensagem.
+    Com um diretório compartilhado, o estado de cada thread fica em arquivo
+    para que qualquer worker do gunicorn continue a thread
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: int = 86400, directory: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.directory = directory
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._counters = {event: 0 for event in ('created', 'updated', 'duplicate', 'evictions', 'expirations')}
+
+    def configure(self, max_entries: int = 10000, ttl: int = 86400, directory: Optional[str] = None):
+        """
+        Reconfigura o store (chamado em create_app a partir de app.config)
+        """
+        with self._lock:
+            self.max_entries = max_entries
+            self.ttl = ttl
+            self.directory = directory or None
+            self._entries.clear()
+        if self.directory is not None:
+            os.makedirs(self.directory, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def make_key(self, thread_id: str, **options) -> str:
+        """
+        Chave da thread: hash do id informado pelo cliente, versão do léxico
+        (as contagens são por palavra-chave) e opções de scoring
+        """
+        digest = hashlib.sha256(thread_id.encode('utf-8', errors='surrogatepass'))
+        digest.update(LEXICON_VERSION.encode('ascii'))
+        for name in sorted(options):
+            digest.update(f'|{name}={options[name]}'.encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Estado da thread (cópia), ou None se não existir ou tiver expirado
+        """
+        with self._lock, self._file_lock(key):
+            return copy.deepcopy(self._read(key))
+
+    def merge(self, key: str, message_id: Optional[str], delta: Dict) -> Tuple[Dict, Dict]:
+        """
+        Soma os sinais da mensagem ao estado da thread (criando-a se preciso).
+        Retorna (sinais acumulados, {messages, created, duplicate}); uma
+        mensagem com message_id já visto não é somada de novo
+        """
+        with self._lock, self._file_lock(key):
+            state = self._read(key)
+            created = state is None
+            if created:
+                state = {'signals': empty_signals(), 'messages': 0, 'message_ids': [], 'created_at': time.time()}
+
+            duplicate = message_id is not None and message_id in state['message_ids']
+            if not duplicate:
+                state['signals'] = merge_signals(state['signals'], delta)
+                state['messages'] += 1
+                if message_id is not None:
+                    state['message_ids'] = (state['message_ids'] + [message_id])[-MAX_MESSAGE_IDS:]
+                state['updated_at'] = time.time()
+                self._write(key, state)
+
+            event = 'duplicate' if duplicate else 'created' if created else 'updated'
+            self._counters[event] += 1
+        THREAD_MESSAGES.inc(event)
+        return state['signals'], {'messages': state['messages'], 'created': created, 'duplicate': duplicate}
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries) if self.directory is None else None,
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'shared_directory': self.directory,
+                **self._counters
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    # Os métodos abaixo são chamados com o lock adquirido
+
+    def _read(self, key: str) -> Optional[Dict]:
+        state = self._entries.get(key) if self.directory is None else self._load(key)
+        if state is None:
+            return None
+        if self.ttl and state['updated_at'] + self.ttl < time.time():
+            self._counters['expirations'] += 1
+            if self.directory is None:
+                del self._entries[key]
+            else:
+                self._remove_file(key)
+            return None
+        if self.directory is None:
+            self._entries.move_to_end(key)
+        return state
+
+    def _write(self, key: str, state: Dict):
+        if self.directory is not None:
+            self._persist(key, state)
+            self._writes += 1
+            if self._writes % PRUNE_INTERVAL == 0:
+                self._prune()
+            return
+        self._entries[key] = state
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters['evictions'] += 1
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f'thread-{key}.json')
+
+    @contextmanager
+    def _file_lock(self, key: str):
+        """
+        Diretório compartilhado: exclusão entre workers na leitura e gravação
+        da thread, para que mensagens simultâneas não se sobrescrevam
+        """
+        if self.directory is None or fcntl is None:
+            yield
+            return
+        stripe = int(key[:8], 16) % LOCK_STRIPES
+        with open(os.path.join(self.directory, f'lock-{stripe:03d}'), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _persist(self, key: str, state: Dict):
+        path = self._path(key)
+        # Arquivo temporário único por gravação: sem fcntl, workers diferentes
+        # podem gravar a mesma thread ao mesmo tempo
+        temporary = f'{path}.{uuid.uuid4().hex}.tmp'
+        try:
+            with open(temporary, 'w', encoding='utf-8') as state_file:
+                json.dump(state, state_file, ensure_ascii=False)
+            os.replace(temporary, path)
+        except OSError as e:
+            print(f"Erro ao gravar o estado da thread {key}: {str(e)}")
+
+    def _load(self, key: str) -> Optional[Dict]:
+        try:
+            with open(self._path(key), encoding='utf-8') as state_file:
+                state = json.load(state_file)
+        except (OSError, ValueError):
+            return None
+        # JSON guarda as chaves como texto: os ids de palavra-chave são inteiros
+        signals = state['signals']
+        signals['keyword_counts'] = {int(pattern_id): count for pattern_id, count in signals['keyword_counts'].items()}
+        return state
+
+    def _remove_file(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _prune(self):
+        """
+        Diretório compartilhado: remove threads expiradas e, acima de
+        max_entries, as atualizadas há mais tempo
+        """
+        try:
+            names = [name for name in os.listdir(self.directory) if name.startswith('thread-') and name.endswith('.json')]
+            files = sorted((os.path.getmtime(os.path.join(self.directory, name)), name) for name in names)
+        except OSError:
+            return
+        now = time.time()
+        excess = len(files) - self.max_entries
+        for index, (modified, name) in enumerate(files):
+            expired = bool(self.ttl) and modified + self.ttl < now
+            if not expired and index >= excess:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            self._counters['expirations' if expired else 'evictions'] += 1
+
+# Instância global do store de threads
+thread_store = ThreadStore()
+
+def validate_thread_ids(thread_id, message_id) -> str:
+    """
+    Valida thread_id (obrigatório no modo thread) e message_id (opcional)
+    Retorna a mensagem de erro ou string vazia se válidos
+    """
+    for name, value in (('thread_id', thread_id), ('message_id', message_id)):
+        if value is None and name == 'message_id':
+            continue
+        if not isinstance(value, str) or not value.strip():
+            return f'Campo "{name}" deve ser uma string não vazia'
+        if len(value) > MAX_ID_LENGTH:
+            return f'Campo "{name}" muito longo (máximo {MAX_ID_LENGTH} caracteres)'
+    return ''
+
+def classify_thread_message(text: str, thread_id: str, message_id: Optional[str] = None,
+                            word_boundary: bool = False) -> Dict:
+    """
+    Classifica a thread após uma nova mensagem: text deve ser só a parte
+    nova (as rotas removem o histórico citado antes). Os sinais da parte
+    nova são somados ao estado da thread e a classificação reflete a thread
+    inteira; o resultado inclui 'thread' = {thread_id, message_id,
+    messages, delta_chars, created, duplicate}
+    """
+    key = thread_store.make_key(thread_id, word_boundary=word_boundary)
+    state = thread_store.get(key) if message_id is not None else None
+    if state is not None and message_id in state['message_ids']:
+        # Reenvio de uma mensagem já somada: nada a pontuar
+        delta = empty_signals()
+    else:
+        delta = executor.run(delta_signals, text, size=len(text), word_boundary=word_boundary)
+    signals, info = thread_store.merge(key, message_id, delta)
+
+    result = classify_signals(signals)
+    result['thread'] = {
+        'thread_id': thread_id,
+        'message_id': message_id,
+        'delta_chars': 0 if info['duplicate'] else len(text),
+        **info
+    }
+    result['cached'] = False
+    count_classification(result)
+    return result
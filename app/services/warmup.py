@@ -0,0 +1,120 @@
+from flask import request
+from werkzeug.datastructures import FileStorage
+from app.services.email_classifier import classify_email, classify_batch, make_saturation_check
+from app.services.file_processor import process_file
+from app.services.health import health_monitor, SELF_TEST_CASES
+from app.services.linear_model import linear_engine, classify_linear
+from app.services.metrics import metrics
+from typing import Dict
+import codecs
+import gc
+import io
+import logging
+import os
+import resource
+import time
+
+# Charsets decodificados na extração de .eml/.msg/.txt: os codecs são
+# importados sob demanda na primeira decodificação
+logger = logging.getLogger(__name__)
+
+WARMUP_CHARSETS = ('utf-8', 'latin-1', 'iso-8859-1', 'cp1252', 'ascii', 'utf-16-le')
+
+WARMUP_EML = (
+    b'From: cliente@example.com\r\n'
+    b'Subject: =?utf-8?q?Cart=C3=A3o_bloqueado?=\r\n'
+    b'MIME-Version: 1.0\r\n'
+    b'Content-Type: text/plain; charset="iso-8859-1"\r\n'
+    b'Content-Transfer-Encoding: quoted-printable\r\n'
+    b'\r\n'
+    b'Preciso de ajuda para desbloquear meu cart=E3o.\r\n'
+)
+
+def warm_up(app) -> Dict:
+    """
+    Constrói todo o estado compilado do classificador antes de atender
+    requisições: expressões regulares compiladas sob demanda (cache do
+    módulo re), codecs, caminhos de extração de arquivos, modelo linear,
+    roteamento do Flask e serialização JSON. Com gunicorn --preload roda uma
+    vez no processo mestre e os workers herdam o estado pronto pelo fork.
+    As métricas ficam suspensas: o warm-up não conta como tráfego
+    """
+    started = time.perf_counter()
+    with metrics.suspended():
+        health_monitor.run_self_test()
+
+        texts = [text for text, _ in SELF_TEST_CASES]
+        classify_batch(texts)
+        for word_boundary in (False, True):
+            classify_email(texts[0], word_boundary=word_boundary)
+        if linear_engine.available:
+            classify_linear(texts[0])
+        make_saturation_check()(texts[0])
+
+        for charset in WARMUP_CHARSETS:
+            codecs.lookup(charset)
+        for filename, content in (('warmup.txt', texts[0].encode('utf-8')), ('warmup.eml', WARMUP_EML)):
+            storage = FileStorage(stream=io.BytesIO(content), filename=filename)
+            process_file(storage, {'filename': filename, 'size': len(content)})
+
+        # Roteamento, parsing de JSON e multipart (o decoder compila regex
+        # sob demanda) sem despachar as views: nada entra no cache ou nas métricas
+        app.url_map.update()
+        with app.test_request_context('/api/classify', method='POST', json={'text': texts[0]}):
+            request.get_json()
+        with app.test_request_context('/api/upload', method='POST',
+                                      data={'file': (io.BytesIO(WARMUP_EML), 'warmup.eml')}):
+            request.files.get('file')
+        app.json.response({'warmup': texts})
+
+    return {'warmup_ms': round((time.perf_counter() - started) * 1000, 2)}
+
+def freeze_heap() -> int:
+    """
+    Move os objetos vivos para a geração permanente do coletor: as coletas
+    nos workers não escrevem nos cabeçalhos desses objetos e as páginas
+    herdadas do mestre continuam compartilhadas (copy-on-write).
+    Retorna o número de objetos congelados
+    """
+    gc.collect()
+    gc.freeze()
+    return gc.get_freeze_count()
+
+def memory_usage() -> Dict:
+    """
+    Memória do processo em KB. No Linux (smaps_rollup) separa as páginas
+    compartilhadas com outros processos (ex.: herdadas do mestre) das
+    privadas; PSS divide as compartilhadas entre os processos que as usam
+    """
+    try:
+        with open('/proc/self/smaps_rollup', encoding='ascii') as smaps:
+            fields = {}
+            for line in smaps:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == 'kB':
+                    fields[parts[0].rstrip(':')] = int(parts[1])
+    except OSError:
+        # Fora do Linux: apenas o pico de RSS (KB no Linux/BSD, bytes no macOS)
+        return {'max_rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+
+    return {
+        'rss_kb': fields.get('Rss', 0),
+        'pss_kb': fields.get('Pss', 0),
+        'shared_kb': fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0),
+        'private_kb': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)
+    }
+
+def log_worker_memory():
+    """
+    Registrado para depois do fork: cada worker informa quanto da memória
+    herdada do mestre está compartilhada
+    """
+    memory = memory_usage()
+    if 'rss_kb' in memory:
+        logger.info(
+            "Worker %s pronto: RSS %sMB (compartilhada %sMB, privada %sMB)", os.getpid(),
+            memory['rss_kb'] // 1024, memory['shared_kb'] // 1024, memory['private_kb'] // 1024
+        )
+
+# Registrado uma única vez, na importação (create_app pode ser chamado mais de uma vez)
+os.register_at_fork(after_in_child=log_worker_memory)
@@ -0,0 +1,4 @@
+"""
+Micro-benchmarks dos caminhos críticos de classificação e extração.
+Uso: python -m benchmarks.run --help
+"""
@@ -0,0 +1,151 @@
+import random
+from typing import Dict, List
+
+# Frases de emails que pedem ação (suporte, operações bancárias, prazos)
+PRODUTIVO_SENTENCES = [
+    "Meu cartão de crédito foi bloqueado e preciso desbloquear com urgência.",
+    "Não consigo fazer a transferência PIX, aparece erro no aplicativo.",
+    "Gostaria de solicitar o extrato detalhado da conta corrente do último trimestre.",
+    "Não reconheço uma compra de R$ 1.250,00 na fatura deste mês, pode ser fraude?",
+    "Preciso da segunda via do boleto com vencimento na próxima sexta-feira.",
+    "Qual o status do protocolo 2024-{number} aberto na semana passada?",
+    "Solicito a renegociação das parcelas do empréstimo pessoal.",
+    "O limite do cartão não foi liberado após a aprovação do gerente.",
+    "Poderia me enviar o informe de rendimentos para a declaração do imposto de renda?",
+    "O sistema apresentou falha crítica durante o fechamento do relatório do cliente.",
+    "Favor verificar a cobrança indevida de juros no contrato {number}.",
+    "Tenho uma dúvida sobre o resgate do CDB antes do prazo de carência.",
+    "A reunião com o cliente foi remarcada e o deadline da proposta é amanhã.",
+    "Fui vítima de golpe por phishing e preciso bloquear a conta imediatamente.",
+    "O depósito feito ontem ainda não aparece no saldo da poupança.",
+]
+
+# Frases de emails informativos (felicitações, comunicados, convites)
+IMPRODUTIVO_SENTENCES = [
+    "Parabéns pela nova campanha publicitária, ficou muito criativa!",
+    "Obrigado pelo convite para o webinar sobre investimentos.",
+    "Recebi o comunicado sobre a manutenção programada do sistema.",
+    "Feliz ano novo! Desejo muito sucesso para toda a equipe.",
+    "Apenas informando que o escritório estará fechado no feriado.",
+    "Muito obrigado pela atenção de sempre, tudo de bom!",
+    "Para seu conhecimento, segue o informativo mensal com as novidades.",
+    "Agradeço a participação de todos no workshop da semana passada.",
+    "Responda a nossa pesquisa de satisfação e conte sua experiência.",
+    "Boas festas e um feliz natal para você e sua família!",
+]
+
+# Texto neutro que dá volume aos emails médios e grandes
+FILLER_SENTENCES = [
+    "Conforme conversamos anteriormente, seguem as informações combinadas.",
+    "Fico à disposição para qualquer esclarecimento adicional.",
+    "Segue em anexo a documentação solicitada para análise da equipe.",
+    "Aguardo o retorno assim que possível para darmos continuidade.",
+    "A equipe responsável já foi envolvida e acompanha o assunto de perto.",
+    "Os dados foram conferidos novamente pela área financeira nesta manhã.",
+    "Vale lembrar que o horário de atendimento vai das 9h às 18h.",
+    "O documento foi revisado e as alterações estão destacadas em amarelo.",
+]
+
+GREETINGS = ["Olá,", "Prezados,", "Bom dia,", "Boa tarde,", "Oi, tudo bem?", "Caro cliente,"]
+
+CLOSINGS = ["Atenciosamente,", "Abraços,", "Obrigado,", "Att.,", "Cordialmente,"]
+
+NAMES = ["Ana Souza", "Bruno Lima", "Carla Mendes", "Diego Rocha", "Fernanda Alves", "João Pereira"]
+
+MARKETING_SENTENCES = [
+    "Promoção especial: cartão sem anuidade e cashback em todas as compras!",
+    "Clique aqui e aproveite a oferta exclusiva com taxa zero.",
+    "Cadastre-se agora e ganhe pontos e milhas em dobro.",
+    "Conheça os benefícios e vantagens do novo programa de recompensas.",
+    "Desconto de 50% grátis para os primeiros inscritos!",
+]
+
+MARKETING_DOMAINS = ["ofertas.banco.com.br", "www.promo-exemplo.com", "clube.vantagens.com.br", "news.exemplo.com"]
+
+# Tamanhos alvo (em caracteres) de cada perfil do corpus
+SIZE_PROFILES = {
+    'short': 200,
+    'medium': 2000,
+    'large': 50000,
+}
+
+class CorpusGenerator:
+    """
+    Gerador determinístico de emails sintéticos em português.
+    A mesma seed produz sempre o mesmo corpus, para que execuções em
+    máquinas e commits diferentes sejam comparáveis.
+    """
+
+    def __init__(self, seed: int = 42):
+        self.random = random.Random(seed)
+
+    def sentence(self, pool: List[str]) -> str:
+        return self.random.choice(pool).replace('{number}', str(self.random.randint(10000, 99999)))
+
+    def body(self, size: int, productive: bool) -> str:
+        """
+        Corpo com cerca de size caracteres: frases da classe escolhida
+        intercaladas com texto neutro, em parágrafos
+        """
+        main_pool = PRODUTIVO_SENTENCES if productive else IMPRODUTIVO_SENTENCES
+        paragraphs = []
+        length = 0
+        while length < size:
+            count = self.random.randint(2, 4)
+            sentences = [
+                self.sentence(main_pool if self.random.random() < 0.4 else FILLER_SENTENCES)
+                for _ in range(count)
+            ]
+            paragraph = ' '.join(sentences)
+            paragraphs.append(paragraph)
+            length += len(paragraph) + 2
+        return '\n\n'.join(paragraphs)[:max(size, 1)]
+
+    def email(self, size: int, productive: bool) -> str:
+        name = self.random.choice(NAMES)
+        return '\n\n'.join([
+            self.random.choice(GREETINGS),
+            self.body(size, productive),
+            f"{self.random.choice(CLOSINGS)}\n{name}"
+        ])
+
+    def quoted_thread(self, replies: int = 4, size: int = 600) -> str:
+        """
+        Thread de respostas: cada resposta cita a anterior com "> "
+        """
+        thread = self.email(size, productive=True)
+        for depth in range(replies):
+            quoted = '\n'.join('> ' + line for line in thread.split('\n'))
+            name = self.random.choice(NAMES)
+            header = f"Em {self.random.randint(1, 28):02d}/0{self.random.randint(1, 9)}/2024, {name} <{name.split()[0].lower()}@exemplo.com.br> escreveu:"
+            thread = '\n\n'.join([self.email(size, productive=depth % 2 == 0), header, quoted])
+        return thread
+
+    def marketing(self, links: int = 40) -> str:
+        """
+        Email de marketing com muitas URLs, emails e telefones
+        """
+        lines = [self.random.choice(GREETINGS)]
+        for index in range(links):
+            domain = self.random.choice(MARKETING_DOMAINS)
+            lines.append(self.sentence(MARKETING_SENTENCES))
+            lines.append(f"https://{domain}/campanha/{index}?utm_source=email&utm_medium=news&id={self.random.randint(1, 10 ** 6)}")
+        lines.append("Dúvidas? Fale com contato@exemplo.com.br ou ligue (11) 4002-8922.")
+        lines.append("Para não receber mais emails, descadastre-se em www.exemplo.com/sair")
+        return '\n'.join(lines)
+
+    def generate(self, per_profile: int = 20) -> Dict[str, List[str]]:
+        """
+        Corpus completo: emails curtos, médios e de 50KB (metade de cada
+        classe), threads com citações e marketing com muitas URLs
+        """
+        corpus = {}
+        for profile, size in SIZE_PROFILES.items():
+            count = per_profile if profile != 'large' else max(per_profile // 5, 2)
+            corpus[profile] = [self.email(size, productive=index % 2 == 0) for index in range(count)]
+        corpus['quoted_thread'] = [self.quoted_thread() for _ in range(max(per_profile // 4, 2))]
+        corpus['marketing'] = [self.marketing() for _ in range(max(per_profile // 4, 2))]
+        return corpus
+
+def generate_corpus(seed: int = 42, per_profile: int = 20) -> Dict[str, List[str]]:
+    return CorpusGenerator(seed).generate(per_profile)
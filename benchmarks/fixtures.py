@@ -0,0 +1,185 @@
+from email.message import EmailMessage
+from typing import List, Tuple
+import struct
+
+# Compound file (OLE2) versão 3: setores de 512 bytes, mini setores de 64
+SECTOR_SIZE = 512
+MINI_SECTOR_SIZE = 64
+MINI_STREAM_CUTOFF = 4096
+END_OF_CHAIN = 0xFFFFFFFE
+FREE_SECTOR = 0xFFFFFFFF
+FAT_SECTOR = 0xFFFFFFFD
+NO_STREAM = 0xFFFFFFFF
+
+def build_txt(text: str) -> bytes:
+    return text.encode('utf-8')
+
+def build_eml(subject: str, body: str, attachment_size: int = 32 * 1024) -> bytes:
+    """
+    Email MIME multipart/alternative (text/plain + text/html) com um anexo
+    binário, como os exportados por clientes de email
+    """
+    message = EmailMessage()
+    message['From'] = 'Cliente <cliente@exemplo.com.br>'
+    message['To'] = 'atendimento@exemplo.com.br'
+    message['Subject'] = subject
+    message.set_content(body)
+    message.add_alternative(f"<html><body><p>{body.replace(chr(10), '<br>')}</p></body></html>", subtype='html')
+    if attachment_size:
+        message.add_attachment(bytes(range(256)) * (attachment_size // 256),
+                               maintype='application', subtype='octet-stream', filename='anexo.bin')
+    return message.as_bytes()
+
+def build_msg(subject: str, body: str, attachment_size: int = 32 * 1024) -> bytes:
+    """
+    .msg mínimo do Outlook: streams de assunto e corpo (UTF-16LE) na raiz
+    e um storage de anexo que o parser não deve ler
+    """
+    streams = [
+        ('__substg1.0_0037001F', subject.encode('utf-16-le')),
+        ('__substg1.0_1000001F', body.encode('utf-16-le')),
+    ]
+    storages = []
+    if attachment_size:
+        storages.append(('__attach_version1.0_#00000000', [
+            ('__substg1.0_37010102', bytes(range(256)) * (attachment_size // 256))
+        ]))
+    return build_compound_file(streams, storages)
+
+def build_compound_file(streams: List[Tuple[str, bytes]], storages: List[Tuple[str, List[Tuple[str, bytes]]]] = ()) -> bytes:
+    """
+    Escreve um compound file v3 com streams na raiz e storages de um nível.
+    Irmãos do diretório ficam encadeados pela direita (árvore válida,
+    apenas não balanceada)
+    """
+    entries = []
+
+    def add_entry(name: str, object_type: int, data: bytes = b'') -> int:
+        entries.append({
+            'name': name, 'type': object_type, 'data': data,
+            'left': NO_STREAM, 'right': NO_STREAM, 'child': NO_STREAM,
+            'start': END_OF_CHAIN, 'size': len(data)
+        })
+        return len(entries) - 1
+
+    def link_children(parent: int, children: List[int]):
+        if children:
+            entries[parent]['child'] = children[0]
+            for left, right in zip(children, children[1:]):
+                entries[left]['right'] = right
+
+    root = add_entry('Root Entry', 5)
+    root_children = [add_entry(name, 2, data) for name, data in streams]
+    for storage_name, storage_streams in storages:
+        storage = add_entry(storage_name, 1)
+        root_children.append(storage)
+        link_children(storage, [add_entry(name, 2, data) for name, data in storage_streams])
+    link_children(root, root_children)
+
+    sectors: List[bytes] = []
+    fat: List[int] = []
+
+    def allocate(data: bytes) -> int:
+        count = max(1, -(-len(data) // SECTOR_SIZE))
+        start = len(sectors)
+        for index in range(count):
+            sectors.append(data[index * SECTOR_SIZE:(index + 1) * SECTOR_SIZE].ljust(SECTOR_SIZE, b'\0'))
+            fat.append(start + index + 1 if index < count - 1 else END_OF_CHAIN)
+        return start
+
+    # Streams pequenos vão para o mini stream; os demais ocupam setores próprios
+    mini_stream = bytearray()
+    mini_fat: List[int] = []
+    for entry in entries:
+        if entry['type'] != 2:
+            continue
+        if entry['size'] < MINI_STREAM_CUTOFF:
+            count = max(1, -(-entry['size'] // MINI_SECTOR_SIZE))
+            start = len(mini_fat)
+            mini_fat.extend(start + index + 1 if index < count - 1 else END_OF_CHAIN for index in range(count))
+            entry['start'] = start
+            mini_stream += entry['data'].ljust(count * MINI_SECTOR_SIZE, b'\0')
+        else:
+            entry['start'] = allocate(entry['data'])
+
+    if mini_stream:
+        entries[root]['start'] = allocate(bytes(mini_stream))
+        entries[root]['size'] = len(mini_stream)
+    first_mini_fat = allocate(struct.pack(f'<{len(mini_fat)}I', *mini_fat)) if mini_fat else END_OF_CHAIN
+    mini_fat_sectors = -(-len(mini_fat) * 4 // SECTOR_SIZE)
+
+    directory = bytearray()
+    for entry in entries:
+        name = (entry['name'] + '\0').encode('utf-16-le')
+        directory += name.ljust(64, b'\0')
+        directory += struct.pack('<HBB', len(name), entry['type'], 1)
+        directory += struct.pack('<III', entry['left'], entry['right'], entry['child'])
+        directory += b'\0' * 36  # CLSID, flags e datas
+        directory += struct.pack('<IQ', entry['start'], entry['size'])
+    first_directory = allocate(bytes(directory))
+
+    # Setores da própria FAT: precisa cobrir todos os setores, inclusive ela mesma
+    fat_sectors = 1
+    while (len(sectors) + fat_sectors) * 4 > fat_sectors * SECTOR_SIZE:
+        fat_sectors += 1
+    first_fat = len(sectors)
+    fat.extend([FAT_SECTOR] * fat_sectors)
+    fat.extend([FREE_SECTOR] * (fat_sectors * SECTOR_SIZE // 4 - len(fat)))
+    fat_bytes = struct.pack(f'<{len(fat)}I', *fat)
+    for index in range(fat_sectors):
+        sectors.append(fat_bytes[index * SECTOR_SIZE:(index + 1) * SECTOR_SIZE])
+
+    difat = [first_fat + index for index in range(fat_sectors)] + [FREE_SECTOR] * (109 - fat_sectors)
+    header = (
+        b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1' + b'\0' * 16 +
+        struct.pack('<HHHHH', 0x3E, 3, 0xFFFE, 9, 6) + b'\0' * 6 +
+        struct.pack('<9I', 0, fat_sectors, first_directory, 0, MINI_STREAM_CUTOFF,
+                    first_mini_fat, mini_fat_sectors, END_OF_CHAIN, 0) +
+        struct.pack('<109I', *difat)
+    )
+    return header + b''.join(sectors)
+
+def build_pdf(text: str, lines_per_page: int = 50, line_width: int = 90) -> bytes:
+    """
+    PDF simples (Helvetica, WinAnsiEncoding) com o texto quebrado em linhas
+    e páginas, suficiente para o extrator de texto
+    """
+    lines: List[str] = []
+    for paragraph in text.split('\n'):
+        while len(paragraph) > line_width:
+            cut = paragraph.rfind(' ', 0, line_width)
+            cut = cut if cut > 0 else line_width
+            lines.append(paragraph[:cut])
+            paragraph = paragraph[cut:].lstrip()
+        lines.append(paragraph)
+    pages = [lines[index:index + lines_per_page] for index in range(0, len(lines), lines_per_page)] or [[]]
+
+    def escape(line: str) -> bytes:
+        raw = line.encode('cp1252', errors='replace')
+        return raw.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+    objects: List[bytes] = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'',  # Pages, preenchido depois de conhecer os ids das páginas
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>',
+    ]
+    page_ids = []
+    for page_lines in pages:
+        content = b'BT /F1 10 Tf 12 TL 40 800 Td\n' + b''.join(b'(' + escape(line) + b') Tj T*\n' for line in page_lines) + b'ET'
+        objects.append(b'<< /Length %d >>\nstream\n' % len(content) + content + b'\nendstream')
+        content_id = len(objects)
+        objects.append(b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+                       b'/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>' % content_id)
+        page_ids.append(len(objects))
+    objects[1] = b'<< /Type /Pages /Kids [' + b' '.join(b'%d 0 R' % page for page in page_ids) + b'] /Count %d >>' % len(page_ids)
+
+    output = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += b'%d 0 obj\n' % number + body + b'\nendobj\n'
+    xref = len(output)
+    output += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    output += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    output += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return bytes(output)
@@ -0,0 +1,346 @@
+"""
+Teste de carga da aplicação completa (rotas, parsing JSON, CORS, jsonify).
+
+    # Em processo, via cliente de teste WSGI
+    python -m benchmarks.load --requests 2000 --concurrency 8
+
+    # Servidor local iniciado pelo próprio harness (HTTP real)
+    python -m benchmarks.load --serve --mix classify=70,upload=20,health=10
+
+    # Servidor já em execução (ex.: gunicorn com N workers)
+    python -m benchmarks.load --url http://127.0.0.1:5000 --duration 30
+
+    # Replay de um log JSONL (formato de requests.jsonl: title + body, ou text)
+    python -m benchmarks.load --log requests.jsonl --concurrency 4
+
+Reporta throughput e latência p50/p95/p99 por endpoint.
+"""
+from benchmarks.corpus import generate_corpus
+from benchmarks.fixtures import build_txt, build_eml, build_msg, build_pdf
+from app.services.stream_processor import record_text
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+import argparse
+import http.client
+import io
+import itertools
+import json
+import logging
+import math
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+
+DEFAULT_MIX = 'classify=80,upload=15,health=5'
+
+ENDPOINTS = {
+    'classify': ('POST', '/api/classify'),
+    'upload': ('POST', '/api/upload'),
+    'health': ('GET', '/api/health'),
+}
+
+def parse_mix(mix: str) -> Dict[str, int]:
+    """
+    "classify=80,upload=15,health=5" -> {'classify': 80, ...}
+    """
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.strip().partition('=')
+        if name not in ENDPOINTS:
+            raise ValueError(f"Endpoint desconhecido no mix: {name}. Use: {', '.join(ENDPOINTS)}")
+        weights[name] = int(weight or 1)
+    if not any(weights.values()):
+        raise ValueError("O mix precisa de ao menos um endpoint com peso > 0")
+    return weights
+
+def load_log(path: str) -> List[str]:
+    """
+    Textos de um log JSONL: "text" ou "title" + "body" em cada linha
+    """
+    texts = []
+    with open(path, encoding='utf-8') as log:
+        for line in log:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            text = record_text(record) if isinstance(record, dict) else None
+            if isinstance(text, str) and text.strip():
+                texts.append(text)
+    if not texts:
+        raise ValueError(f"Nenhum registro com texto em {path}")
+    return texts
+
+def sample_files(corpus: Dict[str, List[str]]) -> List[tuple]:
+    """
+    Arquivos de exemplo para /api/upload, um de cada formato por email
+    """
+    files = []
+    for index, text in enumerate(corpus['medium'][:4]):
+        subject = text.split('\n\n')[1][:80]
+        files.extend([
+            (f'email-{index}.txt', build_txt(text)),
+            (f'email-{index}.eml', build_eml(subject, text)),
+            (f'email-{index}.msg', build_msg(subject, text)),
+            (f'email-{index}.pdf', build_pdf(text)),
+        ])
+    return files
+
+def build_plan(weights: Dict[str, int], texts: List[str], files: List[tuple],
+               size: int, seed: int) -> List[Dict]:
+    """
+    Sequência determinística de requisições seguindo o mix de endpoints.
+    Textos do log são usados em ordem; arquivos e textos sintéticos, sorteados
+    """
+    rng = random.Random(seed)
+    names = [name for name, weight in weights.items() if weight > 0]
+    text_cycle = itertools.cycle(texts)
+    plan = []
+    for _ in range(size):
+        endpoint = rng.choices(names, weights=[weights[name] for name in names])[0]
+        request = {'endpoint': endpoint}
+        if endpoint == 'classify':
+            request['json'] = {'text': next(text_cycle)}
+        elif endpoint == 'upload':
+            request['file'] = rng.choice(files)
+        plan.append(request)
+    return plan
+
+class InProcessTarget:
+    """Envia requisições pelo cliente de teste WSGI do Flask (sem rede)"""
+
+    name = 'in-process'
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def send(self, request: Dict) -> int:
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+
+        method, path = ENDPOINTS[request['endpoint']]
+        if 'json' in request:
+            response = client.open(path, method=method, json=request['json'])
+        elif 'file' in request:
+            filename, content = request['file']
+            response = client.open(path, method=method, content_type='multipart/form-data',
+                                   data={'file': (io.BytesIO(content), filename)})
+        else:
+            response = client.open(path, method=method)
+        response.get_data()
+        return response.status_code
+
+class HttpTarget:
+    """Envia requisições HTTP reais, com uma conexão keep-alive por thread"""
+
+    def __init__(self, base_url: str):
+        parts = urlsplit(base_url)
+        self.name = base_url
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip('/')
+        self._local = threading.local()
+
+    def send(self, request: Dict) -> int:
+        method, path = ENDPOINTS[request['endpoint']]
+        headers = {}
+        body = None
+        if 'json' in request:
+            body = json.dumps(request['json'], ensure_ascii=False).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        elif 'file' in request:
+            body, headers['Content-Type'] = encode_multipart(*request['file'])
+
+        for attempt in range(2):
+            connection = getattr(self._local, 'connection', None)
+            if connection is None:
+                connection = self._local.connection = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            try:
+                connection.request(method, self.prefix + path, body=body, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                return response.status
+            except (http.client.HTTPException, ConnectionError):
+                # Conexão keep-alive fechada pelo servidor: reconecta uma vez
+                connection.close()
+                self._local.connection = None
+                if attempt:
+                    raise
+
+def encode_multipart(filename: str, content: bytes):
+    boundary = uuid.uuid4().hex
+    body = (
+        f'--{boundary}\r\n'
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        'Content-Type: application/octet-stream\r\n\r\n'
+    ).encode('utf-8') + content + f'\r\n--{boundary}--\r\n'.encode('utf-8')
+    return body, f'multipart/form-data; boundary={boundary}'
+
+def start_local_server(app):
+    """
+    Servidor WSGI local (threaded) em uma porta livre, em thread daemon
+    """
+    from werkzeug.serving import make_server
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)  # Sem log por requisição
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Percentil por nearest-rank sobre valores já ordenados"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict:
+    values = sorted(latencies)
+    count = len(values)
+    return {
+        'requests': count,
+        'errors': errors,
+        'throughput_rps': round(count / elapsed, 2) if elapsed > 0 else 0.0,
+        'mean_ms': round(sum(values) / count * 1000, 3) if count else 0.0,
+        'p50_ms': round(percentile(values, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(values, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(values, 0.99) * 1000, 3),
+        'max_ms': round(values[-1] * 1000, 3) if count else 0.0,
+    }
+
+def run_load(target, plan: List[Dict], concurrency: int = 4, duration: Optional[float] = None,
+             warmup: int = 20) -> Dict:
+    """
+    Dispara o plano com concurrency threads. Sem duration, cada requisição do
+    plano é enviada uma vez; com duration, o plano é repetido até o tempo acabar
+    """
+    for request in plan[:warmup]:
+        target.send(request)
+
+    lock = threading.Lock()
+    cursor = itertools.count()
+    latencies: Dict[str, List[float]] = {name: [] for name in ENDPOINTS}
+    errors: Dict[str, int] = {name: 0 for name in ENDPOINTS}
+    status_counts: Dict[str, int] = {}
+    deadline = time.perf_counter() + duration if duration else None
+
+    def worker():
+        local_latencies = {name: [] for name in ENDPOINTS}
+        local_errors = {name: 0 for name in ENDPOINTS}
+        local_status: Dict[str, int] = {}
+        while True:
+            index = next(cursor)
+            if deadline is None:
+                if index >= len(plan):
+                    break
+            elif time.perf_counter() >= deadline:
+                break
+
+            request = plan[index % len(plan)]
+            endpoint = request['endpoint']
+            started = time.perf_counter()
+            try:
+                status = target.send(request)
+            except Exception as e:
+                status = type(e).__name__
+            local_latencies[endpoint].append(time.perf_counter() - started)
+            local_status[str(status)] = local_status.get(str(status), 0) + 1
+            if not isinstance(status, int) or status >= 400:
+                local_errors[endpoint] += 1
+
+        with lock:
+            for name in ENDPOINTS:
+                latencies[name].extend(local_latencies[name])
+                errors[name] += local_errors[name]
+            for status, count in local_status.items():
+                status_counts[status] = status_counts.get(status, 0) + count
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    elapsed = time.perf_counter() - started
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    return {
+        'target': target.name,
+        'concurrency': concurrency,
+        'elapsed_s': round(elapsed, 3),
+        'total': summarize(all_latencies, sum(errors.values()), elapsed),
+        'endpoints': {
+            name: summarize(values, errors[name], elapsed)
+            for name, values in latencies.items() if values
+        },
+        'status_codes': status_counts,
+    }
+
+def print_report(report: Dict):
+    print(f"Alvo: {report['target']} | concorrência: {report['concurrency']} | duração: {report['elapsed_s']}s")
+    print(f"{'endpoint':<12} {'reqs':>7} {'erros':>6} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    rows = list(report['endpoints'].items()) + [('total', report['total'])]
+    for name, row in rows:
+        print(f"{name:<12} {row['requests']:>7} {row['errors']:>6} {row['throughput_rps']:>9.1f} "
+              f"{row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f} {row['max_ms']:>9.2f}")
+    print(f"Status: {json.dumps(report['status_codes'], sort_keys=True)}")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Teste de carga da API de classificação')
+    target_group = parser.add_mutually_exclusive_group()
+    target_group.add_argument('--url', help='servidor já em execução (ex.: http://127.0.0.1:5000)')
+    target_group.add_argument('--serve', action='store_true', help='inicia um servidor local e testa via HTTP')
+    parser.add_argument('--log', help='log JSONL para replay (campos text ou title + body)')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'pesos por endpoint (padrão: {DEFAULT_MIX})')
+    parser.add_argument('--requests', type=int, default=1000, help='número de requisições do plano')
+    parser.add_argument('--duration', type=float, help='segundos de carga (repete o plano)')
+    parser.add_argument('--concurrency', type=int, default=4, help='requisições simultâneas')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-cache', action='store_true',
+                        help='desativa o cache de resultados da aplicação (apenas em processo/--serve)')
+    parser.add_argument('--admission', action='store_true',
+                        help='liga o controle de admissão (429/503) da aplicação (apenas em processo/--serve; '
+                             'desligado por padrão porque todas as requisições vêm de um único cliente)')
+    parser.add_argument('--output', help='salva o relatório em JSON')
+    args = parser.parse_args(argv)
+
+    corpus = generate_corpus(args.seed)
+    texts = load_log(args.log) if args.log else [text for profile in ('short', 'medium', 'quoted_thread', 'marketing') for text in corpus[profile]]
+    plan = build_plan(parse_mix(args.mix), texts, sample_files(corpus), args.requests, args.seed)
+
+    server = None
+    if args.url:
+        target = HttpTarget(args.url)
+    else:
+        if args.no_cache:
+            os.environ['RESULT_CACHE_SIZE'] = '0'
+        os.environ['ADMISSION_ENABLED'] = 'true' if args.admission else 'false'
+        from app import create_app
+        app = create_app()
+        if args.serve:
+            server, url = start_local_server(app)
+            target = HttpTarget(url)
+        else:
+            target = InProcessTarget(app)
+
+    try:
+        report = run_load(target, plan, args.concurrency, args.duration)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            json.dump(report, output, indent=2, ensure_ascii=False)
+            output.write('\n')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,235 @@
+"""
+Micro-benchmarks do classificador e da extração de arquivos.
+
+    python -m benchmarks.run --output benchmarks/baseline.json
+    python -m benchmarks.run --compare benchmarks/baseline.json --threshold 0.10
+
+Cada benchmark roda sobre um corpus sintético determinístico (--seed) e
+registra a mediana do tempo por chamada. No modo --compare, o processo
+termina com código 1 se algum benchmark ficar mais lento que o baseline
+além do limite.
+"""
+from app.services.nlp_processor import nlp_processor
+from app.services.email_classifier import classify_email, LEXICON_VERSION
+from app.services.file_processor import process_file, clean_email_content, is_readable_text
+from app.services.content_reducer import reduce_content
+from app.services.encoding_sniffer import sniff_encoding
+from app.services.pdf_extractor import PdfReader
+from benchmarks.corpus import generate_corpus
+from benchmarks.fixtures import build_txt, build_eml, build_msg, build_pdf
+from werkzeug.datastructures import FileStorage
+from typing import Callable, Dict, List, Optional
+import argparse
+import io
+import json
+import platform
+import re
+import statistics
+import sys
+import time
+
+DEFAULT_SEED = 42
+DEFAULT_REPEAT = 7
+DEFAULT_THRESHOLD = 0.10
+
+# Rodadas com tempo total abaixo disso repetem as entradas até atingi-lo,
+# reduzindo o ruído de benchmarks muito rápidos
+MIN_ROUND_SECONDS = 0.05
+
+def text_functions() -> Dict[str, Callable[[str], object]]:
+    return {
+        'preprocess_text': nlp_processor.preprocess_text,
+        'extract_features': nlp_processor.extract_features,
+        'calculate_urgency_score': nlp_processor.calculate_urgency_score,
+        'classify_email': classify_email,
+        'clean_email_content': clean_email_content,
+        'reduce_content': reduce_content,
+        'is_readable_text': is_readable_text,
+    }
+
+def build_file_inputs(corpus: Dict[str, List[str]]) -> Dict[str, List[tuple]]:
+    """
+    Arquivos de upload de cada formato, gerados a partir dos emails médios
+    e grandes do corpus: (nome do arquivo, conteúdo)
+    """
+    samples = corpus['medium'][:4] + corpus['large'][:2]
+    files = {'txt': [], 'eml': [], 'msg': [], 'pdf': []}
+    for index, text in enumerate(samples):
+        subject = text.split('\n\n')[1][:80]
+        files['txt'].append((f'email-{index}.txt', build_txt(text)))
+        files['eml'].append((f'email-{index}.eml', build_eml(subject, text)))
+        files['msg'].append((f'email-{index}.msg', build_msg(subject, text)))
+        files['pdf'].append((f'email-{index}.pdf', build_pdf(text)))
+    return files
+
+def upload(filename: str, content: bytes) -> str:
+    return process_file(FileStorage(stream=io.BytesIO(content), filename=filename))
+
+def measure(fn: Callable, inputs: List, repeat: int) -> Dict:
+    """
+    Mede fn sobre todas as entradas: uma rodada de aquecimento e depois
+    repeat rodadas. Retorna estatísticas do tempo por chamada em microssegundos
+    """
+    for item in inputs:
+        fn(*item)
+
+    # Calibração: quantas passadas pelas entradas cabem em MIN_ROUND_SECONDS
+    started = time.perf_counter()
+    for item in inputs:
+        fn(*item)
+    single = time.perf_counter() - started
+    loops = max(1, int(MIN_ROUND_SECONDS / single) if single > 0 else 1)
+
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(loops):
+            for item in inputs:
+                fn(*item)
+        elapsed = time.perf_counter() - started
+        samples.append(elapsed / (loops * len(inputs)) * 1e6)
+
+    median = statistics.median(samples)
+    return {
+        'median_us': round(median, 3),
+        'min_us': round(min(samples), 3),
+        'max_us': round(max(samples), 3),
+        'stdev_us': round(statistics.stdev(samples), 3) if len(samples) > 1 else 0.0,
+        'ops_per_second': round(1e6 / median, 1) if median else 0.0,
+        'calls': loops * len(inputs) * repeat,
+        'inputs': len(inputs),
+        'input_bytes': sum(len(item[-1]) for item in inputs) // len(inputs),
+    }
+
+def run_benchmarks(seed: int = DEFAULT_SEED, repeat: int = DEFAULT_REPEAT,
+                   pattern: Optional[str] = None, verbose: bool = True) -> Dict:
+    corpus = generate_corpus(seed)
+    selected = re.compile(pattern) if pattern else None
+    cases = []
+
+    for function_name, fn in text_functions().items():
+        for profile, texts in corpus.items():
+            cases.append((f'{function_name}[{profile}]', fn, [(text,) for text in texts]))
+
+    file_inputs = build_file_inputs(corpus)
+    for file_format, files in file_inputs.items():
+        if file_format == 'pdf' and PdfReader is None:
+            continue  # Sem pypdf não há extração de PDF para medir
+        cases.append((f'process_file[{file_format}]', upload, files))
+    cases.append(('sniff_encoding[txt]', sniff_encoding, [(content,) for _, content in file_inputs['txt']]))
+
+    results = {}
+    for name, fn, inputs in cases:
+        if selected and not selected.search(name):
+            continue
+        results[name] = measure(fn, inputs, repeat)
+        if verbose:
+            print(f"{name:<42} {results[name]['median_us']:>12.1f} us  ({results[name]['ops_per_second']:.0f} ops/s)", file=sys.stderr)
+
+    return {
+        'metadata': {
+            'seed': seed,
+            'repeat': repeat,
+            'lexicon_version': LEXICON_VERSION,
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'machine': platform.machine(),
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        },
+        'benchmarks': results,
+    }
+
+def compare(current: Dict, baseline: Dict, threshold: float = DEFAULT_THRESHOLD) -> Dict:
+    """
+    Compara medianas com o baseline. Regressão: mais lento que
+    baseline * (1 + threshold)
+    """
+    rows = []
+    regressions = []
+    for name, result in current['benchmarks'].items():
+        reference = baseline['benchmarks'].get(name)
+        if reference is None or not reference['median_us']:
+            rows.append({'name': name, 'status': 'new', 'current_us': result['median_us']})
+            continue
+
+        ratio = result['median_us'] / reference['median_us']
+        status = 'regression' if ratio > 1 + threshold else 'improved' if ratio < 1 - threshold else 'ok'
+        row = {
+            'name': name,
+            'status': status,
+            'baseline_us': reference['median_us'],
+            'current_us': result['median_us'],
+            'change': round(ratio - 1, 4),
+        }
+        rows.append(row)
+        if status == 'regression':
+            regressions.append(name)
+
+    missing = sorted(set(baseline['benchmarks']) - set(current['benchmarks']))
+    warnings = []
+    if baseline.get('metadata', {}).get('seed') != current['metadata']['seed']:
+        warnings.append('seed diferente do baseline: corpus não é o mesmo')
+    if baseline.get('metadata', {}).get('lexicon_version') != current['metadata']['lexicon_version']:
+        warnings.append('léxico alterado desde o baseline')
+
+    return {
+        'threshold': threshold,
+        'rows': rows,
+        'regressions': regressions,
+        'missing': missing,
+        'warnings': warnings,
+    }
+
+def print_comparison(report: Dict):
+    for row in report['rows']:
+        if row['status'] == 'new':
+            print(f"{row['name']:<42} {'-':>12} {row['current_us']:>12.1f} us   novo")
+            continue
+        print(f"{row['name']:<42} {row['baseline_us']:>12.1f} {row['current_us']:>12.1f} us "
+              f"{row['change'] * 100:>+7.1f}%  {row['status']}")
+    for name in report['missing']:
+        print(f"{name:<42} ausente na execução atual")
+    for warning in report['warnings']:
+        print(f"Aviso: {warning}")
+
+    if report['regressions']:
+        print(f"\n{len(report['regressions'])} regressão(ões) acima de {report['threshold'] * 100:.0f}%: "
+              f"{', '.join(report['regressions'])}")
+    else:
+        print(f"\nNenhuma regressão acima de {report['threshold'] * 100:.0f}%")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Micro-benchmarks do classificador de emails')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help='seed do corpus sintético')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='rodadas medidas por benchmark')
+    parser.add_argument('--filter', dest='pattern', help='regex: roda apenas benchmarks com nome correspondente')
+    parser.add_argument('--output', help='arquivo JSON de saída (padrão: stdout)')
+    parser.add_argument('--compare', metavar='BASELINE', help='JSON de baseline para comparação')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='regressão tolerada no modo --compare (0.10 = 10%%)')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.seed, args.repeat, args.pattern)
+
+    payload = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            output.write(payload + '\n')
+    elif not args.compare:
+        print(payload)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+        if args.pattern:
+            # Com --filter, benchmarks não selecionados não contam como ausentes
+            selected = re.compile(args.pattern)
+            baseline['benchmarks'] = {name: result for name, result in baseline['benchmarks'].items() if selected.search(name)}
+        report = compare(results, baseline, args.threshold)
+        print_comparison(report)
+        return 1 if report['regressions'] else 0
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,46 @@
+"""
+Casos de regressão da redução de conteúdo: atribuições reais cortam o
+histórico; linhas parecidas sem data/hora nem endereço são conteúdo
+"""
+import pytest
+
+from app.services.content_reducer import reduce_content
+
+@pytest.mark.parametrize('text', [
+    "Pode verificar?\nEm seg., 1 de jan. de 2024 às 10:00, Fulano <f@x.com> escreveu:\n> histórico",
+    "Pode verificar?\nEm 02/01/2024 09:15, Banco escreveu:\n> histórico",
+    "Pode verificar?\nOn Mon, Jan 1, 2024 at 10:00 AM John <j@x.com> wrote:\n> history",
+    "Pode verificar?\nEm ter., 2 de jan. de 2024,\nMaria <m@x.com> escreveu:\nhistórico sem >",
+])
+def test_reply_attribution_cuts_history(text):
+    reduced, report = reduce_content(text)
+    assert reduced == 'Pode verificar?'
+    assert report['removed'].get('quoted')
+    assert not report['fallback']
+
+@pytest.mark.parametrize('text', [
+    # Falso positivo corrigido: a linha cortava o pedido que vem depois dela
+    "Bom dia,\nEm anexo segue o que o gerente escreveu:\nPreciso liberar o limite do cartão urgente, fraude!\nObrigado",
+    "Olá,\nEm resumo, foi isso que o atendente escreveu:\no boleto não foi compensado, podem verificar?",
+    "Oi,\nOn the form the customer wrote:\nmy card was blocked, please help",
+])
+def test_attribution_without_evidence_is_content(text):
+    reduced, report = reduce_content(text)
+    assert reduced == text
+    assert report['bytes_removed'] == 0
+
+@pytest.mark.parametrize('text', [
+    "> só histórico citado\n> sem nada novo",
+    "From: a@b.com\nTo: c@d.com\nDate: Mon, 1 Jan 2024\n",
+])
+def test_nothing_left_returns_original(text):
+    reduced, report = reduce_content(text)
+    assert reduced == text
+    assert report['fallback']
+    assert report['removed'] == {}
+    assert report['bytes_removed'] == 0
+
+def test_empty_text():
+    reduced, report = reduce_content('')
+    assert reduced == ''
+    assert not report['fallback']
@@ -0,0 +1,45 @@
+"""
+Teste diferencial: o scoring incremental (trechos pequenos, lido até o fim)
+deve dar exatamente o mesmo resultado da leitura completa, inclusive com
+frases cortadas entre trechos; com early exit, a mesma classificação e
+confiança
+"""
+import random
+
+import pytest
+
+from app.services.email_classifier import (
+    classify_email, _classify_incremental, PRODUTIVO_KEYWORDS, IMPRODUTIVO_KEYWORDS, URGENCY_WORDS
+)
+
+def _corpus():
+    rng = random.Random(7)
+    vocabulary = (list(PRODUTIVO_KEYWORDS) + list(IMPRODUTIVO_KEYWORDS) + list(URGENCY_WORDS) +
+                  ['olá', 'z', 'q', 'conta-corrente', '(11) 98765 4321', 'www.banco.com.br', 'a@b.com', '?', '!', '\n'])
+    texts = [
+        # Palavra-chave cortada na fronteira de um trecho de 2048 caracteres
+        'z' * 2030 + ' cobrança indevida ' + 'parabéns ' + 'q ' * 600,
+        'cartão bloqueado, problema urgente! ' * 20 + 'obrigado pelo convite, parabéns e feliz natal. ' * 250,
+    ]
+    for _ in range(100):
+        texts.append(' '.join(rng.choice(vocabulary) for _ in range(rng.randint(1, 300))))
+    return texts
+
+CORPUS = _corpus()
+
+@pytest.mark.parametrize('word_boundary', [False, True])
+@pytest.mark.parametrize('chunk_chars', [16, 64, 2048])
+def test_incremental_matches_full_scoring(chunk_chars, word_boundary):
+    for text in CORPUS:
+        expected = classify_email(text, word_boundary)
+        chunked = _classify_incremental(text, word_boundary, chunk_chars, stop_early=False)
+        assert chunked['analysis'].pop('input_consumed')['chars'] == len(text)
+        assert chunked == expected, text[:80]
+
+@pytest.mark.parametrize('word_boundary', [False, True])
+@pytest.mark.parametrize('chunk_chars', [16, 64, 2048])
+def test_early_exit_keeps_classification(chunk_chars, word_boundary):
+    for text in CORPUS:
+        expected = classify_email(text, word_boundary)
+        early = _classify_incremental(text, word_boundary, chunk_chars)
+        assert (early['classification'], early['confidence']) == (expected['classification'], expected['confidence']), text[:80]